@@ -1,20 +1,25 @@
 # ==============================================================================
 # 1. IMPORTS
 # ==============================================================================
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_file, make_response
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from datetime import datetime
 from werkzeug.security import check_password_hash
+from markupsafe import Markup
 import re
 import os
 import io
-import pandas as pd
-import copy
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
+import tempfile
+import hashlib
+import hmac
+import functools
+import logging
 import Mercadinho_kairos.logica_banco as db
+import Mercadinho_kairos.relatorios_jobs as relatorios_jobs
+import Mercadinho_kairos.recibos as recibos
+import Mercadinho_kairos.cache_respostas as cache_respostas
+import Mercadinho_kairos.metricas as metricas
+import Mercadinho_kairos.log_estruturado as log_estruturado
 
 # ==============================================================================
 # 2. CONFIGURAÇÃO INICIAL
@@ -22,6 +27,16 @@ import Mercadinho_kairos.logica_banco as db
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'sua_chave_secreta_super_segura_aqui_2024')
 
+# Conexão do banco compartilhada por requisição e devolvida ao pool no teardown
+db.init_app(app)
+
+# Latência por endpoint e SQL por requisição, expostos em /metrics
+metricas.init_app(app)
+
+# request_id e registro de acesso por requisição; a saída do log só é instalada na partida
+log_estruturado.init_app(app)
+log = logging.getLogger(__name__)
+
 # Configuração do Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -55,6 +70,60 @@ def validar_email(email):
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(pattern, email) is not None
 
+# ==============================================================================
+# 4.1. GET CONDICIONAL (ETag / 304)
+# ==============================================================================
+def _versao_codigo():
+    """Muda quando o código ou os templates mudam, para que um deploy invalide as ETags."""
+    base = os.path.dirname(os.path.abspath(__file__))
+    assinatura = []
+    for pasta, _, arquivos in os.walk(base):
+        for nome in sorted(arquivos):
+            if nome.endswith(('.py', '.html')):
+                caminho = os.path.join(pasta, nome)
+                assinatura.append(f"{os.path.relpath(caminho, base)}:{os.stat(caminho).st_mtime_ns}")
+    return hashlib.sha256("|".join(sorted(assinatura)).encode('utf-8')).hexdigest()[:16]
+
+VERSAO_CODIGO = _versao_codigo()
+
+def _calcular_etag(tabelas, por_dia=False):
+    """ETag forte da resposta: versões das tabelas usadas, usuário, URL e versão do código (e o dia, se `por_dia`)."""
+    versoes = db.versoes_tabelas()
+    if versoes is None or any(tabela not in versoes for tabela in tabelas):
+        return None
+    partes = [VERSAO_CODIGO, str(current_user.get_id()), request.full_path]
+    if por_dia:
+        partes.append(datetime.now().strftime('%Y-%m-%d'))
+    partes.extend(f"{tabela}={versoes[tabela]}" for tabela in tabelas)
+    return hashlib.sha256("|".join(partes).encode('utf-8')).hexdigest()[:32]
+
+def condicional(*tabelas, por_dia=False):
+    """
+    Responde 304 Not Modified se If-None-Match casar com a ETag das `tabelas`,
+    antes de a rota executar qualquer consulta pesada. Rotas cujo conteúdo depende
+    da data atual (ex.: período padrão "hoje") usam `por_dia=True`.
+    """
+    def decorador(view):
+        @functools.wraps(view)
+        def envolvida(*args, **kwargs):
+            # Mensagens flash pendentes precisam ser renderizadas; não há o que revalidar
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return view(*args, **kwargs)
+            etag = _calcular_etag(tabelas, por_dia)
+            if etag is None:
+                return view(*args, **kwargs)
+            if request.if_none_match.contains(etag):
+                resposta = app.response_class(status=304)
+            else:
+                resposta = make_response(view(*args, **kwargs))
+                if resposta.status_code != 200 or session.get('_flashes'):
+                    return resposta  # Erros não devem ser revalidados como conteúdo válido
+            resposta.set_etag(etag)
+            resposta.headers['Cache-Control'] = 'private, no-cache'
+            return resposta
+        return envolvida
+    return decorador
+
 # ==============================================================================
 # 5. ROTAS DE AUTENTICAÇÃO
 # ==============================================================================
@@ -78,7 +147,7 @@ def login():
             else:
                 flash('Usuário ou senha inválidos.', 'danger')
         except Exception as e:
-            print(f"Erro durante o login: {e}")  # Log de erro
+            log.exception("Erro durante o login: %s", e)
             flash('Erro durante o login. Tente novamente.', 'danger')
     return render_template('login.html')
 
@@ -113,7 +182,7 @@ def cadastro():
             else:
                 flash(mensagem, 'danger')
         except Exception as e:
-            print(f"Erro durante o cadastro: {e}")  # Log de erro
+            log.exception("Erro durante o cadastro: %s", e)
             flash('Erro durante o cadastro. Tente novamente.', 'danger')
     return render_template('cadastro.html')
 
@@ -130,15 +199,17 @@ def index():
 @login_required
 def dashboard():
     try:
-        estatisticas = db.get_estatisticas_gerais()
-        produtos_recentes = db.listar_produtos()[:5]
+        # Dados reaproveitados entre acessos até a próxima escrita no banco
+        estatisticas = cache_respostas.em_cache('estatisticas_gerais', db.get_estatisticas_gerais)
+        produtos_recentes = cache_respostas.em_cache(
+            'produtos_recentes', lambda: db.listar_produtos_pagina(limite=5)['produtos'])
         
         return render_template('dashboard.html', 
                              estatisticas=estatisticas,
                              produtos_recentes=produtos_recentes,
                              now=datetime.now())
     except Exception as e:
-        print(e)
+        log.exception("Erro ao carregar dashboard: %s", e)
         flash("Erro ao carregar dashboard.", "danger")
         return render_template("dashboard.html", now=datetime.now())
 
@@ -147,70 +218,36 @@ def dashboard():
 # ==============================================================================
 @app.route('/relatorios')
 @login_required
+@condicional('produtos', 'clientes', 'vendas', 'itens_vendidos', por_dia=True)
 def relatorios():
-    """Página principal de relatórios"""
+    """
+    Página principal de relatórios.
+    Estatísticas vêm de agregações e do resumo diário; as tabelas trazem só a
+    primeira página e o restante é buscado em /api/relatorios/<tabela>.
+    """
     try:
-        # Dados básicos
-        estoque = db.listar_produtos()
-        vendas = db.get_relatorio_vendas_detalhado()
-        
-        # Calcular estatísticas
-        total_produtos = len(estoque)
-        produtos_sem_estoque = len([p for p in estoque if p.get('quantidade', 0) <= 0])
-        produtos_estoque_baixo = len([p for p in estoque if 0 < p.get('quantidade', 0) <= 5])
-        
-        # Calcular valor total do estoque
-        valor_estoque = sum(p.get('preco', 0) * p.get('quantidade', 0) for p in estoque)
-        
-        # Calcular estatísticas de vendas
-        total_vendas_valor = 0
-        vendas_agrupadas = {}
-        for venda in vendas:
-            venda_id = venda.get('id')
-            if venda_id and venda_id not in vendas_agrupadas:
-                vendas_agrupadas[venda_id] = venda.get('total', 0)
-        
-        total_vendas_valor = sum(vendas_agrupadas.values())
-        total_transacoes = len(vendas_agrupadas)
-        total_itens_vendidos = sum(venda.get('quantidade', 0) for venda in vendas)
-        
-        # Movimentações (simuladas a partir das vendas)
-        movimentacoes = []
-        for venda in vendas[:50]:  # Limitar para performance
-            if venda.get('produto_nome'):
-                movimentacoes.append({
-                    'produto_nome': venda.get('produto_nome'),
-                    'quantidade': venda.get('quantidade', 0),
-                    'data_venda': venda.get('data_venda'),
-                    'tipo': 'saida'
-                })
-        
-        estatisticas = {
-            'total_produtos': total_produtos,
-            'produtos_sem_estoque': produtos_sem_estoque,
-            'produtos_estoque_baixo': produtos_estoque_baixo,
-            'valor_estoque': valor_estoque,
-            'total_vendas_valor': total_vendas_valor,
-            'total_transacoes': total_transacoes,
-            'total_itens_vendidos': total_itens_vendidos
-        }
+        estatisticas = db.get_estatisticas_relatorios()
+        pagina_estoque = db.listar_produtos_pagina()
+        pagina_vendas = db.listar_itens_vendidos_pagina()
         
         return render_template('relatorios.html',
-                            estoque=estoque,
-                            vendas=vendas,
-                            movimentacoes=movimentacoes,
+                            estoque=pagina_estoque['produtos'],
+                            proximo_estoque=pagina_estoque['proximo'],
+                            vendas=pagina_vendas['itens'],
+                            proximo_vendas=pagina_vendas['proximo'],
+                            movimentacoes=pagina_vendas['itens'],  # Saídas mais recentes
                             estatisticas=estatisticas,
-                            produtos_sem_estoque=produtos_sem_estoque,
+                            produtos_sem_estoque=estatisticas['produtos_sem_estoque'],
                             hoje=datetime.now().strftime('%Y-%m-%d'))
                             
     except Exception as e:
-        print(f"Erro ao carregar relatórios: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Erro ao carregar relatórios: %s", e)
         # GARANTE CONTEXTO SEGURO PARA O TEMPLATE
         return render_template('relatorios.html',
                             estoque=[],
+                            proximo_estoque=None,
                             vendas=[],
+                            proximo_vendas=None,
                             movimentacoes=[],
                             estatisticas={
                                 'total_produtos': 0, 
@@ -226,15 +263,13 @@ def relatorios():
 @app.route('/relatorios/filtrar', methods=['POST'])
 @login_required
 def filtrar_relatorios():
-    """Filtrar relatórios por data - VERSÃO MAIS ROBUSTA"""
+    """Filtrar relatórios por data: estatísticas agregadas mais a primeira página de cada tabela"""
     try:
         data = request.get_json()
-        data_inicio = data.get('data_inicio')
-        data_fim = data.get('data_fim')
+        data_inicio = data.get('data_inicio') or None
+        data_fim = data.get('data_fim') or None
         tipo_relatorio = data.get('tipo_relatorio', 'completo')
         
-        print(f"DEBUG FILTRO: {data_inicio} até {data_fim}, tipo: {tipo_relatorio}")
-        
         # Validar datas
         if data_inicio and data_fim and data_inicio > data_fim:
             return jsonify({
@@ -242,151 +277,117 @@ def filtrar_relatorios():
                 'error': 'Data início não pode ser maior que data fim'
             }), 400
         
-        # Obter dados do banco
-        estoque_filtrado = db.listar_produtos()
-        
-        # Buscar vendas com filtro de data
-        vendas_filtradas = []
-        if data_inicio and data_fim:
-            try:
-                vendas_filtradas = db.get_vendas_por_periodo(data_inicio, data_fim)
-            except Exception as e:
-                print(f"Erro ao buscar vendas por período: {e}")
-                vendas_filtradas = []
-        else:
-            # Se não há filtro de data, buscar todas as vendas
-            try:
-                vendas_filtradas = db.get_relatorio_vendas_detalhado()
-            except Exception as e:
-                print(f"Erro ao buscar todas as vendas: {e}")
-                vendas_filtradas = []
+        estatisticas = db.get_estatisticas_relatorios(data_inicio, data_fim)
+        pagina_estoque = db.listar_produtos_pagina()
         
-        # Aplicar filtro por tipo de relatório
         if tipo_relatorio == 'estoque':
-            vendas_filtradas = []
-        elif tipo_relatorio == 'vendas':
-            # Manter apenas vendas (já está assim)
-            pass
-        elif tipo_relatorio == 'movimentacoes':
-            # Para movimentações, podemos manter um subconjunto
-            pass
-        
-        # Recalcular estatísticas com tratamento de erro
-        try:
-            total_produtos = len(estoque_filtrado)
-            produtos_sem_estoque = len([p for p in estoque_filtrado if p.get('quantidade', 0) <= 0])
-            produtos_estoque_baixo = len([p for p in estoque_filtrado if 0 < p.get('quantidade', 0) <= 5])
-            valor_estoque = sum(p.get('preco', 0) * p.get('quantidade', 0) for p in estoque_filtrado)
-            
-            # Calcular estatísticas de vendas
-            total_vendas_valor = 0
-            vendas_agrupadas = {}
-            for venda in vendas_filtradas:
-                venda_id = venda.get('id')
-                if venda_id and venda_id not in vendas_agrupadas:
-                    vendas_agrupadas[venda_id] = float(venda.get('total', 0))
-            
-            total_vendas_valor = sum(vendas_agrupadas.values())
-            total_transacoes = len(vendas_agrupadas)
-            total_itens_vendidos = sum(venda.get('quantidade', 0) for venda in vendas_filtradas)
-            
-        except Exception as e:
-            print(f"Erro ao calcular estatísticas: {e}")
-            total_produtos = 0
-            produtos_sem_estoque = 0
-            produtos_estoque_baixo = 0
-            valor_estoque = 0
-            total_vendas_valor = 0
-            total_transacoes = 0
-            total_itens_vendidos = 0
-        
-        # Preparar movimentações
-        movimentacoes_filtradas = []
-        try:
-            for venda in vendas_filtradas[:100]:  # Limitar para performance
-                if venda.get('produto_nome'):
-                    movimentacoes_filtradas.append({
-                        'produto_nome': venda.get('produto_nome'),
-                        'quantidade': venda.get('quantidade', 0),
-                        'data_venda': venda.get('data_venda'),
-                        'venda_id': venda.get('id'),
-                        'tipo': 'saida'
-                    })
-        except Exception as e:
-            print(f"Erro ao preparar movimentações: {e}")
-        
-        estatisticas = {
-            'total_produtos': total_produtos,
-            'produtos_sem_estoque': produtos_sem_estoque,
-            'produtos_estoque_baixo': produtos_estoque_baixo,
-            'valor_estoque': valor_estoque,
-            'total_vendas_valor': total_vendas_valor,
-            'total_transacoes': total_transacoes,
-            'total_itens_vendidos': total_itens_vendidos
-        }
-        
-        print(f"DEBUG: Retornando {len(estoque_filtrado)} produtos, {len(vendas_filtradas)} vendas")
+            pagina_vendas = {'itens': [], 'proximo': None}
+            estatisticas.update(total_vendas_valor=0, total_transacoes=0, total_itens_vendidos=0)
+        else:
+            pagina_vendas = db.listar_itens_vendidos_pagina(data_inicio, data_fim)
         
         return jsonify({
             'success': True,
-            'estoque': estoque_filtrado,
-            'vendas': vendas_filtradas,
-            'movimentacoes': movimentacoes_filtradas,
+            'estoque': pagina_estoque['produtos'],
+            'proximo_estoque': pagina_estoque['proximo'],
+            'vendas': pagina_vendas['itens'],
+            'proximo_vendas': pagina_vendas['proximo'],
+            'movimentacoes': pagina_vendas['itens'],
             'estatisticas': estatisticas,
-            'produtos_sem_estoque': produtos_sem_estoque
+            'produtos_sem_estoque': estatisticas['produtos_sem_estoque']
         })
         
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Datas inválidas. Use o formato AAAA-MM-DD.'}), 400
     except Exception as e:
-        print(f"ERRO CRÍTICO AO FILTRAR RELATÓRIOS: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("ERRO CRÍTICO AO FILTRAR RELATÓRIOS: %s", e)
         return jsonify({
             'success': False,
             'error': f'Erro interno do servidor: {str(e)}'
         }), 500
+
+@app.route('/api/relatorios/<tabela>')
+@login_required
+@condicional('produtos', 'clientes', 'vendas', 'itens_vendidos')
+def api_relatorios(tabela):
+    """Próximas páginas das tabelas de relatório: /api/relatorios/<estoque|vendas>?after=<cursor>&limit=<n>[&data_inicio&data_fim]"""
+    try:
+        limite = db.validar_limite_pagina(request.args.get('limit'))
+        apos = request.args.get('after')
+        if tabela == 'estoque':
+            pagina = db.listar_produtos_pagina(apos, limite)
+            return jsonify({'success': True, 'linhas': pagina['produtos'], 'proximo': pagina['proximo']})
+        if tabela == 'vendas':
+            pagina = db.listar_itens_vendidos_pagina(
+                request.args.get('data_inicio') or None, request.args.get('data_fim') or None, apos, limite
+            )
+            return jsonify({'success': True, 'linhas': pagina['itens'], 'proximo': pagina['proximo']})
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': False, 'message': 'Tabela de relatório desconhecida'}), 404
         
         
 # ==============================================================================
 # 8. ROTAS DE PRODUTOS E BUSCA
 # ==============================================================================
+def _pagina_produtos_em_cache(apos=None, limite=db.PAGINA_TAMANHO_PADRAO):
+    """Página de produtos com as linhas da tabela já renderizadas, reaproveitada até a próxima escrita."""
+    def calcular():
+        pagina = db.listar_produtos_pagina(apos, limite)
+        pagina['html'] = Markup(render_template('_linhas_produtos.html', produtos=pagina['produtos']))
+        return pagina
+    return cache_respostas.em_cache(('pagina_produtos', apos, limite), calcular)
+
 @app.route('/produtos')
+@condicional('produtos')
 def produtos():
     try:
-        lista_produtos = db.listar_produtos()
-        
-        # Calcular estatísticas para o template
-        total_produtos = len(lista_produtos)
-        produtos_com_estoque = len([p for p in lista_produtos if p.get('quantidade', 0) > 0])
-        produtos_estoque_baixo = len([p for p in lista_produtos if 0 < p.get('quantidade', 0) <= 5])
-        produtos_sem_estoque = len([p for p in lista_produtos if p.get('quantidade', 0) == 0])
-        
-        # Calcular valor total do estoque
-        valor_total_estoque = sum(p.get('preco', 0) * p.get('quantidade', 0) for p in lista_produtos)
-        
-        # Contar produtos recentes (últimos 7 dias)
-        produtos_recentes_count = len([p for p in lista_produtos 
-                                     if p.get('data_criacao') 
-                                     and (datetime.now() - p.get('data_criacao')).days <= 7])
+        # Só a primeira página é renderizada; o restante vem de /api/produtos ao rolar
+        pagina = _pagina_produtos_em_cache()
+        resumo = cache_respostas.em_cache('resumo_estoque', db.get_resumo_estoque)
         
         return render_template('produtos.html', 
-                             produtos=lista_produtos,
-                             produtos_com_estoque=produtos_com_estoque,
-                             produtos_estoque_baixo=produtos_estoque_baixo,
-                             produtos_sem_estoque=produtos_sem_estoque,
-                             valor_total_estoque=valor_total_estoque,
-                             produtos_recentes_count=produtos_recentes_count)
+                             produtos=pagina['produtos'],
+                             linhas_html=pagina['html'],
+                             proximo=pagina['proximo'],
+                             total_produtos=resumo['total_produtos'],
+                             produtos_com_estoque=resumo['produtos_com_estoque'],
+                             produtos_estoque_baixo=resumo['produtos_estoque_baixo'],
+                             produtos_sem_estoque=resumo['produtos_sem_estoque'],
+                             valor_total_estoque=resumo['valor_estoque'],
+                             produtos_recentes_count=0)  # Tabela não registra data de criação
                              
     except Exception as e:
-        print(f"Erro ao carregar produtos: {e}")
+        log.exception("Erro ao carregar produtos: %s", e)
+        flash("Erro ao carregar produtos.", "danger")
         # Retornar valores padrão em caso de erro
         return render_template('produtos.html', 
                              produtos=[],
+                             linhas_html='',
+                             proximo=None,
+                             total_produtos=0,
                              produtos_com_estoque=0,
                              produtos_estoque_baixo=0,
                              produtos_sem_estoque=0,
                              valor_total_estoque=0,
                              produtos_recentes_count=0)
 
+@app.route('/api/produtos')
+@login_required
+@condicional('produtos')
+def api_produtos():
+    """Página de produtos por cursor: /api/produtos?after=<cursor>&limit=<n>[&html=1]"""
+    try:
+        limite = db.validar_limite_pagina(request.args.get('limit'))
+        pagina = _pagina_produtos_em_cache(request.args.get('after'), limite)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    resposta = {'success': True, 'produtos': pagina['produtos'], 'proximo': pagina['proximo']}
+    if request.args.get('html'):
+        resposta['html'] = str(pagina['html'])
+    return jsonify(resposta)
+
 @app.route('/produtos/adicionar', methods=['GET', 'POST'])
 @login_required
 def adicionar_produto():
@@ -418,7 +419,7 @@ def adicionar_produto():
             else:
                 flash(mensagem, 'danger')
         except Exception as e:
-            print(f"Erro ao adicionar produto: {e}")  # Log de erro
+            log.exception("Erro ao adicionar produto: %s", e)
             flash('Erro ao adicionar produto. Tente novamente.', 'danger')
 
     return render_template('produto_formulario.html', titulo="Adicionar Produto", produto=None)
@@ -459,7 +460,7 @@ def editar_produto(id):
             else:
                 flash(mensagem, 'danger')
         except Exception as e:
-            print(f"Erro ao atualizar produto: {e}")  # Log de erro
+            log.exception("Erro ao atualizar produto: %s", e)
             flash('Erro ao atualizar produto. Tente novamente.', 'danger')
 
     return render_template('produto_formulario.html', titulo="Editar Produto", produto=produto_existente)
@@ -476,7 +477,7 @@ def excluir_produto(id):
             flash(mensagem, 'danger')
             
     except Exception as e:
-        print(f"Erro ao excluir produto: {e}")  # Log de erro
+        log.exception("Erro ao excluir produto: %s", e)
         flash('Erro ao excluir produto.', 'danger')
     
     return redirect(url_for('produtos'))
@@ -503,7 +504,7 @@ def buscar_produto_estoque():
             return jsonify({'success': False, 'message': 'Produto não encontrado'})
             
     except Exception as e:
-        print(f"Erro na busca de produto no estoque: {e}")  # Log de erro
+        log.exception("Erro na busca de produto no estoque: %s", e)
         return jsonify({'success': False, 'message': 'Erro interno do servidor'})
 
 @app.route('/buscar_produto_caixa', methods=['POST'])
@@ -521,7 +522,7 @@ def buscar_produto_caixa():
 
         return jsonify({'produto': produto})
     except Exception as e:
-        print(f"Erro ao buscar produto no caixa: {e}")
+        log.exception("Erro ao buscar produto no caixa: %s", e)
         return jsonify({'erro': 'Erro interno ao buscar produto.'}), 500
 
 # ... Linha 304
@@ -560,23 +561,41 @@ def buscar_produto_caixa_auto():
         return jsonify({'success': False, 'message': 'Produto não encontrado'})
         
     except Exception as e:
-        print(f"Erro na busca automática: {e}")
+        log.exception("Erro na busca automática: %s", e)
         return jsonify({'success': False, 'message': 'Erro interno na busca'}), 500 # Retorna 500 em caso de erro.
 
+@app.route('/api/catalogo')
+@login_required
+@condicional('catalogo')
+def api_catalogo():
+    """Catálogo compacto do PDV (linhas na ordem de 'campos') com a versão atual"""
+    try:
+        return jsonify(db.get_catalogo_pdv())
+    except Exception as e:
+        log.exception("Erro ao gerar catálogo do PDV: %s", e)
+        return jsonify({'success': False, 'message': 'Erro ao gerar catálogo'}), 500
+
+@app.route('/api/catalogo/alteracoes')
+@login_required
+def api_catalogo_alteracoes():
+    """Produtos alterados e removidos desde a versão informada: /api/catalogo/alteracoes?desde=<versao>"""
+    try:
+        return jsonify(db.get_catalogo_pdv(request.args['desde']))
+    except (KeyError, ValueError):
+        return jsonify({'success': False, 'message': "Parâmetro 'desde' inválido"}), 400
+    except Exception as e:
+        log.exception("Erro ao gerar alterações do catálogo: %s", e)
+        return jsonify({'success': False, 'message': 'Erro ao gerar alterações do catálogo'}), 500
+
 
 # Rota para listagem e gerenciamento de Produtos Pesáveis
 @app.route('/produtos_pesaveis')
 @login_required
 def produtos_pesaveis():
-    produtos = db.listar_produtos_pesaveis()
+    resumo = cache_respostas.em_cache('produtos_pesaveis', _resumo_produtos_pesaveis)
+    produtos = resumo['produtos']
 
-    # Corrigido: acesso por chave, não atributo
-    if produtos:
-        preco_medio_kg = sum(p['preco_por_kg'] for p in produtos) / len(produtos)
-    else:
-        preco_medio_kg = 0.0
-
-    produtos_ativos = sum(1 for p in produtos if p.get('ativo', True))
+    # Depende do relógio, por isso fica fora do cache
     produtos_recentes = sum(
         1 for p in produtos
         if p.get('data_criacao') and (datetime.now() - p['data_criacao']).days <= 30
@@ -585,11 +604,26 @@ def produtos_pesaveis():
     return render_template(
         'produtos_pesaveis.html',
         produtos=produtos,
-        preco_medio_kg=preco_medio_kg,
-        produtos_ativos=produtos_ativos,
+        preco_medio_kg=resumo['preco_medio_kg'],
+        produtos_ativos=resumo['produtos_ativos'],
         produtos_recentes=produtos_recentes
     )
 
+def _resumo_produtos_pesaveis():
+    produtos = db.listar_produtos_pesaveis()
+
+    # Corrigido: acesso por chave, não atributo
+    if produtos:
+        preco_medio_kg = sum(p['preco_por_kg'] for p in produtos) / len(produtos)
+    else:
+        preco_medio_kg = 0.0
+
+    return {
+        'produtos': produtos,
+        'preco_medio_kg': preco_medio_kg,
+        'produtos_ativos': sum(1 for p in produtos if p.get('ativo', True)),
+    }
+
 # Rota para o formulário de adição de Produto Pesável
 @app.route('/produtos_pesaveis/adicionar', methods=['GET', 'POST'])
 @login_required
@@ -616,7 +650,7 @@ def adicionar_produto_pesavel():
             else:
                 flash(mensagem, 'danger')
         except Exception as e:
-            print(f"Erro ao adicionar produto pesável: {e}")
+            log.exception("Erro ao adicionar produto pesável: %s", e)
             flash('Erro interno ao processar a associação.', 'danger')
             
         # Garante que a lista de produtos é carregada novamente em caso de erro
@@ -660,7 +694,7 @@ def editar_produto_pesavel(id):
             else:
                 flash(mensagem, 'danger')
         except Exception as e:
-            print(f"Erro ao editar produto pesável: {e}")
+            log.exception("Erro ao editar produto pesável: %s", e)
             flash('Erro ao editar produto pesável.', 'danger')
 
     return render_template('produto_pesavel_formulario.html', produto_pesavel=produto_pesavel)
@@ -668,16 +702,46 @@ def editar_produto_pesavel(id):
 # ==============================================================================
 # 9. ROTAS DE CLIENTES
 # ==============================================================================
+def _pagina_clientes_em_cache(apos=None, limite=db.PAGINA_TAMANHO_PADRAO):
+    """Página de clientes com as linhas da tabela já renderizadas, reaproveitada até a próxima escrita."""
+    def calcular():
+        pagina = db.listar_clientes_pagina(apos, limite)
+        pagina['html'] = Markup(render_template('_linhas_clientes.html', clientes=pagina['clientes']))
+        return pagina
+    return cache_respostas.em_cache(('pagina_clientes', apos, limite), calcular)
+
 @app.route('/clientes')
 @login_required
+@condicional('clientes')
 def clientes():
     try:
-        lista_clientes = db.listar_clientes()
-        return render_template('clientes.html', clientes=lista_clientes)
+        # Só a primeira página é renderizada; o restante vem de /api/clientes ao rolar
+        pagina = _pagina_clientes_em_cache()
+        return render_template('clientes.html',
+                             clientes=pagina['clientes'],
+                             linhas_html=pagina['html'],
+                             proximo=pagina['proximo'],
+                             total_clientes=cache_respostas.em_cache('total_clientes', db.contar_clientes))
     except Exception as e:
-        print(f"Erro ao carregar clientes: {e}")  # Log de erro
+        log.exception("Erro ao carregar clientes: %s", e)
         flash('Erro ao carregar clientes.', 'danger')
-        return render_template('clientes.html', clientes=[])
+        return render_template('clientes.html', clientes=[], linhas_html='', proximo=None, total_clientes=0)
+
+@app.route('/api/clientes')
+@login_required
+@condicional('clientes')
+def api_clientes():
+    """Página de clientes por cursor: /api/clientes?after=<cursor>&limit=<n>[&html=1]"""
+    try:
+        limite = db.validar_limite_pagina(request.args.get('limit'))
+        pagina = _pagina_clientes_em_cache(request.args.get('after'), limite)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    resposta = {'success': True, 'clientes': pagina['clientes'], 'proximo': pagina['proximo']}
+    if request.args.get('html'):
+        resposta['html'] = str(pagina['html'])
+    return jsonify(resposta)
 
 @app.route('/clientes/adicionar', methods=['GET', 'POST'])
 @login_required
@@ -706,7 +770,7 @@ def adicionar_cliente():
             else:
                 flash(mensagem, 'danger')
         except Exception as e:
-            print(f"Erro ao adicionar cliente: {e}")  # Log de erro
+            log.exception("Erro ao adicionar cliente: %s", e)
             flash('Erro ao adicionar cliente. Tente novamente.', 'danger')
 
     return render_template('cliente_formulario.html', titulo="Adicionar Cliente", cliente=None)
@@ -743,7 +807,7 @@ def editar_cliente(id):
             else:
                 flash(mensagem, 'danger')
         except Exception as e:
-            print(f"Erro ao atualizar cliente: {e}")  # Log de erro
+            log.exception("Erro ao atualizar cliente: %s", e)
             flash('Erro ao atualizar cliente. Tente novamente.', 'danger')
 
     return render_template('cliente_formulario.html', titulo="Editar Cliente", cliente=cliente_existente)
@@ -760,7 +824,7 @@ def excluir_cliente(id):
             flash(mensagem, 'danger')
             
     except Exception as e:
-        print(f"Erro ao excluir cliente: {e}")  # Log de erro
+        log.exception("Erro ao excluir cliente: %s", e)
         flash('Erro ao excluir cliente.', 'danger')
     
     return redirect(url_for('clientes'))
@@ -770,72 +834,47 @@ def excluir_cliente(id):
 # ==============================================================================
 @app.route('/vendas')
 @login_required
+@condicional('produtos', 'clientes', 'vendas', 'itens_vendidos')
 def vendas():
-    """Histórico de vendas (com clientes para filtros)"""
+    """Histórico de vendas (com clientes para filtros); as próximas páginas vêm de /vendas_filtradas"""
     try:
-        # A lista completa e original
-        vendas_historico = db.get_relatorio_vendas_detalhado()
+        pagina = db.buscar_vendas({})
         clientes = db.listar_clientes()
-        
-        print(f"DEBUG: {len(vendas_historico)} vendas recuperadas do DB.")  # Log de debug
-        
-        # PASSO CRÍTICO DE CÓPIA: Crie uma cópia profunda antes de filtrar/iterar
-        historico_copia = copy.deepcopy(vendas_historico)
-
-        # Filtra a cópia, removendo qualquer coisa que não seja um dict válido
-        vendas_historico_filtrado = [
-            item for item in historico_copia 
-            if isinstance(item, dict) and item.get('id') is not None
-        ]
-        
-        total_vendas_valor = 0.0
-        vendas_agrupadas_para_calculo = {}
-
-        # Usa a lista FILTRADA
-        for venda_item in vendas_historico_filtrado:
-            venda_id = venda_item.get('id')
-            if venda_id not in vendas_agrupadas_para_calculo:
-                # O problema estava aqui, mas agora a lista é segura
-                vendas_agrupadas_para_calculo[venda_id] = venda_item.get('total', 0.0)
-
-        total_vendas_valor = sum(vendas_agrupadas_para_calculo.values())
+        totais = pagina['totais'] or {'total_registros': 0, 'total_vendas_valor': 0.0}
 
-        # Retorna a lista ORIGINAL para o template (pois ele precisa dos registros)
         return render_template('vendas.html', 
-                             vendas=vendas_historico, # A lista original/filtrada para exibição
+                             vendas=pagina['vendas'],
+                             proximo=pagina['proximo'],
                              clientes=clientes,
-                             total_vendas_valor=total_vendas_valor)
+                             total_registros=totais['total_registros'],
+                             total_vendas_valor=totais['total_vendas_valor'])
                              
     except Exception as e:
-        print(f"ERRO AO CARREGAR HISTÓRICO DE VENDAS: {e}")
-        import traceback
-        traceback.print_exc()  # Traceback completo para debug
+        log.exception("ERRO AO CARREGAR HISTÓRICO DE VENDAS: %s", e)
         try:
              clientes = db.listar_clientes()
         except:
              clientes = []
              
         # Retorna com valores seguros
-        return render_template('vendas.html', vendas=[], clientes=clientes, total_vendas_valor=0.0) # GARANTE CONTEXTO SEGURO
+        return render_template('vendas.html', vendas=[], proximo=None, clientes=clientes,
+                               total_registros=0, total_vendas_valor=0.0) # GARANTE CONTEXTO SEGURO
 
 @app.route('/caixa')
 @login_required
 def caixa():
     """PDV - Ponto de Venda CORRIGIDO"""
     try:
-        produtos_disponiveis = db.listar_produtos()
+        # caixa.html não lista o catálogo: produtos são resolvidos por /caixa/buscar_auto
         clientes_cadastrados = db.listar_clientes()
         
-        # Filtrar apenas produtos com estoque positivo
-        produtos_com_estoque = [p for p in produtos_disponiveis if p.get('quantidade', 0) > 0]
-        
-        print(f"DEBUG CAIXA: {len(produtos_com_estoque)} produtos com estoque carregados")
+        log.debug("Caixa: %s clientes carregados", len(clientes_cadastrados))
         
         return render_template('caixa.html', 
-                             produtos=produtos_com_estoque, 
+                             produtos=[], 
                              clientes=clientes_cadastrados)
     except Exception as e:
-        print(f"Erro ao carregar caixa: {e}")
+        log.exception("Erro ao carregar caixa: %s", e)
         flash('Erro ao carregar caixa.', 'danger')
         return render_template('caixa.html', produtos=[], clientes=[])
 
@@ -861,20 +900,54 @@ def finalizar_venda():
 
     # Chame a função de registrar venda
     # NOTA: A função registrar_venda_completa no logica_banco.py foi corrigida para não usar 'self'
-    venda_id, mensagem = db.registrar_venda_completa(
-        cliente_id=cliente_id,
-        itens_carrinho=itens_carrinho,
-        total=total_venda,
-        forma_pagamento=forma_pagamento,
-        valor_pago=valor_pago,
-        troco=troco
-    )
+    try:
+        venda_id, mensagem = db.registrar_venda_completa(
+            cliente_id=cliente_id,
+            itens_carrinho=itens_carrinho,
+            total=total_venda,
+            forma_pagamento=forma_pagamento,
+            valor_pago=valor_pago,
+            troco=troco
+        )
+    except db.EstoqueInsuficiente as e:
+        # Recusa prevista (o caixa mostra quais itens faltam), não falha do servidor
+        return jsonify({'success': False, 'mensagem': str(e), 'faltas': e.faltas}), 409
 
     if venda_id:
+        recibos.agendar_pre_renderizacao(venda_id)
         return jsonify({'success': True, 'mensagem': mensagem, 'venda_id': venda_id})
     else:
         return jsonify({'success': False, 'mensagem': mensagem}), 500
 
+@app.route('/caixa/finalizar_lote', methods=['POST'])
+@login_required
+def finalizar_vendas_lote():
+    """
+    Recebe {'vendas': [...]} enfileiradas por um caixa offline (cada uma no formato de
+    /caixa/finalizar, com 'id_externo' e 'data_venda' opcionais) e retorna um resultado por venda.
+    """
+    dados = request.get_json(silent=True)
+    vendas_lote = dados.get('vendas') if isinstance(dados, dict) else None
+    if not isinstance(vendas_lote, list) or not vendas_lote:
+        return jsonify({'success': False, 'mensagem': "Envie {'vendas': [...]} com ao menos uma venda."}), 400
+
+    try:
+        resultados = db.registrar_vendas_lote(vendas_lote)
+    except ValueError as e:
+        return jsonify({'success': False, 'mensagem': str(e)}), 413
+
+    contagem = {'registrada': 0, 'duplicada': 0, 'rejeitada': 0, 'erro': 0}
+    for resultado in resultados:
+        contagem[resultado['status']] += 1
+    return jsonify({
+        'success': True,
+        'registradas': contagem['registrada'],
+        'duplicadas': contagem['duplicada'],
+        'rejeitadas': contagem['rejeitada'],
+        'erros': contagem['erro'],
+        'resultados': resultados,
+    })
+
 # As outras rotas permanecem iguais, pois não afetam o erro principal
 @app.route('/debug/vendas-detalhado')
 @login_required
@@ -894,9 +967,89 @@ def debug_vendas_detalhado():
         return jsonify(analise)
         
     except Exception as e:
-        print(f"Erro no debug de vendas: {e}")  # Log de erro
+        log.exception("Erro no debug de vendas: %s", e)
         return jsonify({'error': str(e)}), 500    
 
+@app.route('/debug/pool')
+@login_required
+def debug_pool():
+    """Estatísticas do pool de conexões do banco"""
+    return jsonify(db.estatisticas_pool())
+
+@app.route('/debug/contadores')
+@login_required
+def debug_contadores():
+    """Recalcula as estatísticas do dashboard e lista divergências dos contadores (só leitura)"""
+    try:
+        divergencias = db.verificar_contadores()
+        return jsonify({'consistente': not divergencias, 'divergencias': divergencias})
+    except Exception as e:
+        log.exception("Erro ao verificar contadores: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/debug/contadores', methods=['POST'])
+@login_required
+def corrigir_contadores():
+    """Grava nos contadores os valores recalculados e retorna as divergências corrigidas"""
+    try:
+        divergencias = db.verificar_contadores(corrigir=True)
+        return jsonify({'corrigido': bool(divergencias), 'divergencias': divergencias})
+    except Exception as e:
+        log.exception("Erro ao corrigir contadores: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/debug/indice_produtos')
+@login_required
+def debug_indice_produtos():
+    """Estatísticas do índice em memória de códigos de produtos"""
+    return jsonify(db.estatisticas_indice_produtos())
+
+@app.route('/debug/cache')
+@login_required
+def debug_cache():
+    """Acertos, faltas e ocupação do cache de respostas"""
+    return jsonify(cache_respostas.estatisticas_cache())
+
+@app.route('/debug/cache', methods=['POST'])
+@login_required
+def limpar_cache():
+    """Esvazia o cache de respostas e retorna as estatísticas"""
+    cache_respostas.cache.limpar()
+    return jsonify(cache_respostas.estatisticas_cache())
+
+@app.route('/debug/queries')
+@login_required
+def debug_consultas():
+    """Consultas SQL por tempo total e ocorrências lentas com plano; ?formato=json"""
+    consultas = db.registro_consultas.mais_custosas()
+    lentas = db.registro_consultas.lentas_recentes()
+    if request.args.get('formato') == 'json':
+        return jsonify({'limite_ms': db.CONSULTA_LENTA_MS, 'consultas': consultas, 'lentas': lentas})
+    return render_template('debug_consultas.html', consultas=consultas, lentas=lentas, limite_ms=db.CONSULTA_LENTA_MS)
+
+@app.route('/debug/queries', methods=['POST'])
+@login_required
+def limpar_consultas():
+    """Zera o registro de consultas SQL"""
+    db.registro_consultas.limpar()
+    return redirect(url_for('debug_consultas'))
+
+@app.route('/metrics')
+def metrics():
+    """
+    Métricas no formato do Prometheus. Exige sessão logada ou, para o coletor,
+    'Authorization: Bearer <METRICAS_TOKEN>'; acesso anônimo só com METRICAS_PUBLICAS=true.
+    """
+    token = os.environ.get('METRICAS_TOKEN')
+    autorizado = (
+        current_user.is_authenticated
+        or (token and hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"))
+        or os.environ.get('METRICAS_PUBLICAS', 'False').lower() == 'true'
+    )
+    if not autorizado:
+        return app.response_class("Não autorizado\n", status=401, mimetype='text/plain')
+    return app.response_class(metricas.texto_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/vendas/excluir/<int:venda_id>', methods=['POST'])
 @login_required
 def excluir_venda(venda_id):
@@ -905,18 +1058,20 @@ def excluir_venda(venda_id):
         sucesso, mensagem = db.excluir_venda(venda_id)
         
         if sucesso:
+            recibos.invalidar_recibo(venda_id)
             flash(mensagem, 'success')
         else:
             flash(f"Falha ao excluir venda: {mensagem}", 'danger')
         
         return redirect(url_for('vendas'))
     except Exception as e:
-        print(f"Erro ao excluir venda: {e}")  # Log de erro
+        log.exception("Erro ao excluir venda: %s", e)
         flash(f'Erro interno ao excluir venda: {e}', 'danger')
         return redirect(url_for('vendas'))
 
 @app.route('/api/detalhes_venda/<int:venda_id>')
 @login_required
+@condicional('produtos', 'clientes', 'vendas', 'itens_vendidos')
 def api_detalhes_venda(venda_id):
     """API para buscar detalhes completos de uma venda (usada no modal em vendas.html)"""
     try:
@@ -926,242 +1081,119 @@ def api_detalhes_venda(venda_id):
         else:
             return jsonify({'erro': 'Venda não encontrada'}), 404
     except Exception as e:
-        print(f"Erro na API de detalhes de venda: {e}")  # Log de erro
+        log.exception("Erro na API de detalhes de venda: %s", e)
         return jsonify({'erro': 'Erro interno do servidor'}), 500
     
 @app.route('/vendas_filtradas', methods=['POST'])
 @login_required
 def vendas_filtradas():
-    """Filtrar vendas por data e cliente"""
+    """
+    Filtrar vendas por período, cliente, forma de pagamento e produto (no SQL), paginado.
+    Corpo JSON: data_inicio, data_fim, cliente_id, forma_pagamento, produto_id, apos, limite[, html].
+    Os totais do filtro vêm só na primeira página (sem `apos`).
+    """
+    dados = request.get_json(silent=True) or {}
     try:
-        data_inicio = request.json.get('data_inicio')
-        data_fim = request.json.get('data_fim')
-        cliente_id = request.json.get('cliente_id')
-
-        # Obter todas as vendas primeiro
-        todas_vendas = db.get_relatorio_vendas_detalhado()
-        
-        # Aplicar filtros
-        vendas_filtradas = []
-        for venda in todas_vendas:
-            # Filtro por data
-            data_venda = venda.get('data_venda', '')
-            if data_inicio and data_venda:
-                if data_venda.split(' ')[0] < data_inicio:
-                    continue
-            if data_fim and data_venda:
-                if data_venda.split(' ')[0] > data_fim:
-                    continue
-            
-            # Filtro por cliente
-            if cliente_id and str(cliente_id) != '':
-                venda_cliente_id = venda.get('cliente_id')
-                if venda_cliente_id and str(venda_cliente_id) != str(cliente_id):
-                    continue
-            
-            vendas_filtradas.append(venda)
-
-        # Calcular total
-        vendas_agrupadas = {}
-        for venda in vendas_filtradas:
-            venda_id = venda.get('id')
-            if venda_id not in vendas_agrupadas:
-                vendas_agrupadas[venda_id] = venda.get('total', 0.0)
-        
-        total_vendas_valor = sum(vendas_agrupadas.values())
-
-        return jsonify({
-            'success': True,
-            'vendas': vendas_filtradas,
-            'total_vendas_valor': total_vendas_valor,
-            'total_registros': len(vendas_filtradas)
-        })
-    except Exception as e:
-        print(f"Erro ao filtrar vendas: {e}")
+        filtros = {campo: dados.get(campo) or None for campo in db.BUSCA_VENDAS_FILTROS}
+        for campo in ('cliente_id', 'produto_id'):
+            if filtros[campo] is not None:
+                filtros[campo] = int(filtros[campo])
+        limite = db.validar_limite_pagina(dados.get('limite'))
+        pagina = db.buscar_vendas(filtros, apos=dados.get('apos'), limite=limite)
+    except ValueError:
         return jsonify({
             'success': False,
-            'error': str(e),
+            'error': 'Filtros ou cursor de paginação inválidos',
             'vendas': [],
             'total_vendas_valor': 0,
             'total_registros': 0
-        }), 500
+        }), 400
+
+    resposta = {
+        'success': True,
+        'vendas': pagina['vendas'],
+        'proximo': pagina['proximo'],
+    }
+    if pagina['totais'] is not None:
+        resposta.update(pagina['totais'])
+    if dados.get('html'):
+        resposta['html'] = render_template('_linhas_vendas.html', vendas=pagina['vendas'])
+    return jsonify(resposta)
  
 
 @app.route('/recibo/<int:venda_id>')
 @login_required
 def recibo(venda_id):
-    """Gera um PDF de recibo simples para a venda"""
-    venda = db.get_venda_detalhada_por_id(venda_id)
-    if not venda:
+    """Gera um PDF de recibo simples para a venda (servido do cache em disco quando já renderizado)"""
+    conteudo = recibos.obter_recibo(venda_id)
+    if conteudo is None:
         flash("Venda não encontrada para gerar recibo.", 'danger')
         return redirect(url_for('vendas'))
 
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-
-    elements.append(Paragraph("RECIBO DE VENDA", styles['Title']))
-    elements.append(Paragraph(f"Venda #**{venda_id}** | Data: **{venda['data_venda']}**", styles['Normal']))
-    elements.append(Paragraph(f"Cliente: **{venda['cliente_nome'] or 'Cliente Avulso'}**", styles['Normal']))
-    elements.append(Spacer(1, 12))
-
-    elements.append(Paragraph("Itens Vendidos:", styles['Heading2']))
-    data = [['Produto', 'Qtd', 'Preço Unit.', 'Subtotal']]
-    total_recalculado = 0
-    for item in venda['itens']:
-        subtotal = item['quantidade'] * item['preco_unitario']
-        data.append([
-            item['produto_nome'],
-            str(item['quantidade']),
-            f"R$ {item['preco_unitario']:.2f}",
-            f"R$ {subtotal:.2f}"
-        ])
-        total_recalculado += subtotal
-    
-    data.append([Paragraph('**TOTAL DA VENDA**', styles['Heading4']), '', '', Paragraph(f'**R$ {total_recalculado:.2f}**', styles['Heading4'])])
-
-    table = Table(data, colWidths=[200, 50, 100, 100])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.yellow),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(table)
-    elements.append(Spacer(1, 12))
-
-    elements.append(Paragraph("Resumo do Pagamento:", styles['Heading3']))
-    elements.append(Paragraph(f"Forma de Pagamento: **{venda['forma_pagamento']}**", styles['Normal']))
-    if venda.get('forma_pagamento') == 'Dinheiro':
-        elements.append(Paragraph(f"Valor Recebido: **R$ {venda['valor_pago']:.2f}**", styles['Normal']))
-        elements.append(Paragraph(f"Troco: **R$ {venda['troco']:.2f}**", styles['Normal']))
-
-    doc.build(elements)
-    buffer.seek(0)
-    
     return send_file(
-        buffer,
+        io.BytesIO(conteudo),
         mimetype='application/pdf',
         as_attachment=True,
         download_name=f'recibo_venda_{venda_id}.pdf'
     )
 
+@app.route('/debug/recibos')
+@login_required
+def debug_recibos():
+    """Estatísticas do cache de recibos em disco"""
+    return jsonify(recibos.estatisticas_cache())
+
 # ==============================================================================
 # 11. ROTAS DE EXPORTAÇÃO
 # ==============================================================================
 @app.route('/exportar_excel')
 @login_required
 def exportar_excel():
-    """Exportar relatórios para Excel - Produtos e Vendas"""
+    """
+    Exportar relatórios para Excel - Produtos e Vendas.
+    Aceita ?data_inicio=AAAA-MM-DD&data_fim=AAAA-MM-DD para limitar as vendas.
+    A planilha é montada em disco por documentos.gerar_excel_loja, em modo streaming.
+    """
     try:
-        produtos = db.listar_produtos()
-        vendas = db.get_relatorio_vendas_detalhado()
-        
-        df_produtos = pd.DataFrame(produtos)
-        df_vendas = pd.DataFrame(vendas)
-        
-        output = io.BytesIO()
-        
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df_produtos.to_excel(writer, sheet_name='Produtos', index=False)
-            df_vendas.to_excel(writer, sheet_name='Vendas', index=False)
-        
-        output.seek(0)
-        
+        data_inicio = request.args.get('data_inicio') or None
+        data_fim = request.args.get('data_fim') or None
+        db.limites_periodo(data_inicio, data_fim)  # Valida as datas antes de começar
+
+        from Mercadinho_kairos import documentos  # openpyxl só é carregado no primeiro uso
+
+        # Arquivo temporário anônimo: apagado quando o envio termina e o arquivo é fechado
+        arquivo = tempfile.TemporaryFile(suffix='.xlsx')
+        documentos.gerar_excel_loja(arquivo, data_inicio, data_fim)
+        arquivo.seek(0)
+
         return send_file(
-            output,
+            arquivo,
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
             as_attachment=True,
             download_name=f'relatorio_loja_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
         )
         
     except Exception as e:
-        print(f"Erro ao exportar Excel: {e}")  # Log de erro
+        log.exception("Erro ao exportar Excel: %s", e)
         flash(f'Erro ao exportar Excel: {str(e)}', 'error')
         return redirect('/relatorios')
 
 @app.route('/exportar_pdf')
 @login_required
 def exportar_pdf():
-    """Exportar relatórios para PDF - Produtos e Vendas"""
+    """
+    Exportar relatórios para PDF - Produtos e Vendas, gerado dentro da requisição.
+    Para históricos grandes prefira POST /relatorios/jobs, que gera o mesmo PDF em segundo plano.
+    """
     try:
-        produtos = db.listar_produtos()
-        vendas = db.get_relatorio_vendas_detalhado()
-        
+        data_inicio = request.args.get('data_inicio') or None
+        data_fim = request.args.get('data_fim') or None
+        db.limites_periodo(data_inicio, data_fim)  # Valida as datas antes de começar
+
+        from Mercadinho_kairos import documentos  # reportlab só é carregado no primeiro uso
+
         buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        elements.append(Paragraph("Relatório da Loja - Mercadinho Kayrós", styles['Title']))
-        elements.append(Paragraph(f"Data: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
-        elements.append(Spacer(1, 12))
-        
-        if produtos:
-            elements.append(Paragraph("Produtos em Estoque", styles['Heading2']))
-            data = [['ID', 'Nome', 'Preço', 'Quantidade', 'Código']]
-            for produto in produtos:
-                data.append([
-                    str(produto['id']),
-                    produto['nome'],
-                    f"R$ {produto['preco']:.2f}",
-                    str(produto['quantidade']),
-                    produto.get('codigo_barras', 'N/A')
-                ])
-            
-            table = Table(data)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            elements.append(table)
-            elements.append(Spacer(1, 12))
-        
-        if vendas:
-            elements.append(Paragraph("Histórico de Vendas", styles['Heading2']))
-            vendas_agrupadas_total = {}
-            for v in vendas:
-                if v['id'] not in vendas_agrupadas_total:
-                    vendas_agrupadas_total[v['id']] = {
-                        'data': v['data_venda'],
-                        'cliente': v['cliente_nome'] or 'Avulso',
-                        'total': v['total'],
-                        'pagamento': v['forma_pagamento']
-                    }
-            
-            data = [['ID', 'Data', 'Cliente', 'Pagamento', 'Total']]
-            for id, v in vendas_agrupadas_total.items():
-                data.append([
-                    str(id),
-                    v['data'],
-                    v['cliente'],
-                    v['pagamento'],
-                    f"R$ {v['total']:.2f}"
-                ])
-            
-            table = Table(data)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.lightblue),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            elements.append(table)
-        
-        doc.build(elements)
+        documentos.gerar_pdf_loja(buffer, data_inicio, data_fim)
         buffer.seek(0)
         
         return send_file(
@@ -1172,14 +1204,72 @@ def exportar_pdf():
         )
         
     except Exception as e:
-        print(f"Erro ao exportar PDF: {e}")  # Log de erro
+        log.exception("Erro ao exportar PDF: %s", e)
         flash(f'Erro ao exportar PDF: {str(e)}', 'error')
         return redirect('/relatorios')
 
+@app.route('/relatorios/jobs', methods=['GET', 'POST'])
+@login_required
+def relatorios_jobs_api():
+    """POST enfileira um relatório em segundo plano; GET lista os jobs recentes do usuário."""
+    if request.method == 'GET':
+        return jsonify({'success': True, 'jobs': db.listar_jobs_relatorio(current_user.id)})
+
+    dados = request.get_json(silent=True) or request.form
+    tipo = dados.get('tipo', 'pdf_loja')
+    parametros = {
+        'data_inicio': dados.get('data_inicio') or None,
+        'data_fim': dados.get('data_fim') or None,
+    }
+    sucesso, resultado = relatorios_jobs.enviar_job(tipo, parametros, current_user.id)
+    if not sucesso:
+        return jsonify({'success': False, 'message': resultado}), 400
+    return jsonify({
+        'success': True,
+        'job_id': resultado,
+        'status_url': url_for('relatorio_job_status', job_id=resultado),
+        'download_url': url_for('relatorio_job_download', job_id=resultado),
+    }), 202
+
+def _job_do_usuario(job_id):
+    """Busca o job garantindo que pertence ao usuário logado."""
+    job = db.buscar_job_relatorio(job_id)
+    if not job or job['usuario_id'] != current_user.id:
+        return None
+    return job
+
+@app.route('/relatorios/jobs/<job_id>')
+@login_required
+def relatorio_job_status(job_id):
+    """Progresso de um job: status, fração concluída e mensagem."""
+    job = _job_do_usuario(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job não encontrado'}), 404
+    job.pop('arquivo', None)  # Caminho no servidor não vai para o cliente
+    if job['status'] == 'concluido':
+        job['download_url'] = url_for('relatorio_job_download', job_id=job_id)
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/relatorios/jobs/<job_id>/download')
+@login_required
+def relatorio_job_download(job_id):
+    """Entrega o arquivo de um job concluído."""
+    job = _job_do_usuario(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job não encontrado'}), 404
+    arquivo = relatorios_jobs.arquivo_do_job(job)
+    if not arquivo:
+        return jsonify({'success': False, 'message': 'Relatório ainda não está pronto', 'status': job['status']}), 409
+    caminho, mimetype, nome = arquivo
+    return send_file(caminho, mimetype=mimetype, as_attachment=True, download_name=nome)
+
 # ==============================================================================
 # 12. BLOCO DE EXECUÇÃO
 # ==============================================================================
 if __name__ == '__main__':
+    # Log estruturado (JSON) escrito em segundo plano, com request_id em cada registro
+    log_estruturado.configurar_logs()
+
     @app.context_processor
     def inject_template_vars():
         return {
@@ -1188,13 +1278,14 @@ if __name__ == '__main__':
         }
         
     if db.setup_database():
-        print("✅ Banco de dados configurado com sucesso!")
+        db.carregar_indice_produtos()  # Aquece o índice do scan antes do primeiro cliente
     else:
-        print("❌ Erro ao configurar banco de dados!")
+        log.error("Erro ao configurar banco de dados!")
     
     debug_mode = os.environ.get('DEBUG', 'False').lower() == 'true'
     host = os.environ.get('HOST', '127.0.0.1')
     port = int(os.environ.get('PORT', 5000))
     
+    log.info("Servidor iniciando em http://%s:%s", host, port, extra={'debug': debug_mode})
     app.run(host=host, port=port, debug=debug_mode)
 
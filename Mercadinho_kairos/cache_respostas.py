@@ -0,0 +1,103 @@
+# ==============================================================================
+# 1. IMPORTS E CONFIGURAÇÃO
+# ==============================================================================
+import os
+import pickle
+import threading
+from collections import OrderedDict
+import Mercadinho_kairos.logica_banco as db
+
+CACHE_RESPOSTAS_MAX_BYTES = int(os.environ.get('CACHE_RESPOSTAS_MAX_BYTES', 16 * 1024 * 1024))
+
+# ==============================================================================
+# 2. CACHE EM MEMÓRIA (LRU POR GERAÇÃO DOS DADOS)
+# ==============================================================================
+def _tamanho_aproximado(valor):
+    """Bytes ocupados pelo valor, estimados pelo tamanho serializado."""
+    if isinstance(valor, str):
+        return len(valor.encode('utf-8'))
+    return len(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL))
+
+class CacheGeracional:
+    """
+    Resultados de consultas e fragmentos renderizados, válidos enquanto db.geracao_dados()
+    (lida do banco, então vale também para escritas de outros processos) não mudar.
+    Entradas de gerações anteriores são descartadas ao serem lidas; as menos usadas saem
+    quando o total passa de `max_bytes`.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # chave -> (geracao, valor, tamanho), do menos para o mais recente
+        self._total_bytes = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+
+    def obter_ou_calcular(self, chave, calcular):
+        """Retorna o valor em cache da geração atual ou chama `calcular()` e guarda o resultado."""
+        # A geração é lida antes da consulta: se uma escrita acontecer no meio,
+        # o resultado fica guardado com a geração antiga e não será reutilizado.
+        geracao = db.geracao_dados()
+        if geracao is None:
+            return calcular()  # Sem geração não há como saber quando a entrada fica velha
+        chave = (db.DB_NAME, chave)
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[0] == geracao:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return entrada[1]
+            self._remover(chave)
+            self.faltas += 1
+
+        valor = calcular()
+        tamanho = _tamanho_aproximado(valor)
+        if tamanho > self.max_bytes:
+            return valor
+        with self._lock:
+            self._remover(chave)
+            self._entradas[chave] = (geracao, valor, tamanho)
+            self._total_bytes += tamanho
+            while self._total_bytes > self.max_bytes:
+                antiga = next(iter(self._entradas))
+                self._remover(antiga)
+                self.despejos += 1
+        return valor
+
+    def _remover(self, chave):
+        entrada = self._entradas.pop(chave, None)
+        if entrada is not None:
+            self._total_bytes -= entrada[2]
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._total_bytes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                'geracao': db.geracao_dados(),
+                'entradas': len(self._entradas),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'despejos': self.despejos,
+                'taxa_acerto': round(self.acertos / consultas, 4) if consultas else 0.0,
+            }
+
+cache = CacheGeracional(CACHE_RESPOSTAS_MAX_BYTES)
+
+# ==============================================================================
+# 3. API USADA PELAS ROTAS
+# ==============================================================================
+def em_cache(chave, calcular):
+    """Atalho para cache.obter_ou_calcular; `chave` deve identificar a consulta e seus parâmetros."""
+    return cache.obter_ou_calcular(chave, calcular)
+
+def estatisticas_cache():
+    return cache.estatisticas()
@@ -0,0 +1,185 @@
+# ==============================================================================
+# 1. IMPORTS E CONFIGURAÇÃO
+# ==============================================================================
+# Renderização de PDFs e planilhas. Concentra as dependências pesadas (reportlab,
+# openpyxl): app.py, relatorios_jobs e recibos só importam este módulo no primeiro uso.
+import io
+from datetime import datetime
+from openpyxl import Workbook
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib import colors
+import Mercadinho_kairos.logica_banco as db
+
+# Cada Table do reportlab é diagramada inteira de uma vez; tabelas de tamanho fixo
+# com larguras de coluna fixas mantêm o custo de layout linear no número de linhas.
+LINHAS_POR_TABELA = 500
+
+# ==============================================================================
+# 2. PDF DA LOJA (PRODUTOS E VENDAS)
+# ==============================================================================
+ESTILO_PRODUTOS = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+ESTILO_VENDAS = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.lightblue),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+LARGURAS_PRODUTOS = [40, 210, 70, 70, 110]
+LARGURAS_VENDAS = [40, 120, 170, 90, 80]
+
+def _tabelas_em_blocos(cabecalho, linhas, estilo, larguras, ao_avancar=None):
+    """Quebra as linhas em Tables de LINHAS_POR_TABELA, repetindo o cabeçalho em cada página."""
+    bloco = []
+    for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) == LINHAS_POR_TABELA:
+            yield Table([cabecalho] + bloco, colWidths=larguras, repeatRows=1, style=estilo)
+            if ao_avancar:
+                ao_avancar(len(bloco))
+            bloco = []
+    if bloco:
+        yield Table([cabecalho] + bloco, colWidths=larguras, repeatRows=1, style=estilo)
+        if ao_avancar:
+            ao_avancar(len(bloco))
+
+def gerar_pdf_loja(destino, data_inicio=None, data_fim=None, ao_progredir=None):
+    """
+    Monta o relatório de produtos e vendas em `destino` (caminho ou arquivo binário).
+    `ao_progredir(fracao, mensagem)` é chamado a cada bloco de linhas lido do banco.
+    """
+    total_linhas = db.get_resumo_estoque()['total_produtos'] + \
+        db.get_totais_periodo(data_inicio, data_fim)['total_transacoes']
+    lidas = 0
+
+    def avancar(quantidade):
+        nonlocal lidas
+        lidas += quantidade
+        if ao_progredir and total_linhas:
+            # Leitura das linhas vai até 80%; a diagramação final fica com o restante
+            ao_progredir(0.8 * min(lidas / total_linhas, 1.0), f"{lidas} de {total_linhas} linhas lidas")
+
+    doc = SimpleDocTemplate(destino, pagesize=letter)
+    styles = getSampleStyleSheet()
+    elements = [
+        Paragraph("Relatório da Loja - Mercadinho Kayrós", styles['Title']),
+        Paragraph(f"Data: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']),
+        Spacer(1, 12),
+    ]
+
+    produtos = (
+        [str(id), nome, f"R$ {preco:.2f}", str(quantidade), codigo_barras or 'N/A']
+        for id, nome, preco, quantidade, codigo_barras in db.iterar_produtos_exportacao()
+    )
+    tabelas_produtos = list(_tabelas_em_blocos(
+        ['ID', 'Nome', 'Preço', 'Quantidade', 'Código'], produtos, ESTILO_PRODUTOS, LARGURAS_PRODUTOS, avancar
+    ))
+    if tabelas_produtos:
+        elements.append(Paragraph("Produtos em Estoque", styles['Heading2']))
+        elements.extend(tabelas_produtos)
+        elements.append(Spacer(1, 12))
+
+    vendas = (
+        [str(id), data_venda, cliente, forma_pagamento, f"R$ {total:.2f}"]
+        for id, data_venda, cliente, forma_pagamento, total
+        in db.iterar_resumo_vendas_exportacao(data_inicio, data_fim)
+    )
+    tabelas_vendas = list(_tabelas_em_blocos(
+        ['ID', 'Data', 'Cliente', 'Pagamento', 'Total'], vendas, ESTILO_VENDAS, LARGURAS_VENDAS, avancar
+    ))
+    if tabelas_vendas:
+        elements.append(Paragraph("Histórico de Vendas", styles['Heading2']))
+        elements.extend(tabelas_vendas)
+
+    if ao_progredir:
+        ao_progredir(0.8, "Montando o PDF")
+    doc.build(elements)
+
+# ==============================================================================
+# 3. RECIBO DE VENDA
+# ==============================================================================
+_estilos = getSampleStyleSheet()  # Só leitura; montar a folha de estilos a cada recibo é desperdício
+ESTILO_TABELA_RECIBO = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, -1), (-1, -1), colors.yellow),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+def gerar_pdf_recibo(venda):
+    """Renderiza o recibo da venda (dicionário de get_venda_detalhada_por_id) e retorna os bytes do PDF."""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    elements = []
+
+    elements.append(Paragraph("RECIBO DE VENDA", _estilos['Title']))
+    elements.append(Paragraph(f"Venda #**{venda['id']}** | Data: **{venda['data_venda']}**", _estilos['Normal']))
+    elements.append(Paragraph(f"Cliente: **{venda['cliente_nome'] or 'Cliente Avulso'}**", _estilos['Normal']))
+    elements.append(Spacer(1, 12))
+
+    elements.append(Paragraph("Itens Vendidos:", _estilos['Heading2']))
+    data = [['Produto', 'Qtd', 'Preço Unit.', 'Subtotal']]
+    total_recalculado = 0
+    for item in venda['itens']:
+        subtotal = item['quantidade'] * item['preco_unitario']
+        data.append([
+            item['produto_nome'],
+            str(item['quantidade']),
+            f"R$ {item['preco_unitario']:.2f}",
+            f"R$ {subtotal:.2f}"
+        ])
+        total_recalculado += subtotal
+
+    data.append([Paragraph('**TOTAL DA VENDA**', _estilos['Heading4']), '', '', Paragraph(f'**R$ {total_recalculado:.2f}**', _estilos['Heading4'])])
+
+    table = Table(data, colWidths=[200, 50, 100, 100])
+    table.setStyle(ESTILO_TABELA_RECIBO)
+    elements.append(table)
+    elements.append(Spacer(1, 12))
+
+    elements.append(Paragraph("Resumo do Pagamento:", _estilos['Heading3']))
+    elements.append(Paragraph(f"Forma de Pagamento: **{venda['forma_pagamento']}**", _estilos['Normal']))
+    if venda.get('forma_pagamento') == 'Dinheiro':
+        elements.append(Paragraph(f"Valor Recebido: **R$ {venda['valor_pago']:.2f}**", _estilos['Normal']))
+        elements.append(Paragraph(f"Troco: **R$ {venda['troco']:.2f}**", _estilos['Normal']))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+# ==============================================================================
+# 4. PLANILHA EXCEL DA LOJA
+# ==============================================================================
+def gerar_excel_loja(destino, data_inicio=None, data_fim=None):
+    """
+    Grava a planilha de produtos e vendas em `destino` (caminho ou arquivo binário).
+    As linhas vão do cursor direto para o openpyxl em modo write-only, então a
+    memória não cresce com o tamanho do histórico.
+    """
+    workbook = Workbook(write_only=True)
+    aba_produtos = workbook.create_sheet('Produtos')
+    aba_produtos.append(db.COLUNAS_EXPORTACAO_PRODUTOS)
+    for linha in db.iterar_produtos_exportacao():
+        aba_produtos.append(linha)
+
+    aba_vendas = workbook.create_sheet('Vendas')
+    aba_vendas.append(db.COLUNAS_EXPORTACAO_VENDAS)
+    for linha in db.iterar_vendas_exportacao(data_inicio, data_fim):
+        aba_vendas.append(linha)
+
+    workbook.save(destino)
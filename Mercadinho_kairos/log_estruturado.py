@@ -0,0 +1,172 @@
+# ==============================================================================
+# 1. IMPORTS E CONFIGURAÇÃO
+# ==============================================================================
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+import traceback
+import uuid
+from datetime import datetime, timezone
+from flask import g, has_request_context, request
+
+# Nível padrão, níveis por módulo ("Mercadinho_kairos.logica_banco=DEBUG,werkzeug=INFO"),
+# formato (json ou texto) e arquivo de saída (vazio = stderr)
+LOG_NIVEL = os.environ.get('LOG_NIVEL', 'INFO')
+LOG_NIVEIS_MODULOS = os.environ.get('LOG_NIVEIS', '')
+LOG_FORMATO = os.environ.get('LOG_FORMATO', 'json')
+LOG_ARQUIVO = os.environ.get('LOG_ARQUIVO', '')
+
+# O log de acesso do werkzeug é substituído pelo registro estruturado de cada requisição
+NIVEIS_PADRAO_MODULOS = {'werkzeug': 'WARNING'}
+
+# Atributos de todo LogRecord; o que sobrar veio de `extra=` e vai para o JSON
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+log_requisicoes = logging.getLogger('Mercadinho_kairos.requisicoes')
+
+# ==============================================================================
+# 2. FORMATAÇÃO E FILA
+# ==============================================================================
+class FormatadorJSON(logging.Formatter):
+    """Uma linha JSON por registro, com request_id e os campos passados em `extra`."""
+    def format(self, record):
+        dados = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'modulo': record.name,
+            'mensagem': record.getMessage(),
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO and not chave.startswith('_'):
+                dados[chave] = valor
+        if record.exc_info:
+            dados['excecao'] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+class FormatadorTexto(logging.Formatter):
+    """Formato legível para o terminal de desenvolvimento, com os mesmos campos extras."""
+    def format(self, record):
+        extras = {chave: valor for chave, valor in vars(record).items()
+                  if chave not in _ATRIBUTOS_PADRAO and not chave.startswith('_')}
+        linha = (f"{datetime.fromtimestamp(record.created).strftime('%H:%M:%S')} "
+                 f"{record.levelname:<7} {record.name}: {record.getMessage()}")
+        if extras:
+            linha += " " + " ".join(f"{chave}={valor}" for chave, valor in extras.items())
+        if record.exc_info:
+            linha += "\n" + self.formatException(record.exc_info)
+        return linha
+
+class _FiltroRequisicao(logging.Filter):
+    """Anota o id da requisição; roda na thread que gerou o registro, antes de ir para a fila."""
+    def filter(self, record):
+        if has_request_context() and 'request_id' in g:
+            record.request_id = g.request_id
+        return True
+
+class _HandlerFila(logging.handlers.QueueHandler):
+    """
+    Só formata a mensagem antes de enfileirar: o JSON é montado pela thread do
+    QueueListener, e a exceção segue como texto (o traceback não é serializável).
+    """
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.excecao = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+            record.exc_info = None
+            record.exc_text = None
+        record.stack_info = None
+        return record
+
+_listener = None
+_handler_raiz = None
+
+def ler_niveis_modulos(texto):
+    """
+    Converte "modulo=NIVEL,outro=NIVEL" no dicionário de níveis por logger, já com os
+    padrões de NIVEIS_PADRAO_MODULOS. Itens sem '=' ou com nível desconhecido são ignorados.
+    """
+    niveis = dict(NIVEIS_PADRAO_MODULOS)
+    for item in texto.split(','):
+        modulo, separador, nivel = item.partition('=')
+        modulo, nivel = modulo.strip(), nivel.strip().upper()
+        if separador and modulo and isinstance(logging.getLevelName(nivel), int):
+            niveis[modulo] = nivel
+    return niveis
+
+# ==============================================================================
+# 3. API
+# ==============================================================================
+def init_app(app):
+    """
+    Dá um request_id a cada requisição do app e gera um registro de acesso com a duração.
+    Não mexe nos handlers do logger raiz: quem instala a saída é configurar_logs().
+    """
+    app.before_request(_inicio_requisicao)
+    app.after_request(_fim_requisicao)
+
+def configurar_logs(nivel=None, niveis_modulos=None, formato=None, arquivo=None):
+    """
+    Liga o log estruturado no logger raiz: quem chama log.* só enfileira o registro; uma
+    thread (QueueListener) formata e escreve, então um stdout/stderr lento não trava requisições.
+    Chamado na partida do servidor (ou pelo módulo WSGI do deploy), nunca na importação;
+    chamadas repetidas não instalam um segundo handler. Os argumentos omitidos vêm do ambiente.
+    """
+    global _listener, _handler_raiz
+    if _listener is not None:
+        return
+    formato = formato or LOG_FORMATO
+    arquivo = LOG_ARQUIVO if arquivo is None else arquivo
+
+    fila = queue.SimpleQueue()
+    destino = logging.FileHandler(arquivo, encoding='utf-8') if arquivo else logging.StreamHandler(sys.stderr)
+    destino.setFormatter(FormatadorJSON() if formato == 'json' else FormatadorTexto())
+    _handler_raiz = _HandlerFila(fila)
+    _handler_raiz.addFilter(_FiltroRequisicao())
+
+    raiz = logging.getLogger()
+    raiz.addHandler(_handler_raiz)
+    raiz.setLevel((nivel or LOG_NIVEL).upper())
+    niveis = ler_niveis_modulos(LOG_NIVEIS_MODULOS if niveis_modulos is None else niveis_modulos)
+    for modulo, nivel_modulo in niveis.items():
+        logging.getLogger(modulo).setLevel(nivel_modulo)
+
+    _listener = logging.handlers.QueueListener(fila, destino, respect_handler_level=True)
+    _listener.start()
+    atexit.register(encerrar_logs)
+
+def encerrar_logs():
+    """Escreve o que ainda está na fila, para a thread de escrita e tira o handler do logger raiz."""
+    global _listener, _handler_raiz
+    if _listener is not None:
+        logging.getLogger().removeHandler(_handler_raiz)
+        _listener.stop()
+        _listener.handlers[0].close()
+        _listener = _handler_raiz = None
+
+def _inicio_requisicao():
+    # Um id vindo do proxy (X-Request-ID) é mantido para correlacionar os logs dos dois lados
+    g.request_id = request.headers.get('X-Request-ID', '')[:64] or uuid.uuid4().hex[:16]
+    g._log_inicio = time.perf_counter()
+
+def _fim_requisicao(resposta):
+    if '_log_inicio' not in g:
+        return resposta
+    resposta.headers['X-Request-ID'] = g.request_id
+    if log_requisicoes.isEnabledFor(logging.INFO):
+        requisicao = request._get_current_object()
+        log_requisicoes.info("%s %s %s", requisicao.method, requisicao.path, resposta.status_code, extra={
+            'metodo': requisicao.method,
+            'caminho': requisicao.path,
+            'endpoint': requisicao.endpoint,
+            'status': resposta.status_code,
+            'duracao_ms': round((time.perf_counter() - g._log_inicio) * 1000, 2),
+        })
+    return resposta
@@ -3,13 +3,44 @@
 # ==============================================================================
 import sqlite3
 import os
+import threading
+import functools
+import collections
+import logging
+from flask import g, has_app_context
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import re
+import json
+import base64
+import random
+import time
+
+log = logging.getLogger(__name__)
 
 DB_NAME = 'loja.db'
 
+# Pool de conexões: quantas conexões ociosas manter abertas para reutilização
+POOL_TAMANHO_MAX = int(os.environ.get('DB_POOL_TAMANHO', 8))
+DB_BUSY_TIMEOUT_MS = 5000
+
+# Log de consultas lentas: limite em ms (negativo desliga) e quantas ocorrências recentes guardar
+CONSULTA_LENTA_MS = float(os.environ.get('CONSULTA_LENTA_MS', 50))
+CONSULTAS_LENTAS_GUARDADAS = 200
+# Rastro do trace callback nas ocorrências lentas (BEGIN implícito, triggers, scripts).
+# Desligado por padrão: o SQLite expande o SQL de cada comando e trigger, o que custa
+# cerca de 0,25 ms por venda no caixa.
+CONSULTAS_RASTRO = os.environ.get('CONSULTAS_RASTRO', '0') == '1'
+
+# Scan do caixa: por quanto tempo o índice de produtos responde só da memória antes de
+# conferir no banco as escritas de outros processos (commits deste processo o expiram na hora)
+INDICE_PRODUTOS_VERIFICACAO_MS = float(os.environ.get('INDICE_PRODUTOS_VERIFICACAO_MS', 500))
+
+# Paginação por cursor (keyset) das listagens
+PAGINA_TAMANHO_PADRAO = 50
+PAGINA_TAMANHO_MAX = 200
+
 # ==============================================================================
 # 2. CLASSES DE MODELO (Representação de Dados)
 # ==============================================================================
@@ -70,118 +101,895 @@ class Cliente:
 # ==============================================================================
 # 3. CONEXÃO E SETUP DO BANCO DE DADOS
 # ==============================================================================
-def get_db_connection():
-    """Cria e retorna uma conexão com o banco de dados."""
-    conn = sqlite3.connect(DB_NAME)
+def _configurar_conexao(conn):
+    """Aplica as configurações padrão em uma conexão recém-aberta."""
     conn.row_factory = sqlite3.Row  # Permite acessar colunas por nome
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = WAL")  # Leitores não bloqueiam o caixa que está gravando
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
     return conn
 
-def setup_database():
-    """Cria tabelas se não existirem."""
+class PoolConexoes:
+    """Mantém conexões SQLite configuradas para reutilização entre chamadas e requisições."""
+    def __init__(self, db_name, tamanho_max=POOL_TAMANHO_MAX):
+        self.db_name = db_name
+        self.tamanho_max = tamanho_max
+        self._ociosas = []
+        self._lock = threading.Lock()
+        self._stats = {'criadas': 0, 'reutilizadas': 0, 'devolvidas': 0, 'descartadas': 0, 'em_uso': 0}
+
+    def adquirir(self):
+        """Retorna uma conexão ociosa ou abre uma nova se o pool estiver vazio."""
+        with self._lock:
+            self._stats['em_uso'] += 1
+            if self._ociosas:
+                self._stats['reutilizadas'] += 1
+                return self._ociosas.pop()
+            self._stats['criadas'] += 1
+        # A conexão pode ser usada por outra thread depois de devolvida ao pool
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        return _configurar_conexao(conn)
+
+    def devolver(self, conn):
+        """Devolve a conexão ao pool, descartando qualquer transação pendente."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn = None  # Conexão em estado inválido, não reaproveitar
+        with self._lock:
+            self._stats['em_uso'] -= 1
+            if conn is not None and len(self._ociosas) < self.tamanho_max:
+                self._ociosas.append(conn)
+                self._stats['devolvidas'] += 1
+                return
+            self._stats['descartadas'] += 1
+        if conn is not None:
+            conn.close()
+
+    def fechar_todas(self):
+        """Fecha todas as conexões ociosas."""
+        with self._lock:
+            ociosas, self._ociosas = self._ociosas, []
+        for conn in ociosas:
+            conn.close()
+
+    def estatisticas(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['ociosas'] = len(self._ociosas)
+        stats['db_name'] = self.db_name
+        stats['tamanho_max'] = self.tamanho_max
+        return stats
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+def _obter_pool():
+    """Retorna o pool do banco atual (recria se DB_NAME tiver sido alterado)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.db_name != DB_NAME:
+            if _pool is not None:
+                _pool.fechar_todas()
+            _pool = PoolConexoes(DB_NAME)
+        return _pool
+
+# Literais no texto SQL: agrupam variações da mesma consulta e não deixam dados no log
+_RE_LITERAIS_SQL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_RE_ESPACOS = re.compile(r"\s+")
+_PREFIXOS_COM_PLANO = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+_CONSULTAS_DISTINTAS_MAX = 1000
+
+@functools.lru_cache(maxsize=1024)
+def _normalizar_sql(sql):
+    return _RE_ESPACOS.sub(' ', _RE_LITERAIS_SQL.sub('?', sql)).strip()
+
+def _redigir_parametros(parametros):
+    """Troca cada valor pelo seu tipo (e tamanho), para o log não conter dados de clientes."""
+    def redigir(valor):
+        if valor is None:
+            return 'NULL'
+        if isinstance(valor, (str, bytes)):
+            return f"<{type(valor).__name__}:{len(valor)}>"
+        return f"<{type(valor).__name__}>"
+    if isinstance(parametros, dict):
+        return {chave: redigir(valor) for chave, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        return [redigir(valor) for valor in parametros]
+    return '<lote>'  # executemany recebe um iterável de linhas
+
+def _plano_consulta(conn, sql, parametros):
+    """EXPLAIN QUERY PLAN do comando, com a árvore indentada como no shell do sqlite3."""
+    try:
+        linhas = conn.execute("EXPLAIN QUERY PLAN " + sql, parametros).fetchall()
+    except sqlite3.Error as e:
+        return [f"(plano indisponível: {e})"]
+    profundidade = {0: -1}
+    plano = []
+    for linha in linhas:
+        nivel = profundidade.get(linha[1], -1) + 1
+        profundidade[linha[0]] = nivel
+        plano.append("  " * nivel + linha[3])
+    return plano
+
+def _resumir_rastro(rastro, limite=10):
+    """
+    Comandos do trace callback, normalizados e com repetições seguidas agrupadas: cada
+    trigger disparado aparece no rastro com o texto do comando que o disparou.
+    """
+    resumo = []
+    for sql in rastro:
+        sql = _normalizar_sql(sql)
+        if resumo and resumo[-1][0] == sql:
+            resumo[-1][1] += 1
+        elif len(resumo) < limite:
+            resumo.append([sql, 1])
+    return [sql if vezes == 1 else f"{sql} (x{vezes})" for sql, vezes in resumo]
+
+class _ComandoSQL:
+    """Um comando executado: acumula o tempo do execute e das buscas de linhas seguintes."""
+    __slots__ = ('conn', 'tipo', 'sql', 'parametros', 'segundos', 'lento')
+
+    def __init__(self, conn, tipo, args):
+        self.conn = conn
+        self.tipo = tipo
+        self.sql = args[0] if args and isinstance(args[0], str) else tipo.upper()
+        self.parametros = args[1] if len(args) > 1 else ()
+        self.segundos = 0.0
+        self.lento = False
+
+class RegistroConsultas:
+    """
+    Tempo total, execuções e pior caso por consulta (SQL normalizado), e as ocorrências
+    recentes acima de CONSULTA_LENTA_MS com parâmetros redigidos e plano de execução.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_consulta = {}  # sql normalizado -> estatísticas
+        self._lentas = collections.deque(maxlen=CONSULTAS_LENTAS_GUARDADAS)
+
+    def registrar(self, comando, segundos, nova_execucao, rastro):
+        comando.segundos += segundos
+        limite = CONSULTA_LENTA_MS / 1000
+        ficou_lento = limite >= 0 and not comando.lento and comando.segundos >= limite
+        chave = _normalizar_sql(comando.sql)
+        with self._lock:
+            stats = self._por_consulta.get(chave)
+            if stats is None:
+                if len(self._por_consulta) >= _CONSULTAS_DISTINTAS_MAX:
+                    chave = '(outras consultas)'
+                stats = self._por_consulta.setdefault(
+                    chave, {'execucoes': 0, 'segundos': 0.0, 'max_segundos': 0.0, 'lentas': 0, 'plano': None})
+            stats['execucoes'] += 1 if nova_execucao else 0
+            stats['segundos'] += segundos
+            stats['max_segundos'] = max(stats['max_segundos'], comando.segundos)
+            if ficou_lento:
+                comando.lento = True
+                stats['lentas'] += 1
+            precisa_plano = ficou_lento and stats['plano'] is None
+        if not ficou_lento:
+            return
+
+        # Copiado antes do EXPLAIN, que também passaria pelo rastro da conexão
+        rastro = _resumir_rastro(rastro or [])
+        # O plano de cada consulta é obtido uma vez só, fora do lock
+        plano = stats['plano']
+        if precisa_plano:
+            if comando.tipo == 'execute' and chave.upper().startswith(_PREFIXOS_COM_PLANO):
+                plano = _plano_consulta(comando.conn, comando.sql, comando.parametros)
+            else:
+                plano = []
+            stats['plano'] = plano
+        ocorrencia = {
+            'instante': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'ms': round(comando.segundos * 1000, 2),
+            'sql': chave,
+            'parametros': _redigir_parametros(comando.parametros),
+            'plano': plano,
+            'rastro': rastro,
+        }
+        with self._lock:
+            self._lentas.append(ocorrencia)
+        log.warning("Consulta lenta: %.1f ms: %s", ocorrencia['ms'], chave, extra={
+            'duracao_ms': ocorrencia['ms'], 'parametros': ocorrencia['parametros'],
+            'plano': plano, 'rastro': rastro,
+        })
+
+    def mais_custosas(self, limite=30):
+        """Consultas ordenadas pelo tempo total gasto."""
+        with self._lock:
+            itens = [dict(stats, sql=sql) for sql, stats in self._por_consulta.items()]
+        itens.sort(key=lambda item: item['segundos'], reverse=True)
+        for item in itens[:limite]:
+            item['media_ms'] = round(item['segundos'] * 1000 / item['execucoes'], 3) if item['execucoes'] else 0.0
+            item['total_ms'] = round(item.pop('segundos') * 1000, 2)
+            item['max_ms'] = round(item.pop('max_segundos') * 1000, 2)
+        return itens[:limite]
+
+    def lentas_recentes(self):
+        with self._lock:
+            return list(reversed(self._lentas))
+
+    def limpar(self):
+        with self._lock:
+            self._por_consulta.clear()
+            self._lentas.clear()
+
+registro_consultas = RegistroConsultas()
+
+class _Emprestimo:
+    """Conexão retirada do pool e compartilhada pelas chamadas aninhadas de um mesmo escopo."""
+    def __init__(self, pool, conn, escopo_requisicao):
+        self.pool = pool
+        self.conn = conn
+        self.escopo_requisicao = escopo_requisicao
+        self.profundidade = 0
+        self.alteracoes = conn.total_changes  # Para saber se um commit gravou alguma coisa
+        # Comandos SQL executados pelo escopo (requisição ou thread) e o tempo gasto neles
+        self.sql_comandos = 0
+        self.sql_segundos = 0.0
+        # Comandos que o SQLite realmente rodou na operação atual (BEGIN implícito, triggers, scripts)
+        self.rastro = []
+        conn.set_trace_callback(self.rastro.append if CONSULTAS_RASTRO and CONSULTA_LENTA_MS >= 0 else None)
+
+    def medir(self, tipo, operacao, *args):
+        """Executa operacao(*args) medindo o tempo; retorna (resultado, _ComandoSQL)."""
+        self.rastro.clear()
+        comando = _ComandoSQL(self.conn, tipo, args)
+        inicio = time.perf_counter()
+        try:
+            return operacao(*args), comando
+        finally:
+            self.sql_comandos += 1
+            self.acrescentar(comando, time.perf_counter() - inicio, nova_execucao=True)
+
+    def acrescentar(self, comando, segundos, nova_execucao=False):
+        self.sql_segundos += segundos
+        registro_consultas.registrar(comando, segundos, nova_execucao, self.rastro if nova_execucao else None)
+
+    def confirmar_alteracoes(self):
+        """Chamado após cada commit: se a conexão gravou algo, o índice do scan deixa de confiar na memória."""
+        total = self.conn.total_changes
+        if total != self.alteracoes:
+            self.alteracoes = total
+            _expirar_indice_produtos()
+
+    def encerrar(self):
+        """Soma as medições deste escopo aos totais do processo e devolve a conexão ao pool."""
+        _somar_totais_sql(self.sql_comandos, self.sql_segundos)
+        self.conn.set_trace_callback(None)
+        self.pool.devolver(self.conn)
+
+# Totais de comandos SQL do processo (requisições e threads de segundo plano)
+_totais_sql = {'comandos': 0, 'segundos': 0.0}
+_totais_sql_lock = threading.Lock()
+
+def _somar_totais_sql(comandos, segundos):
+    with _totais_sql_lock:
+        _totais_sql['comandos'] += comandos
+        _totais_sql['segundos'] += segundos
+
+def estatisticas_sql():
+    """Retorna os totais de comandos SQL executados e do tempo gasto neles (segundos)."""
+    with _totais_sql_lock:
+        return dict(_totais_sql)
+
+def estatisticas_sql_requisicao():
+    """Comandos SQL e tempo gasto na requisição atual até agora, ou None se ela não usou o banco."""
+    emprestimo = g.get('_emprestimo_db') if has_app_context() else None
+    if emprestimo is None:
+        return None
+    return {'comandos': emprestimo.sql_comandos, 'segundos': emprestimo.sql_segundos}
+
+class _CursorMedido:
+    """Cursor cujos execute/fetch contam no tempo de SQL do empréstimo."""
+    def __init__(self, emprestimo, cursor, comando=None):
+        self._emprestimo = emprestimo
+        self._cursor = cursor
+        self._comando = comando  # Último comando executado, que recebe o tempo das buscas de linhas
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, *args):
+        _, self._comando = self._emprestimo.medir('execute', self._cursor.execute, *args)
+        return self
+
+    def executemany(self, *args):
+        _, self._comando = self._emprestimo.medir('executemany', self._cursor.executemany, *args)
+        return self
+
+    def executescript(self, *args):
+        _, self._comando = self._emprestimo.medir('executescript', self._cursor.executescript, *args)
+        return self
+
+    def _buscar(self, operacao, *args):
+        # Buscar linhas continua a execução da consulta: soma o tempo sem contar outro comando
+        inicio = time.perf_counter()
+        try:
+            return operacao(*args)
+        finally:
+            if self._comando is not None:
+                self._emprestimo.acrescentar(self._comando, time.perf_counter() - inicio)
+
+    def fetchone(self):
+        return self._buscar(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._buscar(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._buscar(self._cursor.fetchall)
+
+class ConexaoDB:
+    """
+    Envoltório da conexão emprestada pelo pool.
+    close() não fecha a conexão física: apenas descarta transações pendentes e,
+    fora de uma requisição Flask, devolve a conexão ao pool.
+    """
+    def __init__(self, emprestimo):
+        self._emprestimo = emprestimo
+        self._fechada = False
+        emprestimo.profundidade += 1
+
+    def __getattr__(self, nome):
+        return getattr(self._emprestimo.conn, nome)
+
+    def cursor(self):
+        return _CursorMedido(self._emprestimo, self._emprestimo.conn.cursor())
+
+    def execute(self, *args):
+        return _CursorMedido(self._emprestimo, *self._emprestimo.medir('execute', self._emprestimo.conn.execute, *args))
+
+    def executemany(self, *args):
+        return _CursorMedido(self._emprestimo, *self._emprestimo.medir('executemany', self._emprestimo.conn.executemany, *args))
+
+    def executescript(self, *args):
+        return _CursorMedido(self._emprestimo, *self._emprestimo.medir('executescript', self._emprestimo.conn.executescript, *args))
+
+    def commit(self):
+        resultado = self._emprestimo.medir('commit', self._emprestimo.conn.commit)[0]
+        self._emprestimo.confirmar_alteracoes()
+        return resultado
+
+    def __enter__(self):
+        return self._emprestimo.conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._emprestimo.conn.__exit__(*exc)
+
+    def close(self):
+        if self._fechada:
+            return
+        self._fechada = True
+        emprestimo = self._emprestimo
+        emprestimo.profundidade -= 1
+        if emprestimo.profundidade > 0:
+            return
+        if emprestimo.escopo_requisicao:
+            # Mantém a conexão com a requisição, mas sem deixar escrita pela metade
+            if emprestimo.conn.in_transaction:
+                emprestimo.conn.rollback()
+        else:
+            _local.emprestimo = None
+            emprestimo.encerrar()
+
+def get_db_connection():
+    """
+    Retorna uma conexão com o banco de dados vinda do pool.
+    Dentro de uma requisição Flask todas as consultas compartilham a mesma conexão (em `g`),
+    devolvida ao pool no teardown. Fora dela, chamadas aninhadas na mesma thread compartilham a conexão.
+    """
+    if has_app_context():
+        emprestimo = g.get('_emprestimo_db')
+        if emprestimo is None:
+            pool = _obter_pool()
+            emprestimo = _Emprestimo(pool, pool.adquirir(), escopo_requisicao=True)
+            g._emprestimo_db = emprestimo
+        return ConexaoDB(emprestimo)
+
+    emprestimo = getattr(_local, 'emprestimo', None)
+    if emprestimo is None:
+        pool = _obter_pool()
+        emprestimo = _Emprestimo(pool, pool.adquirir(), escopo_requisicao=False)
+        _local.emprestimo = emprestimo
+    return ConexaoDB(emprestimo)
+
+def liberar_conexao_requisicao(exception=None):
+    """Devolve ao pool a conexão da requisição atual (registrada como teardown do app)."""
+    emprestimo = g.pop('_emprestimo_db', None)
+    if emprestimo is not None:
+        emprestimo.encerrar()
+
+def init_app(app):
+    """Registra no app Flask a liberação da conexão ao fim de cada requisição."""
+    app.teardown_appcontext(liberar_conexao_requisicao)
+
+def estatisticas_pool():
+    """Retorna os contadores do pool de conexões."""
+    return _obter_pool().estatisticas()
+
+def fechar_pool():
+    """Fecha as conexões ociosas do pool (útil ao encerrar o processo ou trocar de banco)."""
+    _obter_pool().fechar_todas()
+
+def versoes_tabelas():
+    """Retorna {tabela: versao} de TABELAS_VERSIONADAS, ou None se não for possível ler."""
+    conn = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Tabela Usuarios (para autenticação)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL
-            );
-        """)
-        
-        # Tabela Produtos
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS produtos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT NOT NULL,
-                preco REAL NOT NULL,
-                quantidade INTEGER NOT NULL,
-                codigo_barras TEXT UNIQUE
-            );
-        """)
+        return {row['tabela']: row['versao'] for row in conn.execute("SELECT tabela, versao FROM versoes_tabelas")}
+    except Exception as e:
+        log.exception("Erro ao ler versões das tabelas: %s", e)
+        return None
+    finally:
+        if conn:
+            conn.close()
 
-        # Tabela Clientes
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS clientes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT NOT NULL,
-                telefone TEXT,
-                email TEXT,
-                cpf_cnpj TEXT UNIQUE,
-                endereco TEXT
-            );
-        """)
+def geracao_dados():
+    """
+    Geração dos dados da loja: soma das versões em versoes_tabelas, que só crescem e são
+    avançadas por triggers em qualquer escrita, de qualquer processo (outros workers, scripts).
+    Caches de leitura guardam a geração em que foram calculados. Retorna None se não puder ler.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        return conn.execute("SELECT SUM(versao) FROM versoes_tabelas").fetchone()[0]
+    except Exception as e:
+        log.exception("Erro ao ler a geração dos dados: %s", e)
+        return None
+    finally:
+        if conn:
+            conn.close()
 
-        # Tabela Vendas (Transações)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS vendas (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cliente_id INTEGER,
-                data_venda TEXT NOT NULL,
-                total REAL NOT NULL,
-                forma_pagamento TEXT NOT NULL,
-                valor_pago REAL NOT NULL,
-                troco REAL NOT NULL,
-                FOREIGN KEY (cliente_id) REFERENCES clientes (id)
-            );
-        """)
+# Recalcula o resumo diário inteiro a partir de vendas/itens_vendidos (usado no backfill)
+SQL_RECONSTRUIR_VENDAS_DIARIAS = """
+    INSERT INTO vendas_diarias (dia, forma_pagamento, receita, transacoes, itens, troco)
+    SELECT
+        substr(v.data_venda, 1, 10),
+        v.forma_pagamento,
+        SUM(v.total),
+        COUNT(*),
+        COALESCE(SUM(iv.itens), 0),
+        SUM(v.troco)
+    FROM vendas v
+    LEFT JOIN (
+        SELECT venda_id, SUM(quantidade) AS itens FROM itens_vendidos GROUP BY venda_id
+    ) iv ON iv.venda_id = v.id
+    GROUP BY substr(v.data_venda, 1, 10), v.forma_pagamento
+"""
+
+# Estatísticas gerais recalculadas do zero (carga inicial e verificação dos contadores)
+SQL_ESTATISTICAS_RECALCULADAS = """
+    SELECT
+        (SELECT COALESCE(SUM(preco * quantidade), 0) FROM produtos) AS valor_estoque,
+        (SELECT COUNT(*) FROM produtos) AS total_produtos,
+        (SELECT COUNT(*) FROM clientes) AS total_clientes,
+        (SELECT COALESCE(SUM(total), 0) FROM vendas) AS total_vendas_valor,
+        (SELECT COUNT(*) FROM vendas) AS total_transacoes,
+        (SELECT COUNT(*) FROM produtos WHERE quantidade <= 10) AS produtos_estoque_baixo,
+        (SELECT COALESCE(SUM(quantidade), 0) FROM itens_vendidos) AS total_itens_vendidos
+"""
+# Tabelas com versão de alteração mantida por triggers (base das ETags das listagens)
+TABELAS_VERSIONADAS = ['produtos', 'produtos_pesaveis', 'clientes', 'vendas', 'itens_vendidos']
+
+# Marca um produto como alterado no catálogo do PDV, com a próxima versão do catálogo
+SQL_MARCAR_CATALOGO = """
+            UPDATE versoes_tabelas SET versao = versao + 1 WHERE tabela = 'catalogo';
+            INSERT OR REPLACE INTO catalogo_alteracoes (produto_id, versao)
+            VALUES ({produto_id}, (SELECT versao FROM versoes_tabelas WHERE tabela = 'catalogo'));
+"""
+
+CAMPOS_CONTADORES = [
+    'valor_estoque', 'total_produtos', 'total_clientes', 'total_vendas_valor',
+    'total_transacoes', 'produtos_estoque_baixo', 'total_itens_vendidos',
+]
+
+# Migrações numeradas do schema. A versão aplicada fica em PRAGMA user_version;
+# cada migração pendente roda uma única vez, todas na mesma transação.
+MIGRACOES = [
+    (1, "Tabelas iniciais", [
+        """
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS produtos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            preco REAL NOT NULL,
+            quantidade INTEGER NOT NULL,
+            codigo_barras TEXT UNIQUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS clientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            telefone TEXT,
+            email TEXT,
+            cpf_cnpj TEXT UNIQUE,
+            endereco TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS vendas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER,
+            data_venda TEXT NOT NULL,
+            total REAL NOT NULL,
+            forma_pagamento TEXT NOT NULL,
+            valor_pago REAL NOT NULL,
+            troco REAL NOT NULL,
+            FOREIGN KEY (cliente_id) REFERENCES clientes (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS itens_vendidos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            venda_id INTEGER NOT NULL,
+            produto_id INTEGER NOT NULL,
+            quantidade INTEGER NOT NULL,
+            preco_unitario REAL NOT NULL,
+            FOREIGN KEY (venda_id) REFERENCES vendas (id) ON DELETE CASCADE,
+            FOREIGN KEY (produto_id) REFERENCES produtos (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS produtos_pesaveis (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            produto_id INTEGER NOT NULL,
+            preco_por_kg REAL NOT NULL,
+            codigo_personalizado TEXT UNIQUE,
+            FOREIGN KEY (produto_id) REFERENCES produtos (id) ON DELETE CASCADE
+        )
+        """,
+    ]),
+    (2, "Índices secundários para joins de relatórios e listagens", [
+        "CREATE INDEX IF NOT EXISTS idx_itens_vendidos_venda ON itens_vendidos (venda_id)",
+        "CREATE INDEX IF NOT EXISTS idx_itens_vendidos_produto ON itens_vendidos (produto_id)",
+        "CREATE INDEX IF NOT EXISTS idx_vendas_data ON vendas (data_venda)",
+        "CREATE INDEX IF NOT EXISTS idx_vendas_cliente ON vendas (cliente_id)",
+        "CREATE INDEX IF NOT EXISTS idx_produtos_nome ON produtos (nome)",
+        "CREATE INDEX IF NOT EXISTS idx_clientes_nome ON clientes (nome)",
+        "CREATE INDEX IF NOT EXISTS idx_produtos_pesaveis_produto ON produtos_pesaveis (produto_id)",
+    ]),
+    (3, "Normaliza data_venda para texto ISO ordenável", [
+        # Garante o formato 'AAAA-MM-DD HH:MM:SS' em vendas antigas para os filtros por faixa
+        """
+        UPDATE vendas SET data_venda = strftime('%Y-%m-%d %H:%M:%S', data_venda)
+        WHERE strftime('%Y-%m-%d %H:%M:%S', data_venda) IS NOT NULL
+          AND data_venda != strftime('%Y-%m-%d %H:%M:%S', data_venda)
+        """,
+    ]),
+    (4, "Busca textual de produtos (FTS5) sincronizada por triggers", [
+        # remove_diacritics: "acuc" encontra "Açúcar"
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS produtos_fts USING fts5(
+            nome, codigo_barras,
+            content='produtos', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS produtos_fts_ai AFTER INSERT ON produtos BEGIN
+            INSERT INTO produtos_fts (rowid, nome, codigo_barras) VALUES (new.id, new.nome, new.codigo_barras);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS produtos_fts_ad AFTER DELETE ON produtos BEGIN
+            INSERT INTO produtos_fts (produtos_fts, rowid, nome, codigo_barras)
+            VALUES ('delete', old.id, old.nome, old.codigo_barras);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS produtos_fts_au AFTER UPDATE OF nome, codigo_barras ON produtos BEGIN
+            INSERT INTO produtos_fts (produtos_fts, rowid, nome, codigo_barras)
+            VALUES ('delete', old.id, old.nome, old.codigo_barras);
+            INSERT INTO produtos_fts (rowid, nome, codigo_barras) VALUES (new.id, new.nome, new.codigo_barras);
+        END
+        """,
+        "INSERT INTO produtos_fts (produtos_fts) VALUES ('rebuild')",
+    ]),
+    (5, "Resumo diário de vendas por forma de pagamento", [
+        """
+        CREATE TABLE IF NOT EXISTS vendas_diarias (
+            dia TEXT NOT NULL,
+            forma_pagamento TEXT NOT NULL,
+            receita REAL NOT NULL DEFAULT 0,
+            transacoes INTEGER NOT NULL DEFAULT 0,
+            itens REAL NOT NULL DEFAULT 0,
+            troco REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (dia, forma_pagamento)
+        ) WITHOUT ROWID
+        """,
+        "DELETE FROM vendas_diarias",
+        SQL_RECONSTRUIR_VENDAS_DIARIAS,
+    ]),
+    (6, "Contadores do dashboard mantidos por triggers", [
+        """
+        CREATE TABLE IF NOT EXISTS contadores (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            valor_estoque REAL NOT NULL DEFAULT 0,
+            total_produtos INTEGER NOT NULL DEFAULT 0,
+            total_clientes INTEGER NOT NULL DEFAULT 0,
+            total_vendas_valor REAL NOT NULL DEFAULT 0,
+            total_transacoes INTEGER NOT NULL DEFAULT 0,
+            produtos_estoque_baixo INTEGER NOT NULL DEFAULT 0,
+            total_itens_vendidos REAL NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT OR REPLACE INTO contadores (id, " + ", ".join(CAMPOS_CONTADORES) + ") "
+        "SELECT 1, * FROM (" + SQL_ESTATISTICAS_RECALCULADAS + ")",
+        # Produtos: quantidade, valor do estoque e estoque baixo (<= 10)
+        """
+        CREATE TRIGGER IF NOT EXISTS contadores_produtos_ai AFTER INSERT ON produtos BEGIN
+            UPDATE contadores SET
+                total_produtos = total_produtos + 1,
+                valor_estoque = valor_estoque + new.preco * new.quantidade,
+                produtos_estoque_baixo = produtos_estoque_baixo + (new.quantidade <= 10)
+            WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS contadores_produtos_ad AFTER DELETE ON produtos BEGIN
+            UPDATE contadores SET
+                total_produtos = total_produtos - 1,
+                valor_estoque = valor_estoque - old.preco * old.quantidade,
+                produtos_estoque_baixo = produtos_estoque_baixo - (old.quantidade <= 10)
+            WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS contadores_produtos_au AFTER UPDATE OF preco, quantidade ON produtos BEGIN
+            UPDATE contadores SET
+                valor_estoque = valor_estoque + new.preco * new.quantidade - old.preco * old.quantidade,
+                produtos_estoque_baixo = produtos_estoque_baixo + (new.quantidade <= 10) - (old.quantidade <= 10)
+            WHERE id = 1;
+        END
+        """,
+        # Clientes
+        """
+        CREATE TRIGGER IF NOT EXISTS contadores_clientes_ai AFTER INSERT ON clientes BEGIN
+            UPDATE contadores SET total_clientes = total_clientes + 1 WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS contadores_clientes_ad AFTER DELETE ON clientes BEGIN
+            UPDATE contadores SET total_clientes = total_clientes - 1 WHERE id = 1;
+        END
+        """,
+        # Vendas
+        """
+        CREATE TRIGGER IF NOT EXISTS contadores_vendas_ai AFTER INSERT ON vendas BEGIN
+            UPDATE contadores SET
+                total_transacoes = total_transacoes + 1,
+                total_vendas_valor = total_vendas_valor + new.total
+            WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS contadores_vendas_ad AFTER DELETE ON vendas BEGIN
+            UPDATE contadores SET
+                total_transacoes = total_transacoes - 1,
+                total_vendas_valor = total_vendas_valor - old.total
+            WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS contadores_vendas_au AFTER UPDATE OF total ON vendas BEGIN
+            UPDATE contadores SET total_vendas_valor = total_vendas_valor + new.total - old.total WHERE id = 1;
+        END
+        """,
+        # Itens vendidos
+        """
+        CREATE TRIGGER IF NOT EXISTS contadores_itens_ai AFTER INSERT ON itens_vendidos BEGIN
+            UPDATE contadores SET total_itens_vendidos = total_itens_vendidos + new.quantidade WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS contadores_itens_ad AFTER DELETE ON itens_vendidos BEGIN
+            UPDATE contadores SET total_itens_vendidos = total_itens_vendidos - old.quantidade WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS contadores_itens_au AFTER UPDATE OF quantidade ON itens_vendidos BEGIN
+            UPDATE contadores SET
+                total_itens_vendidos = total_itens_vendidos + new.quantidade - old.quantidade
+            WHERE id = 1;
+        END
+        """,
+    ]),
+    (7, "Fila de relatórios gerados em segundo plano", [
+        """
+        CREATE TABLE IF NOT EXISTS relatorio_jobs (
+            id TEXT PRIMARY KEY,
+            tipo TEXT NOT NULL,
+            parametros TEXT NOT NULL DEFAULT '{}',
+            usuario_id INTEGER,
+            status TEXT NOT NULL DEFAULT 'pendente',
+            progresso REAL NOT NULL DEFAULT 0,
+            mensagem TEXT,
+            arquivo TEXT,
+            criado_em TEXT NOT NULL DEFAULT (datetime('now')),
+            concluido_em TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_relatorio_jobs_usuario ON relatorio_jobs(usuario_id, criado_em)",
+    ]),
+    (8, "Índice composto de vendas por cliente e data para a busca de vendas", [
+        # Filtra por cliente já na ordem de data_venda; substitui o índice só por cliente
+        "CREATE INDEX IF NOT EXISTS idx_vendas_cliente_data ON vendas (cliente_id, data_venda)",
+        "DROP INDEX IF EXISTS idx_vendas_cliente",
+    ]),
+    (9, "Versões de alteração por tabela (ETags e GET condicional)", [
+        """
+        CREATE TABLE IF NOT EXISTS versoes_tabelas (
+            tabela TEXT PRIMARY KEY,
+            versao INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """,
+        # Começa em um valor aleatório: um banco recriado não repete ETags de um banco anterior
+        *[f"INSERT OR IGNORE INTO versoes_tabelas (tabela, versao) VALUES ('{tabela}', abs(random() % 1000000000))"
+          for tabela in TABELAS_VERSIONADAS],
+        *[f"""
+        CREATE TRIGGER IF NOT EXISTS versao_{tabela}_{sufixo} AFTER {evento} ON {tabela} BEGIN
+            UPDATE versoes_tabelas SET versao = versao + 1 WHERE tabela = '{tabela}';
+        END
+        """ for tabela in TABELAS_VERSIONADAS
+            for sufixo, evento in (('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE'))],
+    ]),
+    (10, "Versões do catálogo do PDV por produto (sincronização incremental)", [
+        """
+        CREATE TABLE IF NOT EXISTS catalogo_alteracoes (
+            produto_id INTEGER PRIMARY KEY,
+            versao INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_catalogo_alteracoes_versao ON catalogo_alteracoes (versao)",
+        # 'catalogo_base' guarda a versão inicial: cursores anteriores a ela pedem o catálogo completo
+        "INSERT OR IGNORE INTO versoes_tabelas (tabela, versao) VALUES ('catalogo', abs(random() % 1000000000))",
+        "INSERT OR IGNORE INTO versoes_tabelas (tabela, versao) "
+        "SELECT 'catalogo_base', versao FROM versoes_tabelas WHERE tabela = 'catalogo'",
+        # Estoque (quantidade) fica de fora: muda a cada venda e o caixa não precisa dele para o scan
+        "CREATE TRIGGER IF NOT EXISTS catalogo_produtos_ai AFTER INSERT ON produtos BEGIN"
+        + SQL_MARCAR_CATALOGO.format(produto_id='new.id') + "END",
+        "CREATE TRIGGER IF NOT EXISTS catalogo_produtos_au AFTER UPDATE OF nome, preco, codigo_barras ON produtos BEGIN"
+        + SQL_MARCAR_CATALOGO.format(produto_id='new.id') + "END",
+        "CREATE TRIGGER IF NOT EXISTS catalogo_produtos_ad AFTER DELETE ON produtos BEGIN"
+        + SQL_MARCAR_CATALOGO.format(produto_id='old.id') + "END",
+        "CREATE TRIGGER IF NOT EXISTS catalogo_pesaveis_ai AFTER INSERT ON produtos_pesaveis BEGIN"
+        + SQL_MARCAR_CATALOGO.format(produto_id='new.produto_id') + "END",
+        "CREATE TRIGGER IF NOT EXISTS catalogo_pesaveis_au AFTER UPDATE ON produtos_pesaveis BEGIN"
+        + SQL_MARCAR_CATALOGO.format(produto_id='old.produto_id')
+        + SQL_MARCAR_CATALOGO.format(produto_id='new.produto_id') + "END",
+        "CREATE TRIGGER IF NOT EXISTS catalogo_pesaveis_ad AFTER DELETE ON produtos_pesaveis BEGIN"
+        + SQL_MARCAR_CATALOGO.format(produto_id='old.produto_id') + "END",
+    ]),
+    (11, "Identificador externo de vendas enviadas em lote pelos caixas", [
+        # Gerado pelo caixa: reenviar o mesmo lote não duplica vendas
+        "ALTER TABLE vendas ADD COLUMN id_externo TEXT",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_vendas_id_externo ON vendas (id_externo) WHERE id_externo IS NOT NULL",
+    ]),
+    (12, "Processo dono de cada job de relatório", [
+        # Com vários workers, só os jobs de um processo que já morreu são dados como interrompidos
+        "ALTER TABLE relatorio_jobs ADD COLUMN dono_pid INTEGER",
+        "ALTER TABLE relatorio_jobs ADD COLUMN dono_processo TEXT",
+    ]),
+    (13, "Versão dos contadores corrigidos por verificar_contadores", [
+        "INSERT OR IGNORE INTO versoes_tabelas (tabela, versao) VALUES ('contadores', abs(random() % 1000000000))",
+    ]),
+]
+
+def versao_schema(conn):
+    """Retorna a versão do schema gravada no banco (PRAGMA user_version)."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def aplicar_migracoes(conn):
+    """Aplica as migrações pendentes em uma única transação e retorna as versões aplicadas."""
+    versao_atual = versao_schema(conn)
+    pendentes = [m for m in MIGRACOES if m[0] > versao_atual]
+    if not pendentes:
+        return []
 
-        # Tabela ItensVendidos (Detalhes da Venda)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS itens_vendidos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                venda_id INTEGER NOT NULL,
-                produto_id INTEGER NOT NULL,
-                quantidade INTEGER NOT NULL,
-                preco_unitario REAL NOT NULL,
-                FOREIGN KEY (venda_id) REFERENCES vendas (id) ON DELETE CASCADE,
-                FOREIGN KEY (produto_id) REFERENCES produtos (id)
-            );
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS produtos_pesaveis (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                produto_id INTEGER NOT NULL,
-                preco_por_kg REAL NOT NULL,
-                codigo_personalizado TEXT UNIQUE,
-                FOREIGN KEY (produto_id) REFERENCES produtos (id) ON DELETE CASCADE
-            );
-        """)
-        
-        # Tabela Produtos Pesáveis
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS produtos_pesaveis (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                produto_id INTEGER NOT NULL,
-                preco_por_kg REAL NOT NULL,
-                codigo_personalizado TEXT UNIQUE,
-                FOREIGN KEY (produto_id) REFERENCES produtos (id) ON DELETE CASCADE
-            );
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS produtos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT NOT NULL,
-                preco REAL NOT NULL,
-                quantidade INTEGER NOT NULL,
-                codigo_barras TEXT UNIQUE
-            );
-        """)
-        
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        for versao, descricao, comandos in pendentes:
+            for comando in comandos:
+                cursor.execute(comando)
+            log.info("Migração %s aplicada: %s", versao, descricao)
+        # PRAGMA não aceita parâmetros; a versão vem da lista MIGRACOES
+        cursor.execute(f"PRAGMA user_version = {int(pendentes[-1][0])}")
         conn.commit()
-        print("Banco de dados configurado com sucesso.")  # Log de sucesso
+    except Exception:
+        conn.rollback()
+        raise
+    return [m[0] for m in pendentes]
+
+def setup_database():
+    """Cria as tabelas e aplica as migrações pendentes do schema."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        aplicar_migracoes(conn)
+        log.info("Banco de dados configurado com sucesso.")
         return True
     except Exception as e:
-        print(f"Erro ao configurar o banco de dados: {e}")
+        log.exception("Erro ao configurar o banco de dados: %s", e)
         return False
     finally:
         if conn:
             conn.close()
 
+# Consultas quentes e os índices que cada uma precisa usar
+CONSULTAS_VERIFICADAS = [
+    ("itens de uma venda",
+     "SELECT produto_id, quantidade FROM itens_vendidos WHERE venda_id = ?", (1,),
+     ["idx_itens_vendidos_venda"]),
+    ("itens vendidos para um cliente",
+     """SELECT v.id, iv.quantidade, p.nome FROM vendas v
+        JOIN itens_vendidos iv ON v.id = iv.venda_id
+        JOIN produtos p ON iv.produto_id = p.id
+        LEFT JOIN clientes c ON v.cliente_id = c.id
+        WHERE v.cliente_id = ?""", (1,),
+     ["idx_vendas_cliente_data", "idx_itens_vendidos_venda"]),
+    ("busca de vendas de um cliente no período",
+     """SELECT v.id FROM vendas v
+        WHERE v.cliente_id = ? AND v.data_venda >= ? AND v.data_venda < ?
+        ORDER BY v.data_venda DESC, v.id DESC LIMIT 51""", (1, '2024-01-01 00:00:00', '2024-02-01 00:00:00'),
+     ["idx_vendas_cliente_data"]),
+    ("vendas por período",
+     """SELECT v.id, iv.quantidade FROM vendas v
+        JOIN itens_vendidos iv ON v.id = iv.venda_id
+        WHERE v.data_venda >= ? AND v.data_venda < ?
+        ORDER BY v.data_venda DESC, v.id DESC""", ('2024-01-01 00:00:00', '2024-01-02 00:00:00'),
+     ["idx_vendas_data", "idx_itens_vendidos_venda"]),
+    ("vendas de um produto",
+     "SELECT venda_id FROM itens_vendidos WHERE produto_id = ?", (1,),
+     ["idx_itens_vendidos_produto"]),
+    ("listagem de produtos",
+     "SELECT * FROM produtos ORDER BY nome ASC", (),
+     ["idx_produtos_nome"]),
+    ("listagem de clientes",
+     "SELECT * FROM clientes ORDER BY nome ASC", (),
+     ["idx_clientes_nome"]),
+]
+
+def verificar_indices():
+    """
+    Confere via EXPLAIN QUERY PLAN se as consultas quentes usam os índices esperados.
+    Retorna (tudo_ok, relatorio) onde relatorio lista consulta, plano e status.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        relatorio = []
+        for nome, sql, params, indices in CONSULTAS_VERIFICADAS:
+            plano = [row['detail'] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            texto_plano = " | ".join(plano)
+            faltando = [idx for idx in indices if idx not in texto_plano]
+            relatorio.append({
+                'consulta': nome,
+                'plano': plano,
+                'ok': not faltando,
+                'indices_faltando': faltando,
+            })
+        return all(r['ok'] for r in relatorio), relatorio
+    finally:
+        if conn:
+            conn.close()
+
 # ==============================================================================
 # 4. FUNÇÕES DE AUTENTICAÇÃO (User)
 # ==============================================================================
@@ -210,7 +1018,7 @@ def add_user(username, password):
     except sqlite3.IntegrityError:
         return False, "Nome de usuário já existe."
     except Exception as e:
-        print(f"Erro ao adicionar usuário: {e}")
+        log.exception("Erro ao adicionar usuário: %s", e)
         return False, "Erro interno ao cadastrar usuário."
     finally:
         if conn:
@@ -228,7 +1036,7 @@ def get_user_by_username(username):
             return User(user_data['id'], user_data['username'], user_data['password_hash'])
         return None
     except Exception as e:
-        print(f"Erro ao buscar usuário por nome: {e}")
+        log.exception("Erro ao buscar usuário por nome: %s", e)
         return None
     finally:
         if conn:
@@ -246,7 +1054,7 @@ def get_user_by_id(user_id):
             return User(user_data['id'], user_data['username'], user_data['password_hash'])
         return None
     except Exception as e:
-        print(f"Erro ao buscar usuário por ID: {e}")
+        log.exception("Erro ao buscar usuário por ID: %s", e)
         return None
     finally:
         if conn:
@@ -275,9 +1083,256 @@ def validar_quantidade(quantidade_str):
     except ValueError:
         return False, 0
 
+def validar_limite_pagina(limite_str):
+    """Converte o tamanho de página pedido, limitado a PAGINA_TAMANHO_MAX."""
+    try:
+        limite = int(limite_str) if limite_str not in (None, '') else PAGINA_TAMANHO_PADRAO
+    except (TypeError, ValueError):
+        return PAGINA_TAMANHO_PADRAO
+    return max(1, min(limite, PAGINA_TAMANHO_MAX))
+
+def codificar_cursor(*chave):
+    """Gera o cursor opaco (base64 de JSON) com a chave de ordenação do último item da página."""
+    return base64.urlsafe_b64encode(json.dumps(chave).encode()).decode().rstrip('=')
+
+def decodificar_cursor(cursor, tamanho):
+    """Inverso de codificar_cursor; levanta ValueError se o cursor for inválido."""
+    try:
+        chave = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Cursor de paginação inválido.")
+    if not isinstance(chave, list) or len(chave) != tamanho:
+        raise ValueError("Cursor de paginação inválido.")
+    return chave
+
 # ==============================================================================
 # 6. FUNÇÕES DE PRODUTOS
 # ==============================================================================
+class IndiceProdutos:
+    """
+    Índice em memória usado no scan do caixa: código de barras, código personalizado
+    e ID numérico -> registro compacto do produto (o mesmo dict de buscar_produto_por_codigo).
+    Guarda as versões (versoes_tabelas, mantidas por triggers) em que foi lido. Por até
+    INDICE_PRODUTOS_VERIFICACAO_MS depois da última conferência, ou até um commit deste processo,
+    as buscas respondem só da memória; depois, uma consulta confere as versões e aplica as
+    alterações de catalogo_alteracoes feitas por qualquer processo. O estoque não muda a versão
+    do catálogo: se a versão de 'produtos' andou, o estoque de todos os produtos é relido.
+    """
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self.versao = None  # (catalogo_base, catalogo) do snapshot aplicado
+        self._versao_estoque = None  # Versão de 'produtos' em que o estoque foi lido
+        self._verificado_em = None  # time.monotonic() da última conferência com o banco
+        self._expiracoes = 0
+        self._lock = threading.Lock()
+        self._por_barras = {}
+        self._por_personalizado = {}
+        self._por_id = {}
+        self._personalizados_por_id = {}  # produto_id -> códigos personalizados (para remoção pontual)
+        self._stats = {'acertos': 0, 'falhas': 0, 'verificacoes': 0, 'cargas_completas': 0,
+                       'recargas_parciais': 0, 'recargas_estoque': 0}
+
+    @staticmethod
+    def _registro_produto(row):
+        return {
+            'id': row['id'],
+            'nome': row['nome'],
+            'preco': row['preco'],
+            'quantidade': row['quantidade'],
+            'codigo_barras': row['codigo_barras'],
+            'pesavel': False
+        }
+
+    @staticmethod
+    def _registro_pesavel(row):
+        return {
+            'id': row['produto_id'],
+            'nome': row['nome'],
+            'preco_por_kg': row['preco_por_kg'],
+            'codigo_personalizado': row['codigo_personalizado'],
+            'quantidade': row['quantidade'],
+            'pesavel': True
+        }
+
+    @staticmethod
+    def _versoes(conn):
+        """Versão atual do catálogo (catalogo_base, catalogo) e a da tabela produtos (muda com o estoque)."""
+        row = conn.execute("""
+            SELECT
+                (SELECT versao FROM versoes_tabelas WHERE tabela = 'catalogo_base'),
+                (SELECT versao FROM versoes_tabelas WHERE tabela = 'catalogo'),
+                (SELECT versao FROM versoes_tabelas WHERE tabela = 'produtos')
+        """).fetchone()
+        return (row[0], row[1]), row[2]
+
+    def _consultar(self, conn, ids=None):
+        filtro_produtos = filtro_pesaveis = ""
+        params = ()
+        if ids is not None:
+            marcadores = ",".join("?" * len(ids))
+            filtro_produtos = f"WHERE id IN ({marcadores})"
+            filtro_pesaveis = f"AND pp.produto_id IN ({marcadores})"
+            params = tuple(ids)
+        produtos = conn.execute(
+            f"SELECT id, nome, preco, quantidade, codigo_barras FROM produtos {filtro_produtos}", params
+        ).fetchall()
+        pesaveis = conn.execute(f"""
+            SELECT pp.produto_id, pp.preco_por_kg, pp.codigo_personalizado, p.nome, p.quantidade
+            FROM produtos_pesaveis pp
+            JOIN produtos p ON pp.produto_id = p.id
+            WHERE pp.codigo_personalizado IS NOT NULL {filtro_pesaveis}
+        """, params).fetchall()
+        return produtos, pesaveis
+
+    def _inserir(self, produtos, pesaveis):
+        for row in produtos:
+            registro = self._registro_produto(row)
+            self._por_id[registro['id']] = registro
+            if registro['codigo_barras']:
+                self._por_barras[registro['codigo_barras']] = registro
+        for row in pesaveis:
+            self._por_personalizado[row['codigo_personalizado']] = self._registro_pesavel(row)
+            self._personalizados_por_id.setdefault(row['produto_id'], []).append(row['codigo_personalizado'])
+
+    def _remover(self, produto_id):
+        antigo = self._por_id.pop(produto_id, None)
+        if antigo and self._por_barras.get(antigo['codigo_barras']) is antigo:
+            del self._por_barras[antigo['codigo_barras']]
+        for codigo in self._personalizados_por_id.pop(produto_id, []):
+            self._por_personalizado.pop(codigo, None)
+
+    def _atualizar_estoque(self, estoques):
+        for produto_id, quantidade in estoques:
+            registro = self._por_id.get(produto_id)
+            if registro is not None:
+                registro['quantidade'] = quantidade
+            for codigo in self._personalizados_por_id.get(produto_id, ()):
+                self._por_personalizado[codigo]['quantidade'] = quantidade
+
+    def em_dia(self):
+        """Verdadeiro se a última conferência com o banco ainda vale e nenhum commit deste processo a expirou."""
+        verificado = self._verificado_em
+        return verificado is not None and (time.monotonic() - verificado) * 1000 < INDICE_PRODUTOS_VERIFICACAO_MS
+
+    def expirar(self):
+        """Faz a próxima busca conferir o banco (chamado após commits que gravaram algo)."""
+        with self._lock:
+            self._expiracoes += 1
+            self._verificado_em = None
+
+    def sincronizar(self, conn):
+        """
+        Confere as versões no banco e traz o índice para a versão atual do catálogo: só os produtos
+        de catalogo_alteracoes posteriores à versão do índice, ou tudo se ele nunca foi carregado ou
+        o banco foi recriado. Se a versão de 'produtos' andou, relê também o estoque.
+        """
+        inicio = time.monotonic()
+        expiracoes = self._expiracoes
+        atual, estoque_atual = self.versao, self._versao_estoque
+        ids = produtos = pesaveis = estoques = None
+        abriu = not conn.in_transaction
+        if abriu:
+            conn.execute("BEGIN")  # Versões e linhas lidas do mesmo snapshot
+        try:
+            versao, versao_estoque = self._versoes(conn)
+            completa = atual is None or atual[0] != versao[0] or atual[1] > versao[1]
+            if completa:
+                produtos, pesaveis = self._consultar(conn)
+            else:
+                if atual != versao:
+                    ids = [row[0] for row in conn.execute(
+                        "SELECT produto_id FROM catalogo_alteracoes WHERE versao > ?", (atual[1],))]
+                    produtos, pesaveis = self._consultar(conn, ids)
+                if estoque_atual != versao_estoque:
+                    estoques = conn.execute("SELECT id, quantidade FROM produtos").fetchall()
+        finally:
+            if abriu:
+                conn.commit()
+
+        with self._lock:
+            self._stats['verificacoes'] += 1
+            # Outra thread pode ter aplicado um snapshot mais novo enquanto este era lido
+            if self.versao != atual or self._versao_estoque != estoque_atual:
+                return
+            if completa:
+                self._por_barras, self._por_personalizado, self._por_id = {}, {}, {}
+                self._personalizados_por_id = {}
+                self._stats['cargas_completas'] += 1
+            elif ids is not None:
+                for produto_id in ids:
+                    self._remover(produto_id)
+                self._stats['recargas_parciais'] += 1
+            if produtos is not None:
+                self._inserir(produtos, pesaveis)
+            if estoques is not None:
+                self._atualizar_estoque((row[0], row[1]) for row in estoques)
+                self._stats['recargas_estoque'] += 1
+            self.versao, self._versao_estoque = versao, versao_estoque
+            # Um commit durante a leitura pode não estar no snapshot: a próxima busca confere de novo
+            if self._expiracoes == expiracoes:
+                self._verificado_em = inicio
+
+    def buscar(self, termo):
+        """
+        Busca só na memória, com a mesma precedência da busca SQL: código de barras, código
+        personalizado, ID. Quem chama sincroniza antes se em_dia() for falso.
+        """
+        with self._lock:
+            registro = self._por_barras.get(termo) or self._por_personalizado.get(termo)
+            # isascii: str.isdigit aceita dígitos Unicode ('²') que int() não converte
+            if registro is None and termo.isascii() and termo.isdigit():
+                registro = self._por_id.get(int(termo))
+            self._stats['acertos' if registro else 'falhas'] += 1
+            return dict(registro) if registro else None
+
+    def estatisticas(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['codigos_barras'] = len(self._por_barras)
+            stats['codigos_personalizados'] = len(self._por_personalizado)
+            stats['produtos'] = len(self._por_id)
+            stats['versao_catalogo'] = self.versao[1] if self.versao else None
+        stats['db_name'] = self.db_name
+        return stats
+
+_indice_produtos = None
+_indice_lock = threading.Lock()
+
+def carregar_indice_produtos():
+    """Carrega (ou recarrega) o índice de códigos de produtos; chamado na inicialização do app."""
+    global _indice_produtos
+    conn = None
+    try:
+        conn = get_db_connection()
+        indice = IndiceProdutos(DB_NAME)
+        indice.sincronizar(conn)
+        with _indice_lock:
+            _indice_produtos = indice
+        return indice
+    except Exception as e:
+        log.exception("Erro ao carregar índice de produtos: %s", e)
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def _obter_indice_produtos():
+    """Retorna o índice do banco atual, carregando-o na primeira busca."""
+    indice = _indice_produtos
+    if indice is None or indice.db_name != DB_NAME:
+        indice = carregar_indice_produtos()
+    return indice
+
+def _expirar_indice_produtos():
+    indice = _indice_produtos
+    if indice is not None:
+        indice.expirar()
+
+def estatisticas_indice_produtos():
+    """Retorna os contadores do índice de códigos de produtos (vazio se ainda não carregado)."""
+    indice = _indice_produtos
+    return indice.estatisticas() if indice else {}
+
 def adicionar_produto(nome, preco, quantidade, codigo_barras, preco_por_kg=None):
     """Adiciona um novo produto ao banco de dados, incluindo o preço por KG se for produto pesável."""
     conn = None
@@ -304,7 +1359,7 @@ def adicionar_produto(nome, preco, quantidade, codigo_barras, preco_por_kg=None)
     except sqlite3.IntegrityError:
         return False, "Código de barras já existe."
     except Exception as e:
-        print(f"Erro ao adicionar produto: {e}")
+        log.exception("Erro ao adicionar produto: %s", e)
         return False, f"Erro ao adicionar produto: {e}"
     finally:
         if conn:
@@ -329,7 +1384,7 @@ def atualizar_produto(id, nome, preco, quantidade, codigo_barras):
     except sqlite3.IntegrityError:
         return False, "Código de barras já existe ou duplicado."
     except Exception as e:
-        print(f"Erro ao atualizar produto: {e}")
+        log.exception("Erro ao atualizar produto: %s", e)
         return False, f"Erro ao atualizar produto: {e}"
     finally:
         if conn:
@@ -350,7 +1405,7 @@ def excluir_produto(id):
         else:
             return False, "Produto não encontrado."
     except Exception as e:
-        print(f"Erro ao excluir produto: {e}")
+        log.exception("Erro ao excluir produto: %s", e)
         return False, f"Erro ao excluir produto: {e}"
     finally:
         if conn:
@@ -376,12 +1431,84 @@ def listar_produtos():
         ]
         return produtos_lista
     except Exception as e:
-        print(f"Erro ao listar produtos: {e}")
+        log.exception("Erro ao listar produtos: %s", e)
         return []
     finally:
         if conn:
             conn.close()
 
+def listar_produtos_pagina(apos=None, limite=PAGINA_TAMANHO_PADRAO):
+    """
+    Lista uma página de produtos ordenados por (nome, id), a partir do cursor `apos`.
+    Retorna {'produtos': [...], 'proximo': cursor ou None}. Levanta ValueError se o cursor for inválido.
+    """
+    params = []
+    filtro = ""
+    if apos:
+        filtro = "WHERE (nome, id) > (?, ?)"
+        params.extend(decodificar_cursor(apos, 2))
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        # Busca um item a mais para saber se existe próxima página
+        cursor.execute(
+            f"SELECT id, nome, preco, quantidade, codigo_barras FROM produtos {filtro} ORDER BY nome, id LIMIT ?",
+            params + [limite + 1]
+        )
+        produtos_data = cursor.fetchall()
+        
+        produtos_lista = [
+            Produto(
+                id=p['id'],
+                nome=p['nome'],
+                preco=p['preco'],
+                quantidade=p['quantidade'],
+                codigo_barras=p['codigo_barras']
+            ).to_dict() for p in produtos_data[:limite]
+        ]
+        proximo = None
+        if len(produtos_data) > limite:
+            ultimo = produtos_lista[-1]
+            proximo = codificar_cursor(ultimo['nome'], ultimo['id'])
+        return {'produtos': produtos_lista, 'proximo': proximo}
+    except sqlite3.Error as e:
+        log.exception("Erro ao listar página de produtos: %s", e)
+        return {'produtos': [], 'proximo': None}
+    finally:
+        if conn:
+            conn.close()
+
+def get_resumo_estoque():
+    """Contagens e valor do estoque calculados no banco (sem carregar o catálogo)."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT
+                COUNT(*) AS total_produtos,
+                COALESCE(SUM(quantidade > 0), 0) AS produtos_com_estoque,
+                COALESCE(SUM(quantidade > 0 AND quantidade <= 5), 0) AS produtos_estoque_baixo,
+                COALESCE(SUM(quantidade <= 0), 0) AS produtos_sem_estoque,
+                COALESCE(SUM(preco * quantidade), 0) AS valor_estoque
+            FROM produtos
+        """)
+        return dict(cursor.fetchone())
+    except Exception as e:
+        log.exception("Erro ao calcular resumo do estoque: %s", e)
+        return {
+            'total_produtos': 0,
+            'produtos_com_estoque': 0,
+            'produtos_estoque_baixo': 0,
+            'produtos_sem_estoque': 0,
+            'valor_estoque': 0.0,
+        }
+    finally:
+        if conn:
+            conn.close()
+
 def buscar_produto_por_id(id):
     """Busca um produto pelo ID."""
     conn = None
@@ -401,7 +1528,7 @@ def buscar_produto_por_id(id):
             ).to_dict()
         return None
     except Exception as e:
-        print(f"Erro ao buscar produto por ID: {e}")
+        log.exception("Erro ao buscar produto por ID: %s", e)
         return None
     finally:
         if conn:
@@ -409,10 +1536,21 @@ def buscar_produto_por_id(id):
 
 
 def buscar_produto_por_codigo(termo):
-    """Busca produto por código de barras (exato) ou código personalizado (exato)."""
+    """
+    Busca produto por código de barras (exato) ou código personalizado (exato).
+    Responde pelo índice em memória, sem consultar o banco enquanto a última conferência estiver
+    em dia (IndiceProdutos.em_dia); as consultas abaixo só rodam se ele não puder ser carregado.
+    """
+    indice = _obter_indice_produtos()
+    if indice is not None and indice.em_dia():
+        return indice.buscar(termo)
     conn = None
     try:
         conn = get_db_connection()
+        if indice is not None:
+            indice.sincronizar(conn)
+            return indice.buscar(termo)
+
         cursor = conn.cursor()
         
         # 1. Primeiro tenta buscar por Código de Barras exato
@@ -452,27 +1590,42 @@ def buscar_produto_por_codigo(termo):
         return None
     except Exception as e:
         # Se um erro de banco de dados ocorrer aqui, ele é capturado e logado.
-        print(f"Erro na busca de produto por código: {e}")
+        log.exception("Erro na busca de produto por código: %s", e)
         return None
     finally:
         if conn:
             conn.close()
             
 
-def buscar_produtos_por_nome(termo):
-    """Busca produtos por nome parcial ou código de barras parcial/exato (retorna lista)."""
+BUSCA_LIMITE_PADRAO = 20
+
+def _consulta_fts(termo):
+    """Monta a expressão MATCH com prefixo em cada palavra, sem repassar a sintaxe do FTS5 ao usuário."""
+    palavras = re.findall(r'\w+', termo or '')
+    return " ".join(f'"{p}"*' for p in palavras)
+
+def buscar_produtos_por_nome(termo, limite=BUSCA_LIMITE_PADRAO):
+    """
+    Busca produtos por nome parcial ou código de barras parcial (retorna lista).
+    Usa o índice FTS5 (prefixo, sem acentos, ordenado por relevância bm25) e retorna no máximo `limite`.
+    """
+    consulta = _consulta_fts(termo)
+    if not consulta:
+        return []
+
     conn = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Busca por nome OU código de barras
-        termo_like = f'%{termo}%'
+        # Peso maior para o nome do que para o código de barras
         cursor.execute("""
-            SELECT * FROM produtos 
-            WHERE nome LIKE ? OR codigo_barras LIKE ?
-            ORDER BY nome ASC
-        """, (termo_like, termo_like))
+            SELECT p.* FROM produtos_fts
+            JOIN produtos p ON p.id = produtos_fts.rowid
+            WHERE produtos_fts MATCH ?
+            ORDER BY bm25(produtos_fts, 10.0, 1.0), p.nome ASC
+            LIMIT ?
+        """, (consulta, limite))
         
         produtos_data = cursor.fetchall()
         
@@ -487,7 +1640,7 @@ def buscar_produtos_por_nome(termo):
         ]
         return produtos_lista
     except Exception as e:
-        print(f"Erro na busca de produtos por nome: {e}")
+        log.exception("Erro na busca de produtos por nome: %s", e)
         return []
     finally:
         if conn:
@@ -507,6 +1660,74 @@ def buscar_produto_por_codigo_personalizado(termo):
     conn.close()
     return produto            
 
+# Catálogo compacto do PDV: uma linha por produto, na ordem de CAMPOS_CATALOGO.
+# 'pesaveis' é uma lista de [codigo_personalizado, preco_por_kg].
+CAMPOS_CATALOGO = ['id', 'nome', 'preco', 'codigo_barras', 'pesavel', 'pesaveis']
+
+SQL_CATALOGO = """
+    SELECT p.id, p.nome, p.preco, p.codigo_barras,
+           (SELECT json_group_array(json_array(pp.codigo_personalizado, pp.preco_por_kg))
+            FROM produtos_pesaveis pp
+            WHERE pp.produto_id = p.id AND pp.codigo_personalizado IS NOT NULL) AS pesaveis
+"""
+
+def _linha_catalogo(row):
+    pesaveis = json.loads(row['pesaveis'])
+    return [row['id'], row['nome'], row['preco'], row['codigo_barras'], bool(pesaveis), pesaveis]
+
+def get_catalogo_pdv(desde=None):
+    """
+    Catálogo do PDV com a versão atual. Sem `desde` (ou se ele for anterior ao início do
+    controle de versões) retorna tudo com 'completo': True; senão só os produtos alterados
+    depois de `desde`, e em 'removidos' os IDs excluídos. Levanta ValueError se `desde` for inválido.
+    """
+    if desde is not None:
+        desde = int(desde)
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        abriu = not conn.in_transaction  # Na conexão da requisição pode já haver uma transação aberta
+        if abriu:
+            cursor.execute("BEGIN")  # Versão e linhas lidas do mesmo snapshot
+        versoes = {
+            row['tabela']: row['versao'] for row in cursor.execute(
+                "SELECT tabela, versao FROM versoes_tabelas WHERE tabela IN ('catalogo', 'catalogo_base')"
+            )
+        }
+        versao = versoes['catalogo']
+        completo = desde is None or not (versoes['catalogo_base'] <= desde <= versao)
+
+        if completo:
+            cursor.execute(SQL_CATALOGO + " FROM produtos p ORDER BY p.id")
+            produtos, removidos = [_linha_catalogo(row) for row in cursor.fetchall()], []
+        else:
+            cursor.execute(SQL_CATALOGO + """, ca.produto_id
+                FROM catalogo_alteracoes ca
+                LEFT JOIN produtos p ON p.id = ca.produto_id
+                WHERE ca.versao > ?
+                ORDER BY ca.produto_id
+            """, (desde,))
+            produtos, removidos = [], []
+            for row in cursor.fetchall():
+                if row['id'] is None:
+                    removidos.append(row['produto_id'])
+                else:
+                    produtos.append(_linha_catalogo(row))
+        if abriu:
+            conn.commit()
+        return {
+            'versao': versao,
+            'completo': completo,
+            'campos': CAMPOS_CATALOGO,
+            'produtos': produtos,
+            'removidos': removidos,
+        }
+    finally:
+        if conn:
+            conn.close()
+
 # ==============================================================================
 # 7. FUNÇÕES PARA PRODUTOS PESÁVEIS
 # ==============================================================================
@@ -561,7 +1782,7 @@ def buscar_produto_pesavel_por_codigo(codigo):
             }
         return None
     except Exception as e:
-        print(f"Erro ao buscar produto pesável: {e}")
+        log.exception("Erro ao buscar produto pesável: %s", e)
         return None
     finally:
         if conn:
@@ -586,7 +1807,7 @@ def listar_produtos_pesaveis():
         produtos = cursor.fetchall()
         return [dict(produto) for produto in produtos]
     except Exception as e:
-        print(f"Erro ao listar produtos pesáveis: {e}")
+        log.exception("Erro ao listar produtos pesáveis: %s", e)
         return []
     finally:
         if conn:
@@ -620,7 +1841,7 @@ def listar_produtos_para_associar():
             })
         return produtos
     except Exception as e:
-        print(f"Erro ao listar produtos para associação: {e}")
+        log.exception("Erro ao listar produtos para associação: %s", e)
         return []
     finally:
         if conn:
@@ -633,13 +1854,15 @@ def excluir_produto_pesavel(id_pesavel):
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        cursor.execute("SELECT produto_id FROM produtos_pesaveis WHERE id=?", (id_pesavel,))
+        associacao = cursor.fetchone()
         cursor.execute("DELETE FROM produtos_pesaveis WHERE id=?", (id_pesavel,))
         conn.commit()
         if cursor.rowcount > 0:
             return True, "Produto pesável excluído com sucesso."
         return False, "Associação de produto pesável não encontrada."
     except Exception as e:
-        print(f"Erro ao excluir produto pesável: {e}")
+        log.exception("Erro ao excluir produto pesável: %s", e)
         return False, f"Erro ao excluir produto pesável: {e}"
     finally:
         if conn:
@@ -669,12 +1892,68 @@ def listar_clientes():
         ]
         return clientes_lista
     except Exception as e:
-        print(f"Erro ao listar clientes: {e}")
+        log.exception("Erro ao listar clientes: %s", e)
         return []
     finally:
         if conn:
             conn.close()
             
+def listar_clientes_pagina(apos=None, limite=PAGINA_TAMANHO_PADRAO):
+    """
+    Lista uma página de clientes ordenados por (nome, id), a partir do cursor `apos`.
+    Retorna {'clientes': [...], 'proximo': cursor ou None}. Levanta ValueError se o cursor for inválido.
+    """
+    params = []
+    filtro = ""
+    if apos:
+        filtro = "WHERE (nome, id) > (?, ?)"
+        params.extend(decodificar_cursor(apos, 2))
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT * FROM clientes {filtro} ORDER BY nome, id LIMIT ?",
+            params + [limite + 1]
+        )
+        clientes_data = cursor.fetchall()
+        
+        clientes_lista = [
+            Cliente(
+                id=c['id'],
+                nome=c['nome'],
+                telefone=c['telefone'],
+                email=c['email'],
+                cpf_cnpj=c['cpf_cnpj'],
+                endereco=c['endereco']
+            ).to_dict() for c in clientes_data[:limite]
+        ]
+        proximo = None
+        if len(clientes_data) > limite:
+            ultimo = clientes_lista[-1]
+            proximo = codificar_cursor(ultimo['nome'], ultimo['id'])
+        return {'clientes': clientes_lista, 'proximo': proximo}
+    except sqlite3.Error as e:
+        log.exception("Erro ao listar página de clientes: %s", e)
+        return {'clientes': [], 'proximo': None}
+    finally:
+        if conn:
+            conn.close()
+
+def contar_clientes():
+    """Retorna o total de clientes cadastrados."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        return conn.execute("SELECT COUNT(*) FROM clientes").fetchone()[0]
+    except Exception as e:
+        log.exception("Erro ao contar clientes: %s", e)
+        return 0
+    finally:
+        if conn:
+            conn.close()
+
 def buscar_cliente_por_id(id):
     """Busca um cliente pelo ID."""
     conn = None
@@ -695,7 +1974,7 @@ def buscar_cliente_por_id(id):
             ).to_dict()
         return None
     except Exception as e:
-        print(f"Erro ao buscar cliente por ID: {e}")
+        log.exception("Erro ao buscar cliente por ID: %s", e)
         return None
     finally:
         if conn:
@@ -721,7 +2000,7 @@ def adicionar_cliente(nome, telefone, email, cpf_cnpj, endereco):
         conn.commit()
         return True, "Cliente adicionado com sucesso."
     except Exception as e:
-        print(f"Erro ao adicionar cliente: {e}")
+        log.exception("Erro ao adicionar cliente: %s", e)
         return False, f"Erro ao adicionar cliente: {e}"
     finally:
         if conn:
@@ -750,7 +2029,7 @@ def atualizar_cliente(id, nome, telefone, email, cpf_cnpj, endereco):
         else:
             return False, "Cliente não encontrado."
     except Exception as e:
-        print(f"Erro ao atualizar cliente: {e}")
+        log.exception("Erro ao atualizar cliente: %s", e)
         return False, f"Erro ao atualizar cliente: {e}"
     finally:
         if conn:
@@ -771,7 +2050,7 @@ def excluir_cliente(id):
         else:
             return False, "Cliente não encontrado."
     except Exception as e:
-        print(f"Erro ao excluir cliente: {e}")
+        log.exception("Erro ao excluir cliente: %s", e)
         return False, f"Erro ao excluir cliente: {e}"
     finally:
         if conn:
@@ -780,52 +2059,359 @@ def excluir_cliente(id):
 # ==============================================================================
 # 9. FUNÇÕES DE VENDAS (PDV)
 # ==============================================================================
+FORMATO_DATA_VENDA = '%Y-%m-%d %H:%M:%S'  # Mesmo formato de datetime('now') do SQLite (UTC)
+
+def limites_periodo(data_inicio=None, data_fim=None):
+    """
+    Converte datas 'AAAA-MM-DD' (inclusivas) nos limites do intervalo semiaberto
+    [inicio, fim_exclusivo) comparável diretamente com vendas.data_venda.
+    """
+    inicio = fim_exclusivo = None
+    if data_inicio:
+        inicio = datetime.strptime(data_inicio, '%Y-%m-%d').strftime(FORMATO_DATA_VENDA)
+    if data_fim:
+        dia_seguinte = datetime.strptime(data_fim, '%Y-%m-%d') + timedelta(days=1)
+        fim_exclusivo = dia_seguinte.strftime(FORMATO_DATA_VENDA)
+    return inicio, fim_exclusivo
+
 # ...existing code...
-def registrar_venda_completa(cliente_id, itens_carrinho, total, forma_pagamento, valor_pago, troco):
-    """Registrar venda completa no banco de dados"""
+VENDA_TENTATIVAS = 4          # Tentativas quando o banco está ocupado por outro caixa
+VENDA_BACKOFF_INICIAL = 0.05  # Segundos; dobra a cada nova tentativa
+
+class EstoqueInsuficiente(Exception):
+    """Algum item do carrinho deixaria o estoque negativo (ou o produto não existe)."""
+    def __init__(self, faltas):
+        self.faltas = faltas
+        descricao = ", ".join(
+            f"{f['nome']} (disponível {f['disponivel']}, pedido {f['pedido']})" for f in faltas
+        )
+        super().__init__(f"Estoque insuficiente para: {descricao}")
+
+def _normalizar_itens_venda(itens_carrinho):
+    """Converte os itens do carrinho em tuplas (produto_id, quantidade, preco_unitario)."""
+    itens = []
+    for item in itens_carrinho:
+        quantidade = float(item.get('quantidade', 1))
+        if quantidade <= 0:
+            raise ValueError(f"Quantidade inválida para o produto {item.get('id')}.")
+        if quantidade.is_integer():
+            quantidade = int(quantidade)
+        itens.append((int(item.get('id')), quantidade, float(item.get('preco', 0))))
+    return itens
+
+def _banco_ocupado(erro):
+    """Indica se o erro é SQLITE_BUSY/LOCKED (outro caixa segurando a escrita)."""
+    mensagem = str(erro).lower()
+    return 'database is locked' in mensagem or 'database is busy' in mensagem
+
+def _acumular_vendas_diarias(cursor, venda_id, sinal):
+    """Soma (sinal=1) ou subtrai (sinal=-1) uma venda do resumo diário, na transação do cursor."""
+    cursor.execute("""
+        INSERT INTO vendas_diarias (dia, forma_pagamento, receita, transacoes, itens, troco)
+        SELECT
+            substr(v.data_venda, 1, 10),
+            v.forma_pagamento,
+            :sinal * v.total,
+            :sinal,
+            :sinal * COALESCE((SELECT SUM(quantidade) FROM itens_vendidos WHERE venda_id = v.id), 0),
+            :sinal * v.troco
+        FROM vendas v
+        WHERE v.id = :venda_id
+        ON CONFLICT (dia, forma_pagamento) DO UPDATE SET
+            receita = receita + excluded.receita,
+            transacoes = transacoes + excluded.transacoes,
+            itens = itens + excluded.itens,
+            troco = troco + excluded.troco
+    """, {'venda_id': venda_id, 'sinal': sinal})
+    if sinal < 0:
+        cursor.execute("DELETE FROM vendas_diarias WHERE transacoes <= 0")
+
+def reconstruir_vendas_diarias():
+    """Recalcula todo o resumo diário a partir das vendas (backfill ou correção de divergências)."""
     conn = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        # 1. Registrar a venda principal
-        query_venda = """
-        INSERT INTO vendas (cliente_id, total, forma_pagamento, valor_pago, troco, data_venda)
-        VALUES (?, ?, ?, ?, ?, datetime('now'))
-        """
-        cursor.execute(query_venda, (cliente_id, total, forma_pagamento, valor_pago, troco))
-        venda_id = cursor.lastrowid
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("DELETE FROM vendas_diarias")
+        cursor.execute(SQL_RECONSTRUIR_VENDAS_DIARIAS)
+        linhas = cursor.rowcount
+        conn.commit()
+        return True, f"Resumo diário reconstruído ({linhas} linhas)."
+    except Exception as e:
+        if conn and conn.in_transaction:
+            conn.rollback()
+        log.exception("Erro ao reconstruir resumo diário: %s", e)
+        return False, f"Erro ao reconstruir resumo diário: {e}"
+    finally:
+        if conn:
+            conn.close()
 
-        # 2. Registrar os itens da venda
-        query_item = """
+def get_totais_periodo(data_inicio=None, data_fim=None):
+    """Totais de vendas do período (datas 'AAAA-MM-DD' inclusivas) lidos do resumo diário."""
+    query = """
+        SELECT
+            COALESCE(SUM(receita), 0) AS total_vendas_valor,
+            COALESCE(SUM(transacoes), 0) AS total_transacoes,
+            COALESCE(SUM(itens), 0) AS total_itens_vendidos,
+            COALESCE(SUM(troco), 0) AS total_troco
+        FROM vendas_diarias
+        WHERE 1=1
+    """
+    params = []
+    if data_inicio:
+        query += " AND dia >= ?"
+        params.append(data_inicio)
+    if data_fim:
+        query += " AND dia <= ?"
+        params.append(data_fim)
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        totais = dict(conn.execute(query, params).fetchone())
+        totais['total_vendas_valor'] = round(totais['total_vendas_valor'], 2)
+        totais['total_troco'] = round(totais['total_troco'], 2)
+        return totais
+    except Exception as e:
+        log.exception("Erro ao obter totais do período: %s", e)
+        return {'total_vendas_valor': 0.0, 'total_transacoes': 0, 'total_itens_vendidos': 0, 'total_troco': 0.0}
+    finally:
+        if conn:
+            conn.close()
+
+def _gravar_venda(cursor, cliente_id, itens, total, forma_pagamento, valor_pago, troco,
+                  data_venda=None, id_externo=None):
+    """
+    Grava cabeçalho, itens e baixa de estoque de uma venda na transação já aberta do cursor.
+    Levanta EstoqueInsuficiente sem desfazer nada: quem abriu a transação decide o rollback.
+    """
+    # 1. Registrar a venda principal (data do caixa, se veio de um lote offline)
+    cursor.execute("""
+        INSERT INTO vendas (cliente_id, total, forma_pagamento, valor_pago, troco, data_venda, id_externo)
+        VALUES (?, ?, ?, ?, ?, COALESCE(?, datetime('now')), ?)
+    """, (cliente_id, total, forma_pagamento, valor_pago, troco, data_venda, id_externo))
+    venda_id = cursor.lastrowid
+
+    # 2. Registrar os itens da venda
+    cursor.executemany("""
         INSERT INTO itens_vendidos (venda_id, produto_id, quantidade, preco_unitario)
         VALUES (?, ?, ?, ?)
-        """
+    """, [(venda_id, produto_id, quantidade, preco) for produto_id, quantidade, preco in itens])
 
-        # 3. Atualizar estoque
-        query_estoque = "UPDATE produtos SET quantidade = quantidade - ? WHERE id = ?"
+    # 3. Baixa de estoque em um único UPDATE; linhas que ficariam negativas não são alteradas
+    baixas = {}
+    for produto_id, quantidade, _ in itens:
+        baixas[produto_id] = baixas.get(produto_id, 0) + quantidade
+    cursor.execute("""
+        WITH baixa (produto_id, quantidade) AS (
+            SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?)
+        )
+        UPDATE produtos SET quantidade = produtos.quantidade - baixa.quantidade
+        FROM baixa
+        WHERE produtos.id = baixa.produto_id AND produtos.quantidade >= baixa.quantidade
+        RETURNING produtos.id
+    """, (json.dumps(list(baixas.items())),))
+    baixados = {row[0] for row in cursor.fetchall()}
+
+    if len(baixados) != len(baixas):
+        nao_baixados = [produto_id for produto_id in baixas if produto_id not in baixados]
+        marcadores = ",".join("?" * len(nao_baixados))
+        cursor.execute(f"SELECT id, nome, quantidade FROM produtos WHERE id IN ({marcadores})", nao_baixados)
+        encontrados = {row['id']: row for row in cursor.fetchall()}
+        faltas = []
+        for produto_id in nao_baixados:
+            row = encontrados.get(produto_id)
+            faltas.append({
+                'produto_id': produto_id,
+                'nome': row['nome'] if row else f"Produto #{produto_id} inexistente",
+                'disponivel': row['quantidade'] if row else 0,
+                'pedido': baixas[produto_id],
+            })
+        raise EstoqueInsuficiente(faltas)
 
-        for item in itens_carrinho:
-            produto_id = item.get('id')
-            quantidade = item.get('quantidade', 1)
-            preco_unitario = item.get('preco', 0)
+    # 4. Resumo diário atualizado na mesma transação
+    _acumular_vendas_diarias(cursor, venda_id, 1)
 
-            # Registrar item
-            cursor.execute(query_item, (venda_id, produto_id, quantidade, preco_unitario))
+    return venda_id
 
-            # Atualizar estoque
-            cursor.execute(query_estoque, (quantidade, produto_id))
+def registrar_venda_completa(cliente_id, itens_carrinho, total, forma_pagamento, valor_pago, troco):
+    """
+    Registrar venda completa no banco de dados.
+    Tudo roda em uma transação BEGIN IMMEDIATE: ou a venda entra com todos os itens e a baixa
+    de estoque, ou nada é gravado. Se outro caixa estiver gravando, tenta de novo com backoff.
+    Levanta EstoqueInsuficiente (com a lista em `faltas`) se algum item não tiver estoque:
+    é uma recusa prevista, não um erro do banco.
+    """
+    try:
+        itens = _normalizar_itens_venda(itens_carrinho)
+    except (TypeError, ValueError) as e:
+        return None, f"Erro ao registrar venda: itens inválidos ({e})"
 
-        conn.commit()
-        print(f"DEBUG: Venda #{venda_id} registrada com sucesso!")
-        return venda_id, "Venda registrada com sucesso."
-    except Exception as e:
-        if conn:
+    inicio = time.perf_counter()
+    for tentativa in range(VENDA_TENTATIVAS):
+        conn = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            venda_id = _gravar_venda(
+                cursor, cliente_id, itens, total, forma_pagamento, valor_pago, troco
+            )
+            conn.commit()
+            log.debug("Venda #%s registrada com sucesso!", venda_id, extra={
+                'venda_id': venda_id, 'itens': len(itens), 'tentativas': tentativa + 1,
+                'duracao_ms': round((time.perf_counter() - inicio) * 1000, 2),
+            })
+            return venda_id, "Venda registrada com sucesso."
+        except EstoqueInsuficiente:
             conn.rollback()
-        print(f"ERRO AO REGISTRAR VENDA: {e}")
-        return None, f"Erro ao registrar venda: {str(e)}"
-    finally:
-        if conn:
-            conn.close()
+            raise
+        except sqlite3.OperationalError as e:
+            if conn and conn.in_transaction:
+                conn.rollback()
+            if _banco_ocupado(e) and tentativa < VENDA_TENTATIVAS - 1:
+                espera = VENDA_BACKOFF_INICIAL * (2 ** tentativa) * (1 + random.random())
+                log.debug("Banco ocupado ao registrar venda, nova tentativa em %.2fs", espera)
+                time.sleep(espera)
+                continue
+            log.exception("ERRO AO REGISTRAR VENDA: %s", e)
+            return None, f"Erro ao registrar venda: {str(e)}"
+        except Exception as e:
+            if conn and conn.in_transaction:
+                conn.rollback()
+            log.exception("ERRO AO REGISTRAR VENDA: %s", e)
+            return None, f"Erro ao registrar venda: {str(e)}"
+        finally:
+            if conn:
+                conn.close()
+
+LOTE_VENDAS_MAX = 1000       # Vendas aceitas em uma chamada de registrar_vendas_lote
+LOTE_VENDAS_TRANSACAO = 100  # Vendas gravadas por transação (um commit por bloco)
+
+def _normalizar_venda_lote(venda):
+    """Valida uma venda do lote e retorna os argumentos de _gravar_venda. Levanta ValueError."""
+    if not isinstance(venda, dict):
+        raise ValueError("venda deve ser um objeto")
+    if not venda.get('itens'):
+        raise ValueError("venda sem itens")
+    if not venda.get('forma_pagamento'):
+        raise ValueError("forma de pagamento obrigatória")
+    try:
+        itens = _normalizar_itens_venda(venda['itens'])
+        total = float(venda['total'])
+        valor_pago = float(venda['valor_pago']) if venda.get('valor_pago') is not None else total
+        troco = float(venda.get('troco') or 0)
+        cliente_id = int(venda['cliente_id']) if venda.get('cliente_id') else None
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"campos inválidos ({e})")
+
+    data_venda = None
+    if venda.get('data_venda'):
+        try:
+            data = datetime.fromisoformat(str(venda['data_venda']))
+        except ValueError:
+            raise ValueError("data_venda inválida (use ISO 8601)")
+        if data.tzinfo is not None:  # Gravada em UTC, como datetime('now')
+            data = data.astimezone(timezone.utc).replace(tzinfo=None)
+        data_venda = data.strftime(FORMATO_DATA_VENDA)
+
+    id_externo = venda.get('id_externo')
+    if id_externo is not None:
+        id_externo = str(id_externo).strip()
+        if not id_externo or len(id_externo) > 64:
+            raise ValueError("id_externo inválido (1 a 64 caracteres)")
+
+    return {
+        'cliente_id': cliente_id, 'itens': itens, 'total': total,
+        'forma_pagamento': str(venda['forma_pagamento']), 'valor_pago': valor_pago, 'troco': troco,
+        'data_venda': data_venda, 'id_externo': id_externo,
+    }
+
+def _gravar_bloco_vendas(cursor, bloco):
+    """
+    Grava um bloco de vendas já validadas na transação aberta do cursor, cada uma em um
+    SAVEPOINT: uma venda sem estoque é desfeita sozinha. Retorna um resultado por venda do bloco.
+    """
+    externos = [args['id_externo'] for _, args in bloco if args['id_externo']]
+    existentes = {}
+    if externos:
+        marcadores = ",".join("?" * len(externos))
+        cursor.execute(f"SELECT id_externo, id FROM vendas WHERE id_externo IN ({marcadores})", externos)
+        existentes = {row['id_externo']: row['id'] for row in cursor.fetchall()}
+
+    resultados = []
+    for indice, args in bloco:
+        resultado = {'indice': indice, 'id_externo': args['id_externo']}
+        if args['id_externo'] in existentes:
+            resultado.update(status='duplicada', venda_id=existentes[args['id_externo']],
+                             mensagem="Venda já registrada anteriormente.")
+            resultados.append(resultado)
+            continue
+        cursor.execute("SAVEPOINT venda_lote")
+        try:
+            venda_id = _gravar_venda(cursor, **args)
+        except (EstoqueInsuficiente, sqlite3.IntegrityError) as e:
+            cursor.execute("ROLLBACK TO venda_lote")
+            cursor.execute("RELEASE venda_lote")
+            resultado.update(status='rejeitada', venda_id=None, mensagem=str(e))
+        else:
+            cursor.execute("RELEASE venda_lote")
+            if args['id_externo']:
+                existentes[args['id_externo']] = venda_id  # Repetida mais adiante no mesmo lote
+            resultado.update(status='registrada', venda_id=venda_id, mensagem="Venda registrada com sucesso.")
+        resultados.append(resultado)
+    return resultados
+
+def registrar_vendas_lote(vendas):
+    """
+    Registra vendas enfileiradas por um caixa que ficou sem conexão.
+    Cada venda é validada e gravada com as mesmas regras de registrar_venda_completa, em
+    transações de até LOTE_VENDAS_TRANSACAO vendas. Vendas com `id_externo` já gravado voltam
+    como 'duplicada', o que torna o reenvio seguro. Retorna um resultado por venda, na ordem
+    recebida: {'indice', 'id_externo', 'status' (registrada/duplicada/rejeitada/erro), 'venda_id', 'mensagem'}.
+    """
+    if len(vendas) > LOTE_VENDAS_MAX:
+        raise ValueError(f"Lote com mais de {LOTE_VENDAS_MAX} vendas.")
+
+    resultados = [None] * len(vendas)
+    validas = []
+    for indice, venda in enumerate(vendas):
+        try:
+            validas.append((indice, _normalizar_venda_lote(venda)))
+        except ValueError as e:
+            id_externo = venda.get('id_externo') if isinstance(venda, dict) else None
+            resultados[indice] = {'indice': indice, 'id_externo': id_externo, 'status': 'rejeitada',
+                                  'venda_id': None, 'mensagem': f"Venda inválida: {e}"}
+
+    for inicio in range(0, len(validas), LOTE_VENDAS_TRANSACAO):
+        bloco = validas[inicio:inicio + LOTE_VENDAS_TRANSACAO]
+        for tentativa in range(VENDA_TENTATIVAS):
+            conn = None
+            try:
+                conn = get_db_connection()
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                gravados = _gravar_bloco_vendas(cursor, bloco)
+                conn.commit()
+                for resultado in gravados:
+                    resultados[resultado['indice']] = resultado
+                break
+            except Exception as e:
+                if conn and conn.in_transaction:
+                    conn.rollback()
+                if _banco_ocupado(e) and tentativa < VENDA_TENTATIVAS - 1:
+                    time.sleep(VENDA_BACKOFF_INICIAL * (2 ** tentativa) * (1 + random.random()))
+                    continue
+                log.exception("ERRO AO REGISTRAR LOTE DE VENDAS: %s", e)
+                for indice, args in bloco:
+                    resultados[indice] = {'indice': indice, 'id_externo': args['id_externo'], 'status': 'erro',
+                                          'venda_id': None, 'mensagem': f"Erro ao registrar venda: {e}"}
+                break
+            finally:
+                if conn:
+                    conn.close()
+    return resultados
 
 def excluir_venda(venda_id):
     """Exclui uma venda e reverte o estoque dos produtos envolvidos."""
@@ -833,6 +2419,7 @@ def excluir_venda(venda_id):
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
         
         # 1. Obter detalhes dos itens vendidos para reverter o estoque
         cursor.execute(
@@ -846,6 +2433,9 @@ def excluir_venda(venda_id):
             if not cursor.fetchone():
                 return False, "Venda não encontrada."
 
+        # Retira a venda do resumo diário antes de apagar os itens
+        _acumular_vendas_diarias(cursor, venda_id, -1)
+
         # 2. Reverter o Estoque
         for item in itens:
             cursor.execute(
@@ -869,7 +2459,7 @@ def excluir_venda(venda_id):
     except Exception as e:
         if conn:
             conn.rollback()
-        print(f"❌ ERRO ao excluir venda: {e}")  # DEBUG
+        log.exception("ERRO ao excluir venda: %s", e)
         return False, f"Erro durante a exclusão da venda: {e}"
     finally:
         if conn:
@@ -914,7 +2504,7 @@ def get_venda_detalhada_por_id(venda_id):
         return venda
         
     except Exception as e:
-        print(f"Erro ao buscar venda detalhada: {e}")
+        log.exception("Erro ao buscar venda detalhada: %s", e)
         return None
     finally:
         if conn:
@@ -942,13 +2532,15 @@ def get_vendas_por_periodo(data_inicio=None, data_fim=None):
         
         params = []
         
-        if data_inicio:
-            query += " AND DATE(v.data_venda) >= ?"
-            params.append(data_inicio)
+        # Intervalo semiaberto sobre a coluna crua para que idx_vendas_data seja usado
+        inicio, fim_exclusivo = limites_periodo(data_inicio, data_fim)
+        if inicio:
+            query += " AND v.data_venda >= ?"
+            params.append(inicio)
         
-        if data_fim:
-            query += " AND DATE(v.data_venda) <= ?"
-            params.append(data_fim)
+        if fim_exclusivo:
+            query += " AND v.data_venda < ?"
+            params.append(fim_exclusivo)
         
         query += " ORDER BY v.data_venda DESC, v.id DESC"
         
@@ -959,16 +2551,138 @@ def get_vendas_por_periodo(data_inicio=None, data_fim=None):
         for row in resultados:
             vendas.append(dict(row))
         
-        print(f"DEBUG: {len(vendas)} vendas no período {data_inicio} a {data_fim}")
+        log.debug("%s vendas no período %s a %s", len(vendas), data_inicio, data_fim)
         return vendas
         
     except Exception as e:
-        print(f"Erro ao buscar vendas por período: {e}")
+        log.exception("Erro ao buscar vendas por período: %s", e)
         return []
     finally:
         if conn:
             conn.close()            
 
+BUSCA_VENDAS_FILTROS = ('data_inicio', 'data_fim', 'cliente_id', 'forma_pagamento', 'produto_id')
+
+def _condicoes_busca_vendas(filtros):
+    """Monta as condições sobre `vendas v` e seus parâmetros a partir dos filtros informados."""
+    condicoes, params = [], []
+    inicio, fim_exclusivo = limites_periodo(filtros.get('data_inicio'), filtros.get('data_fim'))
+    if inicio:
+        condicoes.append("v.data_venda >= ?")
+        params.append(inicio)
+    if fim_exclusivo:
+        condicoes.append("v.data_venda < ?")
+        params.append(fim_exclusivo)
+    if filtros.get('cliente_id') is not None:
+        condicoes.append("v.cliente_id = ?")
+        params.append(filtros['cliente_id'])
+    if filtros.get('forma_pagamento'):
+        condicoes.append("v.forma_pagamento = ?")
+        params.append(filtros['forma_pagamento'])
+    if filtros.get('produto_id') is not None:
+        condicoes.append("EXISTS (SELECT 1 FROM itens_vendidos iv WHERE iv.venda_id = v.id AND iv.produto_id = ?)")
+        params.append(filtros['produto_id'])
+    return condicoes, params
+
+def _totais_busca_vendas(cursor, filtros, condicoes, params):
+    """
+    Quantidade e valor das vendas que passam nos filtros. Sem filtro de cliente ou
+    produto, os totais saem do resumo diário (vendas_diarias) sem tocar no histórico.
+    """
+    if filtros.get('cliente_id') is None and filtros.get('produto_id') is None:
+        query = """
+            SELECT COALESCE(SUM(transacoes), 0) AS total_registros,
+                   COALESCE(SUM(receita), 0) AS total_vendas_valor
+            FROM vendas_diarias WHERE 1=1
+        """
+        params_resumo = []
+        if filtros.get('data_inicio'):
+            query += " AND dia >= ?"
+            params_resumo.append(filtros['data_inicio'])
+        if filtros.get('data_fim'):
+            query += " AND dia <= ?"
+            params_resumo.append(filtros['data_fim'])
+        if filtros.get('forma_pagamento'):
+            query += " AND forma_pagamento = ?"
+            params_resumo.append(filtros['forma_pagamento'])
+        cursor.execute(query, params_resumo)
+    else:
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        cursor.execute(f"""
+            SELECT COUNT(*) AS total_registros, COALESCE(SUM(v.total), 0) AS total_vendas_valor
+            FROM vendas v {where}
+        """, params)
+    totais = dict(cursor.fetchone())
+    totais['total_vendas_valor'] = round(totais['total_vendas_valor'], 2)
+    return totais
+
+def buscar_vendas(filtros, apos=None, limite=PAGINA_TAMANHO_PADRAO):
+    """
+    Busca paginada de vendas, mais recentes primeiro, filtrando no SQL por período
+    ('AAAA-MM-DD' inclusivas), cliente_id, forma_pagamento e produto_id.
+    Retorna {'vendas': [...], 'proximo': cursor ou None, 'totais': {...} ou None}.
+    Cada venda é um documento cabeçalho + 'itens', montado em uma única consulta
+    (json_group_array por venda), sem repetir o cabeçalho por item.
+    Os totais são calculados só na primeira página.
+    Levanta ValueError se o cursor ou as datas forem inválidos.
+    """
+    condicoes, params = _condicoes_busca_vendas(filtros)
+    condicoes_pagina, params_pagina = list(condicoes), list(params)
+    if apos:
+        condicoes_pagina.append("(v.data_venda, v.id) < (?, ?)")
+        params_pagina.extend(decodificar_cursor(apos, 2))
+    where = f"WHERE {' AND '.join(condicoes_pagina)}" if condicoes_pagina else ""
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        # A página é escolhida primeiro; os itens são agregados só para as vendas dela
+        cursor.execute(f"""
+            WITH pagina AS (
+                SELECT v.id, v.data_venda, v.total, v.forma_pagamento, v.valor_pago, v.troco,
+                       v.cliente_id, c.nome AS cliente_nome
+                FROM vendas v
+                LEFT JOIN clientes c ON v.cliente_id = c.id
+                {where}
+                ORDER BY v.data_venda DESC, v.id DESC
+                LIMIT ?
+            )
+            SELECT pagina.*, (
+                SELECT json_group_array(json_object(
+                    'produto_id', iv.produto_id,
+                    'produto_nome', p.nome,
+                    'codigo_barras', p.codigo_barras,
+                    'quantidade', iv.quantidade,
+                    'preco_unitario', iv.preco_unitario
+                ))
+                FROM itens_vendidos iv
+                JOIN produtos p ON iv.produto_id = p.id
+                WHERE iv.venda_id = pagina.id
+            ) AS itens
+            FROM pagina
+            ORDER BY pagina.data_venda DESC, pagina.id DESC
+        """, params_pagina + [limite + 1])
+        linhas = cursor.fetchall()
+        vendas = []
+        for row in linhas[:limite]:
+            venda = dict(row)
+            venda['itens'] = json.loads(venda['itens'])
+            vendas.append(venda)
+
+        proximo = None
+        if len(linhas) > limite:
+            ultima = vendas[-1]
+            proximo = codificar_cursor(ultima['data_venda'], ultima['id'])
+        totais = None if apos else _totais_busca_vendas(cursor, filtros, condicoes, params)
+        return {'vendas': vendas, 'proximo': proximo, 'totais': totais}
+    except sqlite3.Error as e:
+        log.exception("Erro ao buscar vendas: %s", e)
+        return {'vendas': [], 'proximo': None, 'totais': None}
+    finally:
+        if conn:
+            conn.close()
+
 # ==============================================================================
 # 10. FUNÇÕES DE RELATÓRIOS E ESTATÍSTICAS
 # ==============================================================================
@@ -1045,18 +2759,140 @@ def get_relatorio_vendas_detalhado():
             
             vendas_lista.append(venda_item)
             
-        print(f"✅ DEBUG: Retornando {len(vendas_lista)} registros de vendas")  # DEBUG
+        log.debug("Retornando %s registros de vendas", len(vendas_lista))
         return vendas_lista
         
     except Exception as e:
-        print(f"❌ ERRO CRÍTICO em get_relatorio_vendas_detalhado: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("ERRO CRÍTICO em get_relatorio_vendas_detalhado: %s", e)
         return []
     finally:
         if conn:
             conn.close()
 
+LOTE_EXPORTACAO = 1000  # Linhas lidas por fetchmany nas exportações
+
+COLUNAS_EXPORTACAO_PRODUTOS = ['id', 'nome', 'preco', 'quantidade', 'codigo_barras']
+COLUNAS_EXPORTACAO_VENDAS = [
+    'id', 'data_venda', 'total', 'forma_pagamento', 'valor_pago', 'troco', 'cliente_nome',
+    'quantidade', 'preco_unitario', 'produto_nome', 'codigo_barras', 'produto_id',
+]
+
+def _iterar_em_lotes(sql, params=(), tamanho_lote=LOTE_EXPORTACAO):
+    """Gera as linhas da consulta como tuplas, lendo `tamanho_lote` por vez do cursor."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            lote = cursor.fetchmany(tamanho_lote)
+            if not lote:
+                break
+            for row in lote:
+                yield tuple(row)
+    finally:
+        conn.close()
+
+def iterar_produtos_exportacao(tamanho_lote=LOTE_EXPORTACAO):
+    """Produtos na ordem de COLUNAS_EXPORTACAO_PRODUTOS, sem carregar o catálogo inteiro."""
+    return _iterar_em_lotes(
+        "SELECT id, nome, preco, quantidade, codigo_barras FROM produtos ORDER BY nome ASC, id ASC",
+        tamanho_lote=tamanho_lote
+    )
+
+def iterar_vendas_exportacao(data_inicio=None, data_fim=None, tamanho_lote=LOTE_EXPORTACAO):
+    """Itens vendidos (uma linha por item) na ordem de COLUNAS_EXPORTACAO_VENDAS, opcionalmente por período."""
+    query = """
+        SELECT
+            v.id, v.data_venda, v.total, v.forma_pagamento, v.valor_pago, v.troco,
+            COALESCE(c.nome, 'N/A'),
+            iv.quantidade, iv.preco_unitario,
+            p.nome, p.codigo_barras, p.id
+        FROM vendas v
+        JOIN itens_vendidos iv ON v.id = iv.venda_id
+        JOIN produtos p ON iv.produto_id = p.id
+        LEFT JOIN clientes c ON v.cliente_id = c.id
+        WHERE 1=1
+    """
+    params = []
+    inicio, fim_exclusivo = limites_periodo(data_inicio, data_fim)
+    if inicio:
+        query += " AND v.data_venda >= ?"
+        params.append(inicio)
+    if fim_exclusivo:
+        query += " AND v.data_venda < ?"
+        params.append(fim_exclusivo)
+    query += " ORDER BY v.data_venda DESC, v.id DESC"
+    return _iterar_em_lotes(query, params, tamanho_lote)
+
+def iterar_resumo_vendas_exportacao(data_inicio=None, data_fim=None, tamanho_lote=LOTE_EXPORTACAO):
+    """Uma linha por venda (id, data_venda, cliente, forma_pagamento, total), opcionalmente por período."""
+    query = """
+        SELECT v.id, v.data_venda, COALESCE(c.nome, 'Avulso'), v.forma_pagamento, v.total
+        FROM vendas v
+        LEFT JOIN clientes c ON v.cliente_id = c.id
+        WHERE 1=1
+    """
+    params = []
+    inicio, fim_exclusivo = limites_periodo(data_inicio, data_fim)
+    if inicio:
+        query += " AND v.data_venda >= ?"
+        params.append(inicio)
+    if fim_exclusivo:
+        query += " AND v.data_venda < ?"
+        params.append(fim_exclusivo)
+    query += " ORDER BY v.data_venda DESC, v.id DESC"
+    return _iterar_em_lotes(query, params, tamanho_lote)
+
+def get_estatisticas_relatorios(data_inicio=None, data_fim=None):
+    """Cartões da página de relatórios: estoque agregado no banco e vendas lidas do resumo diário."""
+    estatisticas = dict(get_resumo_estoque())
+    estatisticas.update(get_totais_periodo(data_inicio, data_fim))
+    return estatisticas
+
+def listar_itens_vendidos_pagina(data_inicio=None, data_fim=None, apos=None, limite=PAGINA_TAMANHO_PADRAO):
+    """
+    Uma página de itens vendidos (uma linha por item, mais recentes primeiro), opcionalmente por período.
+    Retorna {'itens': [...], 'proximo': cursor ou None}. Levanta ValueError se o cursor ou as datas forem inválidos.
+    """
+    condicoes, params = _condicoes_busca_vendas({'data_inicio': data_inicio, 'data_fim': data_fim})
+    if apos:
+        data_venda, venda_id, item_id = decodificar_cursor(apos, 3)
+        # A primeira condição deixa o SQLite continuar a faixa em idx_vendas_data
+        condicoes.append("v.data_venda <= ? AND (v.data_venda, v.id, iv.id) < (?, ?, ?)")
+        params.extend([data_venda, data_venda, venda_id, item_id])
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT
+                v.id, v.data_venda, v.total, v.forma_pagamento,
+                c.nome AS cliente_nome,
+                iv.id AS item_id, iv.produto_id, iv.quantidade, iv.preco_unitario,
+                p.nome AS produto_nome, p.codigo_barras
+            FROM vendas v
+            JOIN itens_vendidos iv ON v.id = iv.venda_id
+            JOIN produtos p ON iv.produto_id = p.id
+            LEFT JOIN clientes c ON v.cliente_id = c.id
+            {where}
+            ORDER BY v.data_venda DESC, v.id DESC, iv.id DESC
+            LIMIT ?
+        """, params + [limite + 1])
+        linhas = cursor.fetchall()
+        itens = [dict(row) for row in linhas[:limite]]
+        proximo = None
+        if len(linhas) > limite:
+            ultimo = itens[-1]
+            proximo = codificar_cursor(ultimo['data_venda'], ultimo['id'], ultimo['item_id'])
+        return {'itens': itens, 'proximo': proximo}
+    except sqlite3.Error as e:
+        log.exception("Erro ao listar página de itens vendidos: %s", e)
+        return {'itens': [], 'proximo': None}
+    finally:
+        if conn:
+            conn.close()
+
 def get_relatorio_estoque():
     """Retorna todos os produtos (para relatórios gerais de estoque)."""
     return listar_produtos()
@@ -1086,61 +2922,185 @@ def get_relatorio_movimentacao_estoque():
         return [dict(m) for m in movimentacoes_data]
         
     except Exception as e:
-        print(f"Erro ao obter relatório de movimentação: {e}")
+        log.exception("Erro ao obter relatório de movimentação: %s", e)
         return []
     finally:
         if conn:
             conn.close()
 
-def get_estatisticas_gerais():
-    """
-    CORRIGIDO: Coleta e retorna estatísticas gerais para o Dashboard.
-    Assegura que os valores padrão são 0 em caso de tabelas vazias.
-    """
+# Jobs de relatório em segundo plano (status: pendente -> executando -> concluido | erro)
+JOB_STATUS_FINAIS = ('concluido', 'erro')
+JOB_CAMPOS_ATUALIZAVEIS = ('status', 'progresso', 'mensagem', 'arquivo', 'concluido_em')
+
+def _job_para_dict(row):
+    job = dict(row)
+    job['parametros'] = json.loads(job['parametros'] or '{}')
+    return job
+
+def criar_job_relatorio(job_id, tipo, parametros, usuario_id=None, dono=(None, None)):
+    """Registra um job de relatório pendente; `dono` é (pid, id do processo) de quem vai executá-lo."""
     conn = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
+        conn.execute("""
+            INSERT INTO relatorio_jobs (id, tipo, parametros, usuario_id, criado_em, dono_pid, dono_processo)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (job_id, tipo, json.dumps(parametros), usuario_id,
+              datetime.now().strftime(FORMATO_DATA_VENDA), *dono))
+        conn.commit()
+        return True, "Relatório enviado para a fila."
+    except Exception as e:
+        log.exception("Erro ao criar job de relatório: %s", e)
+        return False, f"Erro ao criar job de relatório: {e}"
+    finally:
+        if conn:
+            conn.close()
 
-        # Usando SUM(coluna) para obter o valor total, coalesce(SUM(coluna), 0) garante 0 se não houver registros
-        cursor.execute("SELECT COALESCE(SUM(preco * quantidade), 0) FROM produtos")
-        valor_estoque = cursor.fetchone()[0]
+def atualizar_job_relatorio(job_id, **campos):
+    """Atualiza status/progresso/mensagem/arquivo de um job."""
+    invalidos = set(campos) - set(JOB_CAMPOS_ATUALIZAVEIS)
+    if invalidos:
+        raise ValueError(f"Campos de job inválidos: {sorted(invalidos)}")
+    if not campos:
+        return False
+    # Os nomes de coluna vêm de JOB_CAMPOS_ATUALIZAVEIS; os valores vão como parâmetros
+    atribuicoes = ", ".join(f"{campo} = ?" for campo in campos)
+    conn = None
+    try:
+        conn = get_db_connection()
+        conn.execute(f"UPDATE relatorio_jobs SET {atribuicoes} WHERE id = ?", (*campos.values(), job_id))
+        conn.commit()
+        return True
+    except Exception as e:
+        log.exception("Erro ao atualizar job de relatório %s: %s", job_id, e)
+        return False
+    finally:
+        if conn:
+            conn.close()
 
-        cursor.execute("SELECT COUNT(id) FROM produtos")
-        total_produtos = cursor.fetchone()[0] or 0
+def buscar_job_relatorio(job_id):
+    """Retorna o job como dicionário, ou None."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        row = conn.execute("SELECT * FROM relatorio_jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job_para_dict(row) if row else None
+    except Exception as e:
+        log.exception("Erro ao buscar job de relatório: %s", e)
+        return None
+    finally:
+        if conn:
+            conn.close()
 
-        cursor.execute("SELECT COUNT(id) FROM clientes")
-        total_clientes = cursor.fetchone()[0] or 0
+def listar_jobs_relatorio(usuario_id=None, limite=20):
+    """Jobs mais recentes primeiro, opcionalmente só os de um usuário."""
+    query = "SELECT * FROM relatorio_jobs"
+    params = []
+    if usuario_id is not None:
+        query += " WHERE usuario_id = ?"
+        params.append(usuario_id)
+    query += " ORDER BY criado_em DESC, rowid DESC LIMIT ?"
+    params.append(limite)
+    conn = None
+    try:
+        conn = get_db_connection()
+        return [_job_para_dict(row) for row in conn.execute(query, params).fetchall()]
+    except Exception as e:
+        log.exception("Erro ao listar jobs de relatório: %s", e)
+        return []
+    finally:
+        if conn:
+            conn.close()
 
-        cursor.execute("SELECT COALESCE(SUM(total), 0) FROM vendas")
-        total_vendas_valor = cursor.fetchone()[0]
+def listar_donos_jobs_ativos():
+    """Processos (pid, id do processo) donos de jobs ainda pendentes/executando."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        return [tuple(row) for row in conn.execute("""
+            SELECT DISTINCT dono_pid, dono_processo FROM relatorio_jobs
+            WHERE status NOT IN ('concluido', 'erro')
+        """)]
+    except Exception as e:
+        log.exception("Erro ao listar donos de jobs de relatório: %s", e)
+        return []
+    finally:
+        if conn:
+            conn.close()
 
-        cursor.execute("SELECT COUNT(id) FROM vendas")
-        total_transacoes = cursor.fetchone()[0] or 0
+def marcar_jobs_interrompidos(donos):
+    """
+    Jobs pendentes/executando dos processos `donos` (pares de listar_donos_jobs_ativos)
+    não vão mais terminar: o processo que os executaria parou.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        interrompidos = 0
+        for pid, processo in donos:
+            # IS compara também os jobs sem dono, criados antes da migração 12
+            cursor = conn.execute("""
+                UPDATE relatorio_jobs
+                SET status = 'erro', mensagem = 'Interrompido pela reinicialização do servidor',
+                    concluido_em = datetime('now', 'localtime')
+                WHERE status NOT IN ('concluido', 'erro') AND dono_pid IS ? AND dono_processo IS ?
+            """, (pid, processo))
+            interrompidos += cursor.rowcount
+        conn.commit()
+        return interrompidos
+    except Exception as e:
+        log.exception("Erro ao marcar jobs interrompidos: %s", e)
+        return 0
+    finally:
+        if conn:
+            conn.close()
 
-        cursor.execute("SELECT COUNT(id) FROM produtos WHERE quantidade <= 10") # Produtos com estoque baixo/esgotado
-        produtos_estoque_baixo = cursor.fetchone()[0] or 0
+def excluir_jobs_antigos(horas):
+    """Remove os jobs finalizados há mais de `horas` e devolve os arquivos que ficaram órfãos."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.execute("""
+            DELETE FROM relatorio_jobs
+            WHERE status IN ('concluido', 'erro') AND concluido_em < datetime('now', 'localtime', ?)
+            RETURNING arquivo
+        """, (f'-{int(horas)} hours',))
+        arquivos = [row[0] for row in cursor.fetchall() if row[0]]
+        conn.commit()
+        return arquivos
+    except Exception as e:
+        log.exception("Erro ao excluir jobs antigos: %s", e)
+        return []
+    finally:
+        if conn:
+            conn.close()
 
-        # Tenta a consulta com tabela itens_vendidos. Se falhar (e a tabela existir), retorna 0.
-        try:
-             cursor.execute("SELECT COALESCE(SUM(quantidade), 0) FROM itens_vendidos")
-             total_itens_vendidos = cursor.fetchone()[0] or 0
-        except sqlite3.OperationalError:
-             total_itens_vendidos = 0 # Tabela não existe ou outro erro, assumir 0.
-        
-        return {
-            'valor_estoque': round(valor_estoque, 2),
-            'total_produtos': total_produtos,
-            'total_clientes': total_clientes,
-            'total_vendas_valor': round(total_vendas_valor, 2),
-            'total_transacoes': total_transacoes,
-            'produtos_estoque_baixo': produtos_estoque_baixo,
-            'total_itens_vendidos': total_itens_vendidos,
-        }
+def _formatar_estatisticas(row):
+    estatisticas = {campo: row[campo] or 0 for campo in CAMPOS_CONTADORES}
+    estatisticas['valor_estoque'] = round(estatisticas['valor_estoque'], 2)
+    estatisticas['total_vendas_valor'] = round(estatisticas['total_vendas_valor'], 2)
+    return estatisticas
+
+def get_estatisticas_gerais():
+    """
+    Coleta e retorna estatísticas gerais para o Dashboard.
+    Lê a linha única da tabela `contadores`, mantida pelos triggers; só recalcula se ela não existir.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT * FROM contadores WHERE id = 1")
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute(SQL_ESTATISTICAS_RECALCULADAS)
+            row = cursor.fetchone()
+        return _formatar_estatisticas(row)
         
     except Exception as e:
         # Se falhar aqui, o problema é mais profundo (conexão ou outras tabelas)
-        print(f"FATAL: Erro ao obter estatísticas gerais: {e}")
+        log.exception("FATAL: Erro ao obter estatísticas gerais: %s", e)
         return {
             'valor_estoque': 0.0,
             'total_produtos': 0,
@@ -1153,13 +3113,78 @@ def get_estatisticas_gerais():
     finally:
         if conn:
             conn.close()
+
+def verificar_contadores(corrigir=False):
+    """
+    Recalcula as estatísticas do zero e compara com a tabela `contadores`.
+    Retorna {campo: {'contador', 'recalculado', 'diferenca'}} só dos campos divergentes;
+    com corrigir=True, grava os valores recalculados.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE" if corrigir else "BEGIN")
+        cursor.execute("SELECT * FROM contadores WHERE id = 1")
+        atual = cursor.fetchone()
+        cursor.execute(SQL_ESTATISTICAS_RECALCULADAS)
+        recalculado = cursor.fetchone()
+
+        divergencias = {}
+        for campo in CAMPOS_CONTADORES:
+            valor_contador = atual[campo] if atual else None
+            # Tolera o ruído de ponto flutuante acumulado nas somas de valores
+            if valor_contador is None or abs(valor_contador - recalculado[campo]) > 1e-6:
+                divergencias[campo] = {
+                    'contador': valor_contador,
+                    'recalculado': recalculado[campo],
+                    'diferenca': None if valor_contador is None else valor_contador - recalculado[campo],
+                }
+
+        if corrigir and divergencias:
+            cursor.execute(
+                "INSERT OR REPLACE INTO contadores (id, " + ", ".join(CAMPOS_CONTADORES) + ") "
+                "VALUES (1, " + ", ".join("?" * len(CAMPOS_CONTADORES)) + ")",
+                [recalculado[campo] for campo in CAMPOS_CONTADORES]
+            )
+            # A tabela contadores não tem trigger de versão (muda a cada venda): avisa os caches aqui
+            cursor.execute("UPDATE versoes_tabelas SET versao = versao + 1 WHERE tabela = 'contadores'")
+        conn.commit()
+        return divergencias
+    finally:
+        if conn:
+            conn.close()
             
 # ==============================================================================
 # 11. BLOCO DE EXECUÇÃO
 # ==============================================================================
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Configura e verifica o banco de dados da loja.")
+    parser.add_argument('--reconstruir-vendas-diarias', action='store_true',
+                        help="Recalcula o resumo diário de vendas a partir do histórico")
+    parser.add_argument('--verificar-contadores', action='store_true',
+                        help="Compara os contadores do dashboard com um recálculo completo")
+    parser.add_argument('--corrigir-contadores', action='store_true',
+                        help="Como --verificar-contadores, mas grava os valores recalculados")
+    args = parser.parse_args()
+
     if setup_database():
         print("Banco de dados configurado (tabelas criadas ou já existentes).")
+        tudo_ok, relatorio = verificar_indices()
+        for item in relatorio:
+            status = "OK" if item['ok'] else f"SEM ÍNDICE {item['indices_faltando']}"
+            print(f"[{status}] {item['consulta']}: {' | '.join(item['plano'])}")
+        if args.reconstruir_vendas_diarias:
+            print(reconstruir_vendas_diarias()[1])
+        if args.verificar_contadores or args.corrigir_contadores:
+            divergencias = verificar_contadores(corrigir=args.corrigir_contadores)
+            for campo, valores in divergencias.items():
+                print(f"[DIVERGENTE] {campo}: contador={valores['contador']} recalculado={valores['recalculado']}")
+            if not divergencias:
+                print("Contadores consistentes.")
+        if not tudo_ok:
+            raise SystemExit("Consultas quentes sem os índices esperados.")
     else:
         print("Erro na configuração do banco de dados.")
 
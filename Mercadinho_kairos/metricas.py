@@ -0,0 +1,172 @@
+# ==============================================================================
+# 1. IMPORTS E CONFIGURAÇÃO
+# ==============================================================================
+import bisect
+import itertools
+import threading
+import time
+from flask import g, request
+import Mercadinho_kairos.logica_banco as db
+import Mercadinho_kairos.cache_respostas as cache_respostas
+import Mercadinho_kairos.recibos as recibos
+
+PREFIXO = 'mercadinho'
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_SQL_COMANDOS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+BUCKETS_SQL_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+INICIO_PROCESSO = time.time()
+
+# ==============================================================================
+# 2. MÉTRICAS EM MEMÓRIA (FORMATO TEXTO DO PROMETHEUS)
+# ==============================================================================
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _rotulos(nomes, valores, extra=None):
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+class Histograma:
+    """Histograma com rótulos; cada série guarda contagens por bucket, soma e total."""
+    def __init__(self, nome, ajuda, rotulos, buckets):
+        self.nome = f"{PREFIXO}_{nome}"
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}  # valores dos rótulos -> [contagens por bucket, soma, total]
+
+    def observar(self, valores, valor):
+        # Conta só no primeiro bucket que comporta o valor; os acumulados saem em linhas()
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def linhas(self):
+        with self._lock:
+            series = {valores: ([*contagens], soma, total) for valores, (contagens, soma, total) in self._series.items()}
+        yield f"# HELP {self.nome} {self.ajuda}"
+        yield f"# TYPE {self.nome} histogram"
+        for valores, (contagens, soma, total) in sorted(series.items()):
+            for limite, contagem in zip(self.buckets, itertools.accumulate(contagens)):
+                le = 'le="%s"' % limite
+                yield f"{self.nome}_bucket{_rotulos(self.rotulos, valores, le)} {contagem}"
+            le = 'le="+Inf"'
+            yield f"{self.nome}_bucket{_rotulos(self.rotulos, valores, le)} {total}"
+            yield f"{self.nome}_sum{_rotulos(self.rotulos, valores)} {_numero(soma)}"
+            yield f"{self.nome}_count{_rotulos(self.rotulos, valores)} {total}"
+
+class Contador:
+    """Contador com rótulos."""
+    def __init__(self, nome, ajuda, rotulos):
+        self.nome = f"{PREFIXO}_{nome}"
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def incrementar(self, valores, quantidade=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def linhas(self):
+        with self._lock:
+            valores = dict(self._valores)
+        yield f"# HELP {self.nome} {self.ajuda}"
+        yield f"# TYPE {self.nome} counter"
+        for rotulos, valor in sorted(valores.items()):
+            yield f"{self.nome}{_rotulos(self.rotulos, rotulos)} {_numero(valor)}"
+
+def _metrica_simples(nome, tipo, ajuda, valor):
+    """Linhas de uma métrica sem rótulos, lida na hora da coleta (pool, caches)."""
+    nome = f"{PREFIXO}_{nome}"
+    return [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}", f"{nome} {_numero(valor)}"]
+
+latencia_requisicoes = Histograma(
+    'http_request_duration_seconds', "Latência das requisições por endpoint do Flask.",
+    ('endpoint', 'method'), BUCKETS_LATENCIA)
+requisicoes = Contador(
+    'http_requests_total', "Requisições atendidas por endpoint e status.", ('endpoint', 'method', 'status'))
+sql_comandos_requisicao = Histograma(
+    'request_sql_statements', "Comandos SQL executados por requisição.", ('endpoint',), BUCKETS_SQL_COMANDOS)
+sql_tempo_requisicao = Histograma(
+    'request_sql_duration_seconds', "Tempo gasto em SQL por requisição.", ('endpoint',), BUCKETS_SQL_SEGUNDOS)
+
+# ==============================================================================
+# 3. MEDIÇÃO DAS REQUISIÇÕES
+# ==============================================================================
+def _inicio_requisicao():
+    g._metricas_inicio = time.perf_counter()
+
+def _fim_requisicao(resposta):
+    # after_request também roda para as respostas de erro geradas pelo Flask (500),
+    # e a conexão da requisição (com a contagem de SQL) ainda não voltou ao pool
+    inicio = g.pop('_metricas_inicio', None)
+    if inicio is None:
+        return resposta
+    duracao = time.perf_counter() - inicio
+    requisicao = request._get_current_object()
+    # Rotas inexistentes ficam juntas: a URL não vira rótulo (cardinalidade sem limite)
+    endpoint = requisicao.endpoint or 'nao_encontrado'
+    latencia_requisicoes.observar((endpoint, requisicao.method), duracao)
+    requisicoes.incrementar((endpoint, requisicao.method, str(resposta.status_code)))
+    sql = db.estatisticas_sql_requisicao() or {'comandos': 0, 'segundos': 0.0}
+    sql_comandos_requisicao.observar((endpoint,), sql['comandos'])
+    sql_tempo_requisicao.observar((endpoint,), sql['segundos'])
+    return resposta
+
+def init_app(app):
+    """Registra a medição de latência e de SQL em todas as requisições do app."""
+    app.before_request(_inicio_requisicao)
+    app.after_request(_fim_requisicao)
+
+# ==============================================================================
+# 4. EXPOSIÇÃO
+# ==============================================================================
+def texto_prometheus():
+    """Todas as métricas no formato texto de exposição do Prometheus (versão 0.0.4)."""
+    linhas = []
+    for metrica in (latencia_requisicoes, requisicoes, sql_comandos_requisicao, sql_tempo_requisicao):
+        linhas.extend(metrica.linhas())
+
+    sql = db.estatisticas_sql()
+    linhas += _metrica_simples('sql_statements_total', 'counter',
+                               "Comandos SQL executados pelo processo (inclui tarefas em segundo plano).", sql['comandos'])
+    linhas += _metrica_simples('sql_duration_seconds_total', 'counter',
+                               "Tempo total gasto em SQL pelo processo.", sql['segundos'])
+
+    pool = db.estatisticas_pool()
+    for campo in ('criadas', 'reutilizadas', 'devolvidas', 'descartadas'):
+        linhas += _metrica_simples(f'db_pool_conexoes_{campo}_total', 'counter',
+                                   f"Conexões {campo} pelo pool.", pool[campo])
+    linhas += _metrica_simples('db_pool_conexoes_em_uso', 'gauge', "Conexões emprestadas agora.", pool['em_uso'])
+    linhas += _metrica_simples('db_pool_conexoes_ociosas', 'gauge', "Conexões ociosas no pool.", pool['ociosas'])
+
+    for nome, stats in (('cache_respostas', cache_respostas.estatisticas_cache()),
+                        ('cache_recibos', recibos.estatisticas_cache())):
+        consultas = stats['acertos'] + stats['faltas']
+        for campo in ('acertos', 'faltas', 'despejos'):
+            linhas += _metrica_simples(f'{nome}_{campo}_total', 'counter', f"{campo.capitalize()} do {nome}.", stats[campo])
+        linhas += _metrica_simples(f'{nome}_bytes', 'gauge', f"Bytes ocupados pelo {nome}.", stats['bytes'])
+        linhas += _metrica_simples(f'{nome}_taxa_acerto', 'gauge', f"Acertos / consultas do {nome}.",
+                                   round(stats['acertos'] / consultas, 4) if consultas else 0.0)
+
+    indice = db.estatisticas_indice_produtos()
+    if indice:
+        for campo in ('acertos', 'falhas'):
+            linhas += _metrica_simples(f'indice_produtos_{campo}_total', 'counter',
+                                       f"Buscas por código com {campo} no índice em memória.", indice[campo])
+
+    linhas += _metrica_simples('process_start_time_seconds', 'gauge', "Início do processo (epoch).", INICIO_PROCESSO)
+    return "\n".join(linhas) + "\n"
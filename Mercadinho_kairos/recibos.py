@@ -0,0 +1,176 @@
+# ==============================================================================
+# 1. IMPORTS E CONFIGURAÇÃO
+# ==============================================================================
+import os
+import logging
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import Mercadinho_kairos.logica_banco as db
+
+log = logging.getLogger(__name__)
+
+RECIBOS_CACHE_DIR = os.environ.get('RECIBOS_CACHE_DIR', 'recibos_cache')
+RECIBOS_CACHE_MAX_BYTES = int(os.environ.get('RECIBOS_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+RECIBOS_PRE_RENDERIZAR = os.environ.get('RECIBOS_PRE_RENDERIZAR', 'True').lower() == 'true'
+
+# Mude quando o layout do recibo mudar: todos os arquivos em cache deixam de casar
+RECIBO_LAYOUT_VERSAO = 1
+
+# ==============================================================================
+# 2. VERSÃO DO RECIBO
+# ==============================================================================
+def versao_venda(venda):
+    """Hash do conteúdo que aparece no recibo; muda se a venda (ou o layout) mudar."""
+    conteudo = json.dumps([RECIBO_LAYOUT_VERSAO, venda], sort_keys=True, default=str)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()[:16]
+
+# ==============================================================================
+# 3. CACHE EM DISCO (LRU LIMITADO POR TAMANHO)
+# ==============================================================================
+class CacheRecibos:
+    """
+    Recibos renderizados em disco, um arquivo '<venda_id>-<versao>.pdf' por venda.
+    O diretório é o único estado: pode ser compartilhado pelos workers do gunicorn, e a
+    ordem LRU é o mtime, renovado a cada acerto. Ao guardar, o diretório é relido e os
+    arquivos menos usados são apagados enquanto o total passar de `max_bytes`.
+    Outro processo pode apagar um arquivo a qualquer momento: leitura e mtime tratam a
+    ausência como falta. Acertos, faltas e despejos são contados por processo.
+    """
+
+    def __init__(self, diretorio, max_bytes):
+        self.diretorio = diretorio
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+
+    def _caminho(self, nome):
+        return os.path.abspath(os.path.join(self.diretorio, nome))
+
+    @staticmethod
+    def _nome(venda_id, versao):
+        return f"{int(venda_id)}-{versao}.pdf"
+
+    def _listar(self):
+        """[(mtime, nome, tamanho)] dos recibos no diretório, do menos para o mais recente."""
+        os.makedirs(self.diretorio, exist_ok=True)
+        entradas = []
+        for entrada in os.scandir(self.diretorio):
+            if entrada.name.endswith('.pdf'):
+                try:
+                    info = entrada.stat()
+                except FileNotFoundError:
+                    continue  # Apagado por outro processo durante a listagem
+                entradas.append((info.st_mtime, entrada.name, info.st_size))
+        return sorted(entradas)
+
+    def obter(self, venda_id, versao):
+        """Bytes do recibo em cache, ou None (inclusive se outro processo acabou de apagá-lo)."""
+        caminho = self._caminho(self._nome(venda_id, versao))
+        with self._lock:
+            try:
+                with open(caminho, 'rb') as arquivo:
+                    conteudo = arquivo.read()
+                os.utime(caminho)  # Mantém a ordem LRU entre processos e reinicializações
+            except FileNotFoundError:
+                conteudo = None
+            if conteudo is None:
+                self.faltas += 1
+            else:
+                self.acertos += 1
+            return conteudo
+
+    def guardar(self, venda_id, versao, conteudo):
+        """Grava o PDF (escrita atômica), descarta versões antigas da venda e aplica o limite."""
+        nome = self._nome(venda_id, versao)
+        caminho = self._caminho(nome)
+        with self._lock:
+            os.makedirs(self.diretorio, exist_ok=True)
+            self._remover_venda(venda_id, exceto=nome)
+            temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporario, 'wb') as arquivo:
+                arquivo.write(conteudo)
+            os.replace(temporario, caminho)
+
+            entradas = [e for e in self._listar() if e[1] != nome]
+            total = len(conteudo) + sum(tamanho for _, _, tamanho in entradas)
+            for _, antigo, tamanho in entradas:
+                if total <= self.max_bytes:
+                    break
+                if self._apagar(antigo):
+                    self.despejos += 1
+                total -= tamanho
+
+    def invalidar(self, venda_id):
+        """Remove todas as versões em cache do recibo da venda."""
+        with self._lock:
+            return self._remover_venda(venda_id)
+
+    def _remover_venda(self, venda_id, exceto=None):
+        prefixo = f"{int(venda_id)}-"
+        removidos = 0
+        for _, nome, _ in self._listar():
+            if nome.startswith(prefixo) and nome != exceto and self._apagar(nome):
+                removidos += 1
+        return removidos
+
+    def _apagar(self, nome):
+        try:
+            os.remove(self._caminho(nome))
+            return True
+        except FileNotFoundError:
+            return False  # Outro processo chegou antes
+
+    def estatisticas(self):
+        entradas = self._listar()
+        with self._lock:
+            return {
+                'arquivos': len(entradas),
+                'bytes': sum(tamanho for _, _, tamanho in entradas),
+                'max_bytes': self.max_bytes,
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'despejos': self.despejos,
+            }
+
+cache = CacheRecibos(RECIBOS_CACHE_DIR, RECIBOS_CACHE_MAX_BYTES)
+
+# ==============================================================================
+# 4. API USADA PELAS ROTAS
+# ==============================================================================
+def obter_recibo(venda_id):
+    """Retorna os bytes do PDF do recibo (renderizando e guardando se preciso), ou None se a venda não existe."""
+    venda = db.get_venda_detalhada_por_id(venda_id)
+    if not venda:
+        return None
+    versao = versao_venda(venda)
+    conteudo = cache.obter(venda_id, versao)
+    if conteudo is not None:
+        return conteudo
+    from Mercadinho_kairos import documentos  # reportlab só é carregado quando há o que renderizar
+    conteudo = documentos.gerar_pdf_recibo(venda)
+    cache.guardar(venda_id, versao, conteudo)
+    return conteudo
+
+def invalidar_recibo(venda_id):
+    """Chamada depois que a venda é excluída."""
+    return cache.invalidar(venda_id)
+
+_pre_renderizador = ThreadPoolExecutor(max_workers=1, thread_name_prefix='recibo')
+
+def _pre_renderizar(venda_id):
+    try:
+        obter_recibo(venda_id)
+    except Exception as e:
+        log.exception("Erro ao pré-renderizar recibo da venda %s: %s", venda_id, e)
+
+def agendar_pre_renderizacao(venda_id):
+    """Renderiza o recibo em segundo plano logo após a venda, para a impressão sair na hora."""
+    if RECIBOS_PRE_RENDERIZAR:
+        _pre_renderizador.submit(_pre_renderizar, venda_id)
+
+def estatisticas_cache():
+    return cache.estatisticas()
@@ -0,0 +1,142 @@
+# ==============================================================================
+# 1. IMPORTS E CONFIGURAÇÃO
+# ==============================================================================
+import os
+import logging
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import Mercadinho_kairos.logica_banco as db
+
+log = logging.getLogger(__name__)
+
+RELATORIOS_DIR = os.environ.get('RELATORIOS_DIR', 'relatorios_gerados')
+RELATORIOS_WORKERS = int(os.environ.get('RELATORIOS_WORKERS', 2))
+RELATORIOS_RETENCAO_HORAS = int(os.environ.get('RELATORIOS_RETENCAO_HORAS', 24))
+
+# Tipos de relatório aceitos pela fila: tipo -> (função em documentos, extensão, mimetype).
+# O gerador é resolvido só dentro do job, para não carregar o reportlab na inicialização.
+TIPOS_RELATORIO = {
+    'pdf_loja': ('gerar_pdf_loja', 'pdf', 'application/pdf'),
+}
+
+# Dono dos jobs enviados por este processo: o pid diz se ele ainda está vivo e o id
+# aleatório distingue um processo anterior que tinha o mesmo pid (ex.: pid 1 em contêiner)
+PROCESSO_ID = uuid.uuid4().hex[:16]
+
+# ==============================================================================
+# 2. EXECUTOR DE JOBS
+# ==============================================================================
+_executor = None
+_executor_lock = threading.Lock()
+
+def _processo_vivo(pid, processo_id):
+    """Indica se o processo dono de um job ainda pode terminá-lo."""
+    if processo_id == PROCESSO_ID:
+        return True
+    if pid is None or pid == os.getpid() or os.name != 'posix':
+        # Job sem dono (anterior à migração 12), pid reaproveitado por este processo, ou
+        # sistema sem os.kill(pid, 0): vale a regra antiga de dar o job como interrompido
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Existe, mas é de outro usuário
+    return True
+
+def _marcar_jobs_orfaos():
+    """Marca como erro só os jobs cujo processo dono morreu; os de outros workers vivos seguem."""
+    mortos = [dono for dono in db.listar_donos_jobs_ativos() if not _processo_vivo(*dono)]
+    if mortos:
+        interrompidos = db.marcar_jobs_interrompidos(mortos)
+        if interrompidos:
+            log.info("%s job(s) de relatório interrompido(s) marcado(s) como erro.", interrompidos)
+
+def _obter_executor():
+    """Cria o pool de threads na primeira submissão e marca jobs órfãos de processos que morreram."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _marcar_jobs_orfaos()
+            _executor = ThreadPoolExecutor(max_workers=RELATORIOS_WORKERS, thread_name_prefix='relatorio')
+        return _executor
+
+def _caminho_arquivo(job_id, extensao):
+    return os.path.abspath(os.path.join(RELATORIOS_DIR, f"{job_id}.{extensao}"))
+
+def _executar_job(job_id, tipo, parametros):
+    """Roda no pool: gera o arquivo em um .tmp e só o publica quando completo."""
+    from Mercadinho_kairos import documentos
+    nome_gerador, extensao, _ = TIPOS_RELATORIO[tipo]
+    gerador = getattr(documentos, nome_gerador)
+    caminho = _caminho_arquivo(job_id, extensao)
+    temporario = caminho + '.tmp'
+    db.atualizar_job_relatorio(job_id, status='executando', mensagem="Gerando relatório")
+
+    def ao_progredir(fracao, mensagem):
+        db.atualizar_job_relatorio(job_id, progresso=round(fracao, 3), mensagem=mensagem)
+
+    try:
+        gerador(temporario, ao_progredir=ao_progredir, **parametros)
+        os.replace(temporario, caminho)
+        db.atualizar_job_relatorio(
+            job_id, status='concluido', progresso=1.0, mensagem="Relatório pronto",
+            arquivo=caminho, concluido_em=datetime.now().strftime(db.FORMATO_DATA_VENDA)
+        )
+    except Exception as e:
+        log.exception("Erro ao gerar relatório %s: %s", job_id, e)
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        db.atualizar_job_relatorio(
+            job_id, status='erro', mensagem=f"Erro ao gerar relatório: {e}",
+            concluido_em=datetime.now().strftime(db.FORMATO_DATA_VENDA)
+        )
+        raise  # Fica registrado no Future, útil para depuração
+
+def _limpar_jobs_antigos():
+    """Apaga do disco os arquivos de jobs que passaram da retenção."""
+    for arquivo in db.excluir_jobs_antigos(RELATORIOS_RETENCAO_HORAS):
+        try:
+            os.remove(arquivo)
+        except FileNotFoundError:
+            pass
+
+def enviar_job(tipo, parametros=None, usuario_id=None):
+    """Enfileira um relatório e retorna (True, job_id) ou (False, mensagem)."""
+    if tipo not in TIPOS_RELATORIO:
+        return False, f"Tipo de relatório desconhecido: {tipo}"
+    parametros = parametros or {}
+    try:
+        db.limites_periodo(parametros.get('data_inicio'), parametros.get('data_fim'))
+    except ValueError:
+        return False, "Datas inválidas. Use o formato AAAA-MM-DD."
+
+    executor = _obter_executor()
+    os.makedirs(RELATORIOS_DIR, exist_ok=True)
+    _limpar_jobs_antigos()
+
+    job_id = uuid.uuid4().hex
+    sucesso, mensagem = db.criar_job_relatorio(job_id, tipo, parametros, usuario_id, (os.getpid(), PROCESSO_ID))
+    if not sucesso:
+        return False, mensagem
+    executor.submit(_executar_job, job_id, tipo, parametros)
+    return True, job_id
+
+def arquivo_do_job(job):
+    """Retorna (caminho, mimetype, nome_download) de um job concluído, ou None."""
+    if job['status'] != 'concluido' or not job['arquivo'] or not os.path.exists(job['arquivo']):
+        return None
+    _, extensao, mimetype = TIPOS_RELATORIO[job['tipo']]
+    carimbo = job['criado_em'].replace('-', '').replace(':', '').replace(' ', '_')
+    return job['arquivo'], mimetype, f"relatorio_loja_{carimbo}.{extensao}"
+
+def encerrar(esperar=True):
+    """Para o pool de threads (usado em testes e no desligamento do servidor)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=esperar)
+            _executor = None
@@ -0,0 +1 @@
+"""Benchmarks do Mercadinho Kairós (executar a partir da raiz do repositório)."""
@@ -0,0 +1,118 @@
+"""
+Benchmark de inicialização da aplicação.
+
+Mede, em processos Python novos (partida a frio):
+  - o relatório de `python -X importtime` de Mercadinho_kairos.app, com os
+    módulos que mais pesam;
+  - o tempo do início do processo até a resposta da primeira requisição.
+
+Sai com código 1 se a importação ou a primeira resposta passarem dos limites,
+ou se alguma dependência pesada (pandas, reportlab, openpyxl) voltar a ser
+carregada na importação do app. Os limites de tempo dependem da máquina e ficam
+só aqui; a ausência das dependências pesadas também é verificada no pytest
+(tests/test_inicializacao.py).
+
+Uso:
+    python -m benchmarks.bench_inicializacao
+    python -m benchmarks.bench_inicializacao --limite-importacao-ms 500 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ_REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULO_APP = 'Mercadinho_kairos.app'
+
+# Só podem ser importados sob demanda, pelas rotas que precisam deles
+MODULOS_PESADOS = ('pandas', 'reportlab', 'openpyxl')
+
+SCRIPT_PRIMEIRA_REQUISICAO = """
+import time
+inicio = time.perf_counter()
+from Mercadinho_kairos.app import app
+importado = time.perf_counter()
+resposta = app.test_client().get('/login')
+assert resposta.status_code == 200, resposta.status_code
+fim = time.perf_counter()
+print(f"{(importado - inicio) * 1000:.3f} {(fim - inicio) * 1000:.3f}")
+"""
+
+
+def _rodar_python(argumentos, diretorio):
+    """Roda um interpretador novo com o repositório no PYTHONPATH e um diretório de trabalho isolado."""
+    ambiente = dict(os.environ)
+    ambiente['PYTHONPATH'] = os.pathsep.join(filter(None, [RAIZ_REPOSITORIO, ambiente.get('PYTHONPATH')]))
+    ambiente.pop('PYTHONDONTWRITEBYTECODE', None)
+    return subprocess.run(
+        [sys.executable, *argumentos], cwd=diretorio, env=ambiente,
+        capture_output=True, text=True, check=True,
+    )
+
+
+def relatorio_importtime(diretorio):
+    """Retorna [(modulo, proprio_us, acumulado_us)] a partir da saída de -X importtime."""
+    saida = _rodar_python(['-X', 'importtime', '-c', f'import {MODULO_APP}'], diretorio).stderr
+    modulos = []
+    for linha in saida.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, acumulado, nome = linha[len('import time:'):].split('|')
+        modulos.append((nome.strip(), int(proprio), int(acumulado)))
+    return modulos
+
+
+def medir_primeira_requisicao(diretorio, repeticoes):
+    """Mediana (importação_ms, primeira_resposta_ms) em `repeticoes` processos novos."""
+    importacoes, respostas = [], []
+    for _ in range(repeticoes):
+        saida = _rodar_python(['-c', SCRIPT_PRIMEIRA_REQUISICAO], diretorio).stdout.split()
+        importacoes.append(float(saida[-2]))
+        respostas.append(float(saida[-1]))
+    return statistics.median(importacoes), statistics.median(respostas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="Quantos módulos mais caros listar")
+    parser.add_argument('--limite-importacao-ms', type=float, default=1000.0)
+    parser.add_argument('--limite-primeira-requisicao-ms', type=float, default=1500.0)
+    args = parser.parse_args()
+
+    falhas = []
+    # Diretório vazio: o banco (loja.db, caminho relativo) e caches não tocam o repositório
+    with tempfile.TemporaryDirectory(prefix='bench_inicializacao_') as diretorio:
+        modulos = relatorio_importtime(diretorio)
+        importacao_ms, primeira_ms = medir_primeira_requisicao(diretorio, args.repeticoes)
+
+    print(f"Módulos mais caros na importação de {MODULO_APP} (tempo próprio):")
+    print(f"{'próprio (ms)':>13} | {'acumulado (ms)':>15} | módulo")
+    for nome, proprio, acumulado in sorted(modulos, key=lambda m: m[1], reverse=True)[:args.top]:
+        print(f"{proprio / 1000:>13.1f} | {acumulado / 1000:>15.1f} | {nome}")
+
+    carregados = {nome.split('.')[0] for nome, _, _ in modulos}
+    pesados = sorted(carregados.intersection(MODULOS_PESADOS))
+    if pesados:
+        falhas.append(f"dependências pesadas importadas na inicialização: {', '.join(pesados)}")
+
+    print(f"\nImportação do app (mediana de {args.repeticoes}): {importacao_ms:.1f} ms "
+          f"(limite {args.limite_importacao_ms:.0f} ms)")
+    print(f"Partida a frio até a primeira resposta: {primeira_ms:.1f} ms "
+          f"(limite {args.limite_primeira_requisicao_ms:.0f} ms)")
+    if importacao_ms > args.limite_importacao_ms:
+        falhas.append(f"importação levou {importacao_ms:.1f} ms")
+    if primeira_ms > args.limite_primeira_requisicao_ms:
+        falhas.append(f"primeira resposta levou {primeira_ms:.1f} ms")
+
+    if falhas:
+        for falha in falhas:
+            print(f"[REGRESSÃO] {falha}")
+        sys.exit(1)
+    print("[OK] Inicialização dentro dos limites.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark do filtro de relatórios por período.
+
+Compara o filtro antigo (DATE(v.data_venda) BETWEEN ...), que não usa índice,
+com o intervalo semiaberto sobre a coluna crua usado por get_vendas_por_periodo.
+
+Uso:
+    python -m benchmarks.bench_periodo_vendas --vendas 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import Mercadinho_kairos.logica_banco as db
+
+CONSULTA_BASE = """
+    SELECT v.id, v.data_venda, v.total, iv.produto_id, iv.quantidade, iv.preco_unitario
+    FROM vendas v
+    JOIN itens_vendidos iv ON v.id = iv.venda_id
+    WHERE {filtro}
+    ORDER BY v.data_venda DESC, v.id DESC
+"""
+FILTRO_ANTIGO = "DATE(v.data_venda) >= ? AND DATE(v.data_venda) <= ?"
+FILTRO_NOVO = "v.data_venda >= ? AND v.data_venda < ?"
+
+
+def popular_banco(caminho, total_vendas, dias=730, seed=42):
+    """Cria um banco com `total_vendas` vendas (um item cada) espalhadas por `dias` dias."""
+    db.DB_NAME = caminho
+    db.setup_database()
+    rnd = random.Random(seed)
+    inicio = datetime(2024, 1, 1)
+    conn = sqlite3.connect(caminho)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.executemany(
+        "INSERT INTO produtos (nome, preco, quantidade, codigo_barras) VALUES (?, ?, ?, ?)",
+        ((f"Produto {i}", 5.0, 1000, f"789{i:010d}") for i in range(1, 501)),
+    )
+    lote = 50_000
+    for base in range(0, total_vendas, lote):
+        n = min(lote, total_vendas - base)
+        vendas = []
+        itens = []
+        for i in range(base + 1, base + n + 1):
+            data = inicio + timedelta(seconds=rnd.randrange(dias * 86400))
+            vendas.append((i, data.strftime(db.FORMATO_DATA_VENDA), 10.0, 'Dinheiro', 10.0, 0.0))
+            itens.append((i, rnd.randint(1, 500), 2, 5.0))
+        conn.executemany(
+            "INSERT INTO vendas (id, data_venda, total, forma_pagamento, valor_pago, troco) VALUES (?, ?, ?, ?, ?, ?)",
+            vendas,
+        )
+        conn.executemany(
+            "INSERT INTO itens_vendidos (venda_id, produto_id, quantidade, preco_unitario) VALUES (?, ?, ?, ?)",
+            itens,
+        )
+        conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def medir(conn, filtro, params, repeticoes):
+    sql = CONSULTA_BASE.format(filtro=filtro)
+    tempos = []
+    linhas = 0
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        linhas = len(conn.execute(sql, params).fetchall())
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tempos), linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vendas', type=int, default=1_000_000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--banco', help="Reutiliza um banco já populado em vez de gerar um temporário")
+    args = parser.parse_args()
+
+    caminho = args.banco
+    if not caminho:
+        caminho = os.path.join(tempfile.mkdtemp(prefix='bench_periodo_'), 'bench.db')
+        t0 = time.perf_counter()
+        popular_banco(caminho, args.vendas)
+        print(f"Banco com {args.vendas} vendas gerado em {time.perf_counter() - t0:.1f}s: {caminho}")
+
+    conn = sqlite3.connect(caminho)
+    print(f"{'janela':>8} | {'linhas':>7} | {'DATE() (ms)':>12} | {'faixa (ms)':>11} | ganho")
+    for dias in (1, 7, 30):
+        data_inicio = '2024-06-01'
+        data_fim = (datetime(2024, 6, 1) + timedelta(days=dias - 1)).strftime('%Y-%m-%d')
+        antigo, linhas_antigo = medir(conn, FILTRO_ANTIGO, (data_inicio, data_fim), args.repeticoes)
+        novo, linhas_novo = medir(conn, FILTRO_NOVO, db.limites_periodo(data_inicio, data_fim), args.repeticoes)
+        assert linhas_antigo == linhas_novo, "Os dois filtros devem retornar as mesmas linhas"
+        print(f"{dias:>6}d | {linhas_novo:>7} | {antigo:>12.1f} | {novo:>11.2f} | {antigo / max(novo, 1e-6):.0f}x")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""
+Suíte de benchmarks reprodutível de logica_banco e das rotas do app.
+
+Gera um banco sintético (benchmarks.dados_sinteticos) em um diretório temporário
+e mede, sempre com a mesma semente:
+  - micro: buscar_produto_por_codigo (código de barras, código pesável, código
+    inexistente), registrar_venda_completa, get_relatorio_vendas_detalhado e
+    get_estatisticas_gerais;
+  - rotas: páginas e APIs principais pelo test client do Flask, já logado e com
+    o cache de respostas esvaziado antes de cada requisição.
+
+Os resultados (mediana, p95, média...) podem ser gravados em JSON com --saida.
+Com --baseline, cada mediana é comparada com a do JSON anterior; o script sai com
+código 1 se alguma piorar mais que a tolerância.
+
+Uso:
+    python -m benchmarks.bench_suite --saida benchmarks_baseline.json
+    python -m benchmarks.bench_suite --baseline benchmarks_baseline.json --tolerancia 0.25
+    python -m benchmarks.bench_suite --vendas 200000 --repeticoes-rotas 50
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import Mercadinho_kairos.logica_banco as db
+from benchmarks import dados_sinteticos
+
+USUARIO_BENCH = ('bench', 'bench123')
+
+# Diferenças menores que isto são ruído de medição, mesmo que passem da tolerância relativa
+PISO_REGRESSAO_MS = 0.05
+
+
+def estatisticas(tempos_ms):
+    ordenados = sorted(tempos_ms)
+    return {
+        'n': len(ordenados),
+        'mediana_ms': round(statistics.median(ordenados), 4),
+        'p95_ms': round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))], 4),
+        'media_ms': round(statistics.fmean(ordenados), 4),
+        'min_ms': round(ordenados[0], 4),
+        'max_ms': round(ordenados[-1], 4),
+    }
+
+
+def medir(funcao, chamadas, aquecimento=1):
+    """Tempo de cada chamada `funcao(*args)`, para cada args em `chamadas` (as primeiras não contam)."""
+    tempos = []
+    with contextlib.redirect_stdout(io.StringIO()):  # Mensagens de terminal não entram na medição
+        for i, args in enumerate(chamadas):
+            inicio = time.perf_counter()
+            funcao(*args)
+            if i >= aquecimento:
+                tempos.append((time.perf_counter() - inicio) * 1000)
+    return estatisticas(tempos)
+
+
+# ==============================================================================
+# MICRO-BENCHMARKS (logica_banco)
+# ==============================================================================
+def carrinhos(rnd, produtos, quantidade):
+    """Carrinhos no formato de /caixa/finalizar, com o tamanho realista do gerador."""
+    resultado = []
+    for _ in range(quantidade):
+        itens = [
+            {'id': produto_id, 'quantidade': rnd.choice((1, 1, 2, 3)), 'preco': preco}
+            for produto_id, preco in rnd.sample(produtos, min(len(produtos), dados_sinteticos.tamanho_carrinho(rnd)))
+        ]
+        total = round(sum(item['quantidade'] * item['preco'] for item in itens), 2)
+        resultado.append((None, itens, total, 'pix', total, 0.0))
+    return resultado
+
+
+def micro_benchmarks(rnd, repeticoes):
+    conn = sqlite3.connect(db.DB_NAME)
+    barras = [row[0] for row in conn.execute("SELECT codigo_barras FROM produtos WHERE codigo_barras IS NOT NULL")]
+    personalizados = [row[0] for row in conn.execute("SELECT codigo_personalizado FROM produtos_pesaveis")]
+    produtos = conn.execute("SELECT id, preco FROM produtos WHERE codigo_barras IS NOT NULL").fetchall()
+    conn.close()
+
+    db.carregar_indice_produtos()  # Como no app, o índice é aquecido na inicialização
+    resultados = {}
+    if barras:
+        resultados['buscar_produto_por_codigo/barras'] = medir(
+            db.buscar_produto_por_codigo, [(rnd.choice(barras),) for _ in range(repeticoes * 20)])
+    if personalizados:
+        resultados['buscar_produto_por_codigo/pesavel'] = medir(
+            db.buscar_produto_por_codigo, [(rnd.choice(personalizados),) for _ in range(repeticoes * 20)])
+    resultados['buscar_produto_por_codigo/inexistente'] = medir(
+        db.buscar_produto_por_codigo, [(f"000{rnd.randrange(10**9)}",) for _ in range(repeticoes * 20)])
+    resultados['get_estatisticas_gerais'] = medir(db.get_estatisticas_gerais, [()] * (repeticoes * 4))
+    resultados['get_relatorio_vendas_detalhado'] = medir(
+        db.get_relatorio_vendas_detalhado, [()] * max(3, repeticoes // 10))
+    if produtos:
+        resultados['registrar_venda_completa'] = medir(
+            db.registrar_venda_completa, carrinhos(rnd, produtos, repeticoes * 2))
+    return resultados
+
+
+# ==============================================================================
+# ROTAS (Flask test client)
+# ==============================================================================
+def rotas_benchmarks(rnd, repeticoes):
+    # Importado só aqui: o banco e o diretório de trabalho já apontam para o ambiente temporário
+    from Mercadinho_kairos.app import app
+    import Mercadinho_kairos.cache_respostas as cache_respostas
+    import Mercadinho_kairos.recibos as recibos
+    recibos.RECIBOS_PRE_RENDERIZAR = False  # Renderização em segundo plano só adicionaria ruído
+    logging.getLogger('Mercadinho_kairos').setLevel(logging.WARNING)  # Sem log de acesso por requisição
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.add_user(*USUARIO_BENCH)
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': USUARIO_BENCH[0], 'password': USUARIO_BENCH[1]})
+    cliente.get('/dashboard')  # Consome a mensagem de boas-vindas
+
+    conn = sqlite3.connect(db.DB_NAME)
+    barras = [row[0] for row in conn.execute("SELECT codigo_barras FROM produtos WHERE codigo_barras IS NOT NULL LIMIT 500")]
+    produtos = conn.execute("SELECT id, preco FROM produtos WHERE codigo_barras IS NOT NULL").fetchall()
+    conn.close()
+
+    def get(url):
+        def requisitar():
+            cache_respostas.cache.limpar()
+            resposta = cliente.get(url)
+            assert resposta.status_code == 200, (url, resposta.status_code)
+        return requisitar
+
+    def post(url, corpo):
+        cache_respostas.cache.limpar()
+        resposta = cliente.post(url, json=corpo)
+        assert resposta.status_code == 200, (url, resposta.status_code)
+
+    resultados = {}
+    for url in ('/dashboard', '/produtos', '/clientes', '/vendas', '/relatorios',
+                '/api/produtos?limit=50', '/api/relatorios/vendas', '/api/catalogo'):
+        resultados[f"GET {url}"] = medir(get(url), [()] * repeticoes)
+
+    resultados['POST /caixa/buscar_auto (código)'] = medir(
+        post, [('/caixa/buscar_auto', {'codigo': rnd.choice(barras)}) for _ in range(repeticoes)])
+    resultados['POST /caixa/buscar_auto (nome)'] = medir(
+        post, [('/caixa/buscar_auto', {'codigo': rnd.choice(dados_sinteticos.CATEGORIAS)}) for _ in range(repeticoes)])
+
+    vendas = []
+    for cliente_id, itens, total, forma, valor_pago, troco in carrinhos(rnd, produtos, repeticoes):
+        vendas.append(('/caixa/finalizar', {'cliente_id': cliente_id, 'itens': itens, 'total': total,
+                                            'forma_pagamento': forma, 'valor_pago': valor_pago, 'troco': troco}))
+    resultados['POST /caixa/finalizar'] = medir(post, vendas)
+    return resultados
+
+
+# ==============================================================================
+# BASELINE
+# ==============================================================================
+def comparar(atual, baseline, tolerancia):
+    """Imprime a comparação das medianas e retorna os nomes que pioraram além da tolerância."""
+    if atual['meta']['dados'] != baseline['meta'].get('dados'):
+        print("[AVISO] A baseline foi gerada com outros parâmetros de dados; a comparação é aproximada.")
+    regressoes = []
+    print(f"\n{'benchmark':<45} | {'baseline (ms)':>13} | {'atual (ms)':>11} | variação")
+    for nome, resultado in atual['resultados'].items():
+        anterior = baseline['resultados'].get(nome)
+        if anterior is None:
+            print(f"{nome:<45} | {'—':>13} | {resultado['mediana_ms']:>11.3f} | novo")
+            continue
+        base_ms, atual_ms = anterior['mediana_ms'], resultado['mediana_ms']
+        variacao = (atual_ms - base_ms) / base_ms if base_ms else 0.0
+        piorou = variacao > tolerancia and atual_ms - base_ms > PISO_REGRESSAO_MS
+        if piorou:
+            regressoes.append(nome)
+        print(f"{nome:<45} | {base_ms:>13.3f} | {atual_ms:>11.3f} | {variacao:+.1%}{'  <- REGRESSÃO' if piorou else ''}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    dados_sinteticos.adicionar_argumentos(parser)
+    parser.add_argument('--repeticoes', type=int, default=100, help="Base de repetições dos micro-benchmarks")
+    parser.add_argument('--repeticoes-rotas', type=int, default=30)
+    parser.add_argument('--saida', help="Grava os resultados neste JSON (ex.: para usar como baseline)")
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para comparar")
+    parser.add_argument('--tolerancia', type=float, default=0.20, help="Piora relativa aceita na mediana")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            baseline = json.load(arquivo)
+    saida = os.path.abspath(args.saida) if args.saida else None
+
+    parametros = dados_sinteticos.parametros_gerador(args)
+    diretorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='bench_suite_') as diretorio:
+        os.chdir(diretorio)  # Caches de recibos/relatórios do app ficam no diretório temporário
+        try:
+            t0 = time.perf_counter()
+            dados_sinteticos.gerar_banco(os.path.join(diretorio, 'bench.db'), **parametros)
+            print(f"Banco sintético gerado em {time.perf_counter() - t0:.1f}s ({parametros})")
+            rnd = random.Random(args.seed)
+            resultados = micro_benchmarks(rnd, args.repeticoes)
+            resultados.update(rotas_benchmarks(rnd, args.repeticoes_rotas))
+        finally:
+            db.fechar_pool()
+            os.chdir(diretorio_original)
+
+    relatorio = {
+        'meta': {
+            'data': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'plataforma': platform.platform(),
+            'dados': parametros,
+            'repeticoes': args.repeticoes,
+            'repeticoes_rotas': args.repeticoes_rotas,
+        },
+        'resultados': resultados,
+    }
+
+    print(f"\n{'benchmark':<45} | {'mediana (ms)':>12} | {'p95 (ms)':>9} | {'n':>5}")
+    for nome, resultado in resultados.items():
+        print(f"{nome:<45} | {resultado['mediana_ms']:>12.3f} | {resultado['p95_ms']:>9.3f} | {resultado['n']:>5}")
+
+    if saida:
+        with open(saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+        print(f"\nResultados gravados em {saida}")
+
+    if baseline:
+        regressoes = comparar(relatorio, baseline, args.tolerancia)
+        if regressoes:
+            print(f"\n[REGRESSÃO] {len(regressoes)} benchmark(s) acima da tolerância de {args.tolerancia:.0%}")
+            sys.exit(1)
+        print("\n[OK] Nenhuma regressão em relação à baseline.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+"""
+Teste de carga do fluxo de caixa com vários terminais simultâneos.
+
+Simula N operadores de caixa contra o app já rodando (HTTP de verdade). Cada
+um faz login, baixa o catálogo (/api/catalogo) e repete, até acabar o tempo:
+  - monta um carrinho de tamanho realista, bipando cada item em /caixa/buscar_auto
+    (mistura de código de barras exato, código de pesável e busca por nome);
+  - fecha a venda em /caixa/finalizar.
+
+Relata, por endpoint, latência p50/p95/p99, erros e a taxa de "database is locked",
+e a vazão em vendas por minuto. Com várias contagens em --caixas (ex.: 1,2,4,8),
+roda uma rodada para cada uma e mostra onde a vazão para de crescer.
+
+Rode contra um banco descartável com estoque folgado, por exemplo:
+    python -m benchmarks.dados_sinteticos /tmp/carga/loja.db
+    cd /tmp/carga && python -m Mercadinho_kairos.app        # usa ./loja.db
+    python -m benchmarks.carga_caixas --caixas 1,2,4,8 --duracao 30 --cadastrar
+
+Uso:
+    python -m benchmarks.carga_caixas --url http://127.0.0.1:5000 --caixas 4 --duracao 60
+"""
+import argparse
+import http.cookiejar
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from benchmarks import dados_sinteticos
+
+# Proporção de cada tipo de bipagem (o restante é busca por nome)
+FRACAO_CODIGO_BARRAS = 0.70
+FRACAO_PESAVEL = 0.15
+ENDPOINTS = ('/caixa/buscar_auto', '/caixa/finalizar')
+
+
+class Terminal:
+    """Um operador de caixa: sessão própria (cookies) e registro das próprias medições."""
+
+    def __init__(self, url_base, timeout):
+        self.url_base = url_base.rstrip('/')
+        self.timeout = timeout
+        self.abridor = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def requisitar(self, caminho, json_corpo=None, formulario=None):
+        """Retorna (status, corpo_texto, url_final, ms)."""
+        dados, cabecalhos = None, {}
+        if json_corpo is not None:
+            dados = json.dumps(json_corpo).encode('utf-8')
+            cabecalhos['Content-Type'] = 'application/json'
+        elif formulario is not None:
+            dados = urllib.parse.urlencode(formulario).encode('utf-8')
+        pedido = urllib.request.Request(self.url_base + caminho, data=dados, headers=cabecalhos)
+        inicio = time.perf_counter()
+        try:
+            with self.abridor.open(pedido, timeout=self.timeout) as resposta:
+                corpo = resposta.read().decode('utf-8', 'replace')
+                status, url_final = resposta.status, resposta.geturl()
+        except urllib.error.HTTPError as e:
+            corpo = e.read().decode('utf-8', 'replace')
+            status, url_final = e.code, e.geturl()
+        return status, corpo, url_final, (time.perf_counter() - inicio) * 1000
+
+    def entrar(self, usuario, senha, cadastrar=False):
+        _, _, url_final, _ = self.requisitar('/login', formulario={'username': usuario, 'password': senha})
+        if '/login' not in url_final:
+            return True
+        if cadastrar:
+            self.requisitar('/cadastro', formulario={
+                'username': usuario, 'password': senha, 'confirm_password': senha})
+            return self.entrar(usuario, senha)
+        return False
+
+
+def carregar_itens_bipaveis(terminal):
+    """Códigos de barras, códigos de pesáveis e termos de nome a partir do catálogo do PDV."""
+    status, corpo, _, _ = terminal.requisitar('/api/catalogo')
+    if status != 200:
+        raise RuntimeError(f"/api/catalogo respondeu {status}")
+    catalogo = json.loads(corpo)
+    campos = catalogo['campos']
+    barras, pesaveis, nomes = [], [], set()
+    for linha in catalogo['produtos']:
+        produto = dict(zip(campos, linha))
+        if produto['codigo_barras']:
+            barras.append(produto['codigo_barras'])
+        pesaveis.extend(codigo for codigo, _ in produto['pesaveis'])
+        nomes.add(produto['nome'].split()[0])
+    if not barras and not pesaveis:
+        raise RuntimeError("O catálogo não tem produtos com código para bipar")
+    return barras, pesaveis, sorted(nomes)
+
+
+class Medicoes:
+    """Latências e contagens de todos os terminais, protegidas por lock."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencias = {endpoint: [] for endpoint in ENDPOINTS}
+        self.erros = {endpoint: 0 for endpoint in ENDPOINTS}
+        self.travados = {endpoint: 0 for endpoint in ENDPOINTS}
+        self.vendas = 0
+        self.sem_estoque = 0
+
+    def registrar(self, endpoint, ms, ok, corpo):
+        with self.lock:
+            self.latencias[endpoint].append(ms)
+            if not ok:
+                self.erros[endpoint] += 1
+                if 'database is locked' in corpo or 'database is busy' in corpo:
+                    self.travados[endpoint] += 1
+
+
+def bipar(terminal, medicoes, rnd, barras, pesaveis, nomes):
+    """Bipa um item como o operador faria; retorna o item do carrinho ou None."""
+    sorteio = rnd.random()
+    if barras and (sorteio < FRACAO_CODIGO_BARRAS or not (pesaveis or nomes)):
+        termo = rnd.choice(barras)
+    elif pesaveis and sorteio < FRACAO_CODIGO_BARRAS + FRACAO_PESAVEL:
+        termo = rnd.choice(pesaveis)
+    else:
+        termo = rnd.choice(nomes)
+
+    status, corpo, _, ms = terminal.requisitar('/caixa/buscar_auto', json_corpo={'codigo': termo})
+    try:
+        dados = json.loads(corpo)
+    except ValueError:
+        dados = {}
+    # "Produto não encontrado" é resposta válida da busca; erro é falha do servidor
+    medicoes.registrar('/caixa/buscar_auto', ms, status == 200, corpo)
+    if not dados.get('success'):
+        return None
+    if dados.get('produto'):
+        produto = dados['produto']
+        if dados.get('pesavel'):
+            return {'id': produto['id'], 'quantidade': round(rnd.uniform(0.2, 2.0), 3),
+                    'preco': produto.get('preco_por_kg') or 0.0}
+        return {'id': produto['id'], 'quantidade': 1, 'preco': produto['preco']}
+    if dados.get('produtos'):  # Busca por nome: o operador escolhe um dos resultados
+        produto = rnd.choice(dados['produtos'])
+        return {'id': produto['id'], 'quantidade': 1, 'preco': produto['preco']}
+    return None
+
+
+def operar_caixa(numero, args, medicoes, fim, prontos, falhas):
+    rnd = random.Random(args.seed * 1000 + numero)
+    terminal = Terminal(args.url, args.timeout)
+    try:
+        if not terminal.entrar(args.usuario, args.senha, args.cadastrar):
+            raise RuntimeError(f"login de '{args.usuario}' falhou (use --cadastrar para criar o usuário)")
+        barras, pesaveis, nomes = carregar_itens_bipaveis(terminal)
+    except Exception as e:
+        falhas.append(f"caixa {numero}: {e}")
+        prontos.wait()
+        return
+    prontos.wait()  # Todos começam juntos, já logados
+
+    while time.monotonic() < fim['instante']:
+        itens = []
+        for _ in range(dados_sinteticos.tamanho_carrinho(rnd)):
+            item = bipar(terminal, medicoes, rnd, barras, pesaveis, nomes)
+            if item:
+                itens.append(item)
+            if args.pausa_bipagem_ms:
+                time.sleep(args.pausa_bipagem_ms / 1000)
+        if not itens:
+            continue
+        total = round(sum(item['quantidade'] * item['preco'] for item in itens), 2)
+        status, corpo, _, ms = terminal.requisitar('/caixa/finalizar', json_corpo={
+            'cliente_id': None, 'itens': itens, 'total': total,
+            'forma_pagamento': rnd.choice(('dinheiro', 'pix', 'cartao')), 'valor_pago': total, 'troco': 0.0,
+        })
+        try:
+            sucesso = status == 200 and json.loads(corpo).get('success') is True
+        except ValueError:
+            sucesso = False
+        # 409 é a recusa por falta de estoque: resposta válida, não erro do servidor
+        medicoes.registrar('/caixa/finalizar', ms, sucesso or status == 409, corpo)
+        with medicoes.lock:
+            if sucesso:
+                medicoes.vendas += 1
+            elif status == 409:
+                medicoes.sem_estoque += 1
+
+
+def rodada(args, caixas):
+    """Roda `caixas` terminais por args.duracao segundos e retorna o resumo da rodada."""
+    medicoes = Medicoes()
+    prontos = threading.Barrier(caixas + 1)
+    fim, falhas = {'instante': float('inf')}, []
+    threads = [threading.Thread(target=operar_caixa, args=(i, args, medicoes, fim, prontos, falhas), daemon=True)
+               for i in range(caixas)]
+    for thread in threads:
+        thread.start()
+    prontos.wait()
+    inicio = time.monotonic()
+    fim['instante'] = inicio + args.duracao
+    for thread in threads:
+        thread.join()
+    decorrido = time.monotonic() - inicio
+    if falhas:
+        raise RuntimeError("; ".join(falhas))
+
+    resumo = {'caixas': caixas, 'duracao_s': round(decorrido, 2), 'vendas': medicoes.vendas,
+              'vendas_por_minuto': round(medicoes.vendas / decorrido * 60, 1),
+              'sem_estoque': medicoes.sem_estoque, 'endpoints': {}}
+    for endpoint in ENDPOINTS:
+        tempos = sorted(medicoes.latencias[endpoint])
+        total = len(tempos)
+        resumo['endpoints'][endpoint] = {
+            'n': total,
+            'p50_ms': round(percentil(tempos, 50), 2),
+            'p95_ms': round(percentil(tempos, 95), 2),
+            'p99_ms': round(percentil(tempos, 99), 2),
+            'max_ms': round(tempos[-1], 2) if tempos else 0.0,
+            'erros': medicoes.erros[endpoint],
+            'taxa_locked': round(medicoes.travados[endpoint] / total, 4) if total else 0.0,
+        }
+    return resumo
+
+
+def percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    if len(ordenados) == 1:
+        return ordenados[0]
+    return statistics.quantiles(ordenados, n=100, method='inclusive')[p - 1]
+
+
+def imprimir(resumo):
+    print(f"\n== {resumo['caixas']} caixa(s), {resumo['duracao_s']:.0f}s: "
+          f"{resumo['vendas']} vendas ({resumo['vendas_por_minuto']:.1f}/min)"
+          + (f", {resumo['sem_estoque']} recusadas por estoque" if resumo['sem_estoque'] else ""))
+    print(f"{'endpoint':<20} | {'n':>6} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'max ms':>8} | {'erros':>5} | locked")
+    for endpoint, e in resumo['endpoints'].items():
+        print(f"{endpoint:<20} | {e['n']:>6} | {e['p50_ms']:>8.1f} | {e['p95_ms']:>8.1f} | {e['p99_ms']:>8.1f} "
+              f"| {e['max_ms']:>8.1f} | {e['erros']:>5} | {e['taxa_locked']:.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--caixas', default='4', help="Quantidade de terminais, ou lista para várias rodadas (1,2,4,8)")
+    parser.add_argument('--duracao', type=float, default=30.0, help="Segundos por rodada")
+    parser.add_argument('--usuario', default='carga')
+    parser.add_argument('--senha', default='carga123')
+    parser.add_argument('--cadastrar', action='store_true', help="Cria o usuário em /cadastro se o login falhar")
+    parser.add_argument('--pausa-bipagem-ms', type=float, default=0.0, help="Intervalo entre bipagens (0 = estresse)")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--saida', help="Grava os resumos das rodadas neste JSON")
+    args = parser.parse_args()
+
+    try:
+        contagens = [int(n) for n in args.caixas.split(',') if n.strip()]
+    except ValueError:
+        parser.error("--caixas deve ser um número ou uma lista como 1,2,4,8")
+
+    resumos = []
+    for caixas in contagens:
+        try:
+            resumo = rodada(args, caixas)
+        except (RuntimeError, OSError) as e:
+            print(f"[ERRO] Rodada com {caixas} caixa(s) não pôde rodar: {e}")
+            sys.exit(1)
+        imprimir(resumo)
+        resumos.append(resumo)
+
+    if len(resumos) > 1:
+        print(f"\n{'caixas':>6} | {'vendas/min':>10} | {'finalizar p95 ms':>16} | locked")
+        for resumo in resumos:
+            finalizar = resumo['endpoints']['/caixa/finalizar']
+            print(f"{resumo['caixas']:>6} | {resumo['vendas_por_minuto']:>10.1f} | "
+                  f"{finalizar['p95_ms']:>16.1f} | {finalizar['taxa_locked']:.2%}")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump({'url': args.url, 'duracao_s': args.duracao, 'rodadas': resumos}, arquivo, indent=2)
+        print(f"\nResumos gravados em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""
+Gerador determinístico de dados de loja para benchmarks.
+
+Cria um banco SQLite novo, com o schema do app (setup_database), contendo:
+  - N produtos com código de barras EAN-13 e preços variados;
+  - M produtos pesáveis (código personalizado e preço por kg);
+  - K clientes;
+  - S vendas espalhadas pelos últimos dias, com carrinhos de tamanho realista
+    (maioria pequena, cauda longa até CARRINHO_MAX itens) e baixa de estoque.
+
+A mesma semente gera sempre o mesmo banco. Contadores, resumo diário e índice
+FTS ficam consistentes, como se as vendas tivessem passado pelo caixa.
+
+Uso:
+    python -m benchmarks.dados_sinteticos loja_bench.db
+    python -m benchmarks.dados_sinteticos loja_bench.db --produtos 20000 --vendas 200000 --seed 7
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import Mercadinho_kairos.logica_banco as db
+
+CARRINHO_MAX = 40
+FORMAS_PAGAMENTO = (('dinheiro', 0.35), ('pix', 0.40), ('cartao', 0.25))
+FRACAO_VENDAS_COM_CLIENTE = 0.3
+FRACAO_ITENS_PESAVEIS = 0.15
+DATA_REFERENCIA = datetime(2026, 1, 1)  # Fixa: o banco não depende do dia em que foi gerado
+LOTE_INSERCAO = 20_000
+
+CATEGORIAS = ('Arroz', 'Feijão', 'Café', 'Leite', 'Biscoito', 'Sabão', 'Refrigerante', 'Macarrão',
+              'Óleo', 'Açúcar', 'Detergente', 'Suco', 'Iogurte', 'Queijo', 'Chocolate', 'Farinha')
+MARCAS = ('Kairós', 'Boa Safra', 'Do Vale', 'Serrana', 'Premium', 'Econômico', 'Nativa', 'Sol')
+HORTIFRUTI = ('Banana', 'Tomate', 'Batata', 'Cebola', 'Maçã', 'Laranja', 'Alho', 'Cenoura',
+              'Mamão', 'Carne moída', 'Frango', 'Linguiça', 'Queijo muçarela', 'Presunto')
+NOMES = ('Ana', 'Bruno', 'Carla', 'Diego', 'Elaine', 'Fábio', 'Gabriela', 'Hugo', 'Isabela', 'João',
+         'Karen', 'Lucas', 'Marina', 'Nicolas', 'Olívia', 'Paulo', 'Queila', 'Rafael', 'Sofia', 'Tiago')
+SOBRENOMES = ('Silva', 'Souza', 'Oliveira', 'Santos', 'Lima', 'Pereira', 'Costa', 'Almeida', 'Ribeiro')
+
+
+def ean13(numero):
+    """Código EAN-13 válido (prefixo 789, Brasil) para o número sequencial."""
+    corpo = f"789{numero:09d}"
+    soma = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(corpo))
+    return corpo + str((10 - soma % 10) % 10)
+
+
+def codigo_pesavel(numero):
+    return f"P{numero:05d}"
+
+
+def tamanho_carrinho(rnd):
+    """Maioria de 1 a 8 itens, com cauda longa de compras de mês."""
+    return min(CARRINHO_MAX, max(1, int(rnd.lognormvariate(1.4, 0.7))))
+
+
+def gerar_banco(caminho, produtos=5000, pesaveis=300, clientes=2000, vendas=50000, dias=365, seed=42):
+    """Gera o banco em `caminho` (substituindo um existente) e retorna um resumo do que foi criado."""
+    pesaveis = min(pesaveis, produtos)
+    for sufixo in ('', '-wal', '-shm'):
+        if os.path.exists(caminho + sufixo):
+            os.remove(caminho + sufixo)
+
+    db.fechar_pool()
+    db.DB_NAME = caminho
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not db.setup_database():
+            raise RuntimeError(f"Não foi possível criar o schema em {caminho}")
+    db.fechar_pool()
+
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(caminho)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    # Produtos: os primeiros `pesaveis` são de hortifruti/açougue, vendidos por kg
+    linhas_produtos, precos = [], {}
+    for i in range(1, produtos + 1):
+        if i <= pesaveis:
+            nome = f"{HORTIFRUTI[i % len(HORTIFRUTI)]} {MARCAS[i % len(MARCAS)]} {i}"
+            preco = round(rnd.uniform(3, 60), 2)
+            codigo = None
+        else:
+            nome = f"{CATEGORIAS[i % len(CATEGORIAS)]} {MARCAS[(i // len(CATEGORIAS)) % len(MARCAS)]} {i}"
+            preco = round(rnd.lognormvariate(2.0, 0.8), 2) + 0.5
+            codigo = ean13(i)
+        precos[i] = preco
+        # Estoque folgado: as vendas geradas nunca zeram um produto
+        linhas_produtos.append((i, nome, preco, 1_000_000, codigo))
+    conn.executemany(
+        "INSERT INTO produtos (id, nome, preco, quantidade, codigo_barras) VALUES (?, ?, ?, ?, ?)",
+        linhas_produtos,
+    )
+    conn.executemany(
+        "INSERT INTO produtos_pesaveis (produto_id, preco_por_kg, codigo_personalizado) VALUES (?, ?, ?)",
+        ((i, precos[i], codigo_pesavel(i)) for i in range(1, pesaveis + 1)),
+    )
+
+    conn.executemany(
+        "INSERT INTO clientes (id, nome, telefone, email, cpf_cnpj, endereco) VALUES (?, ?, ?, ?, ?, ?)",
+        ((i,
+          f"{NOMES[i % len(NOMES)]} {SOBRENOMES[(i // len(NOMES)) % len(SOBRENOMES)]} {i}",
+          f"(11) 9{rnd.randrange(10**7, 10**8)}",
+          f"cliente{i}@exemplo.com.br",
+          f"{i:011d}",
+          f"Rua {rnd.choice(SOBRENOMES)}, {rnd.randint(1, 2000)}")
+         for i in range(1, clientes + 1)),
+    )
+    conn.commit()
+
+    # Vendas em ordem cronológica, com horário comercial e baixa de estoque agregada no fim
+    formas = [f for f, _ in FORMAS_PAGAMENTO]
+    pesos_formas = [p for _, p in FORMAS_PAGAMENTO]
+    inicio = DATA_REFERENCIA - timedelta(days=dias)
+    instantes = sorted(
+        inicio + timedelta(days=rnd.randrange(dias), hours=rnd.uniform(8, 21)) for _ in range(vendas)
+    )
+    baixas = {}
+    total_itens = 0
+    for base in range(0, vendas, LOTE_INSERCAO):
+        linhas_vendas, linhas_itens = [], []
+        for venda_id in range(base + 1, min(base + LOTE_INSERCAO, vendas) + 1):
+            total = 0.0
+            for _ in range(tamanho_carrinho(rnd)):
+                if pesaveis and (produtos == pesaveis or rnd.random() < FRACAO_ITENS_PESAVEIS):
+                    produto_id = rnd.randint(1, pesaveis)
+                    quantidade = round(rnd.uniform(0.1, 2.5), 3)
+                else:
+                    # Poucos produtos concentram a maior parte das vendas
+                    produto_id = pesaveis + 1 + int((produtos - pesaveis) * rnd.random() ** 3)
+                    quantidade = rnd.choice((1, 1, 1, 1, 2, 2, 3, 6))
+                preco = precos[produto_id]
+                linhas_itens.append((venda_id, produto_id, quantidade, preco))
+                baixas[produto_id] = baixas.get(produto_id, 0) + quantidade
+                total += quantidade * preco
+            total = round(total, 2)
+            forma = rnd.choices(formas, pesos_formas)[0]
+            valor_pago = float(-(-total // 10) * 10) if forma == 'dinheiro' else total
+            cliente_id = rnd.randint(1, clientes) if clientes and rnd.random() < FRACAO_VENDAS_COM_CLIENTE else None
+            linhas_vendas.append((
+                venda_id, cliente_id, instantes[venda_id - 1].strftime(db.FORMATO_DATA_VENDA),
+                total, forma, valor_pago, round(valor_pago - total, 2),
+            ))
+        conn.executemany(
+            "INSERT INTO vendas (id, cliente_id, data_venda, total, forma_pagamento, valor_pago, troco) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            linhas_vendas,
+        )
+        conn.executemany(
+            "INSERT INTO itens_vendidos (venda_id, produto_id, quantidade, preco_unitario) VALUES (?, ?, ?, ?)",
+            linhas_itens,
+        )
+        total_itens += len(linhas_itens)
+        conn.commit()
+
+    conn.executemany("UPDATE produtos SET quantidade = quantidade - ? WHERE id = ?",
+                     ((quantidade, produto_id) for produto_id, quantidade in baixas.items()))
+    # As vendas entraram direto nas tabelas: resumo diário e contadores são montados de uma vez
+    # (os contadores também evitam o ruído de ponto flutuante das somas feitas pelos triggers)
+    conn.execute("DELETE FROM vendas_diarias")
+    conn.execute(db.SQL_RECONSTRUIR_VENDAS_DIARIAS)
+    conn.execute(
+        "INSERT OR REPLACE INTO contadores (id, " + ", ".join(db.CAMPOS_CONTADORES) + ") "
+        "SELECT 1, * FROM (" + db.SQL_ESTATISTICAS_RECALCULADAS + ")"
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+    return {
+        'caminho': caminho,
+        'seed': seed,
+        'produtos': produtos,
+        'pesaveis': pesaveis,
+        'clientes': clientes,
+        'vendas': vendas,
+        'itens_vendidos': total_itens,
+        'dias': dias,
+    }
+
+
+def adicionar_argumentos(parser):
+    """Parâmetros do gerador, compartilhados com os benchmarks que criam o próprio banco."""
+    parser.add_argument('--produtos', type=int, default=5000)
+    parser.add_argument('--pesaveis', type=int, default=300)
+    parser.add_argument('--clientes', type=int, default=2000)
+    parser.add_argument('--vendas', type=int, default=50000)
+    parser.add_argument('--dias', type=int, default=365)
+    parser.add_argument('--seed', type=int, default=42)
+
+
+def parametros_gerador(args):
+    return {campo: getattr(args, campo) for campo in ('produtos', 'pesaveis', 'clientes', 'vendas', 'dias', 'seed')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('saida', help="Arquivo SQLite a criar (substitui se existir)")
+    adicionar_argumentos(parser)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    resumo = gerar_banco(args.saida, **parametros_gerador(args))
+    print(f"Banco gerado em {time.perf_counter() - t0:.1f}s: {resumo['caminho']}")
+    for campo in ('produtos', 'pesaveis', 'clientes', 'vendas', 'itens_vendidos'):
+        print(f"  {campo:<15} {resumo[campo]}")
+
+
+if __name__ == '__main__':
+    main()
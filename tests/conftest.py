@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+# Sem pré-renderização de recibos em segundo plano durante os testes
+os.environ.setdefault('RECIBOS_PRE_RENDERIZAR', 'False')
+
+import Mercadinho_kairos.logica_banco as db
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    """Banco novo em um diretório temporário, com todas as migrações aplicadas."""
+    monkeypatch.chdir(tmp_path)  # Recibos e relatórios gerados ficam no diretório do teste
+    monkeypatch.setattr(db, 'DB_NAME', str(tmp_path / 'loja.db'))
+    assert db.setup_database()
+    yield db
+    db.fechar_pool()
+
+
+@pytest.fixture
+def app(banco):
+    from Mercadinho_kairos.app import app as aplicacao
+    aplicacao.config['TESTING'] = True
+    return aplicacao
+
+
+@pytest.fixture
+def cliente(app, banco):
+    """Test client já autenticado."""
+    banco.add_user('caixa', 'senha123')
+    cliente = app.test_client()
+    # Segue o redirecionamento para consumir a mensagem flash de boas-vindas
+    resposta = cliente.post('/login', data={'username': 'caixa', 'password': 'senha123'}, follow_redirects=True)
+    assert resposta.request.path == '/dashboard'
+    return cliente
+
+
+def adicionar_produto(banco, nome, preco=10.0, quantidade=100, codigo_barras=None):
+    """Cadastra um produto e retorna o id dele."""
+    ok, mensagem = banco.adicionar_produto(nome, preco, quantidade, codigo_barras)
+    assert ok, mensagem
+    conn = banco.get_db_connection()
+    try:
+        return conn.execute("SELECT MAX(id) FROM produtos").fetchone()[0]
+    finally:
+        conn.close()
@@ -0,0 +1,247 @@
+from datetime import datetime
+
+import Mercadinho_kairos.app as app_modulo
+from tests.conftest import adicionar_produto
+
+
+def test_get_condicional_responde_304_ate_a_proxima_escrita(cliente, banco):
+    adicionar_produto(banco, 'Arroz', 5.0, 10)
+    resposta = cliente.get('/api/produtos')
+    assert resposta.status_code == 200
+    etag = resposta.headers['ETag']
+
+    repetida = cliente.get('/api/produtos', headers={'If-None-Match': etag})
+    assert repetida.status_code == 304
+    assert repetida.data == b''
+
+    # Outra tabela não invalida a listagem de produtos
+    banco.adicionar_cliente('Ana', None, None, None, None)
+    assert cliente.get('/api/produtos', headers={'If-None-Match': etag}).status_code == 304
+
+    adicionar_produto(banco, 'Feijão', 8.0, 10)
+    nova = cliente.get('/api/produtos', headers={'If-None-Match': etag})
+    assert nova.status_code == 200
+    assert nova.headers['ETag'] != etag
+    assert [p['nome'] for p in nova.get_json()['produtos']] == ['Arroz', 'Feijão']
+
+
+def test_etag_depende_da_url(cliente, banco):
+    adicionar_produto(banco, 'Arroz', 5.0, 10)
+    etag = cliente.get('/api/produtos').headers['ETag']
+    assert cliente.get('/api/produtos?limit=1').headers['ETag'] != etag
+
+
+def test_etag_dos_relatorios_muda_com_o_dia(cliente, banco, monkeypatch):
+    class Dia(datetime):
+        atual = datetime(2026, 10, 17, 23, 59)
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.atual
+
+    monkeypatch.setattr(app_modulo, 'datetime', Dia)
+    etag = cliente.get('/relatorios').headers['ETag']
+    assert cliente.get('/relatorios', headers={'If-None-Match': etag}).status_code == 304
+
+    Dia.atual = datetime(2026, 10, 18, 0, 1)
+    resposta = cliente.get('/relatorios', headers={'If-None-Match': etag})
+    assert resposta.status_code == 200
+    assert '2026-10-18' in resposta.get_data(as_text=True)
+
+
+def test_scan_no_caixa(cliente, banco):
+    produto_id = adicionar_produto(banco, 'Leite', 4.5, 20, '7891000100103')
+    resposta = cliente.post('/caixa/buscar_auto', json={'codigo': '7891000100103'})
+    assert resposta.get_json()['produto']['id'] == produto_id
+    resposta = cliente.post('/caixa/buscar_auto', json={'codigo': 'lei'})
+    assert [p['id'] for p in resposta.get_json()['produtos']] == [produto_id]
+    resposta = cliente.post('/caixa/buscar_auto', json={'codigo': '999'})
+    assert resposta.get_json() == {'success': False, 'message': 'Produto não encontrado'}
+
+
+def test_scan_com_digito_unicode_nao_e_erro(cliente, banco):
+    resposta = cliente.post('/caixa/buscar_auto', json={'codigo': '²'})
+    assert resposta.status_code == 200
+    assert resposta.get_json()['success'] is False
+
+
+def test_venda_sem_estoque_responde_409(cliente, banco):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 1)
+    resposta = cliente.post('/caixa/finalizar', json={
+        'cliente_id': None, 'itens': [{'id': arroz, 'quantidade': 3, 'preco': 5.0}],
+        'total': 15.0, 'forma_pagamento': 'pix', 'valor_pago': 15.0, 'troco': 0.0,
+    })
+    assert resposta.status_code == 409
+    dados = resposta.get_json()
+    assert dados['success'] is False
+    assert 'Arroz' in dados['mensagem']
+    assert dados['faltas'] == [{'produto_id': arroz, 'nome': 'Arroz', 'disponivel': 1, 'pedido': 3}]
+    assert 'message' not in dados
+
+
+def test_correcao_de_contadores_so_por_post(cliente, banco):
+    adicionar_produto(banco, 'Arroz', 5.0, 10)
+    conn = banco.get_db_connection()
+    try:
+        conn.execute("UPDATE contadores SET total_produtos = 7")
+        conn.commit()
+    finally:
+        conn.close()
+
+    # GET só relata, mesmo com o parâmetro antigo
+    assert cliente.get('/debug/contadores?corrigir=1').get_json()['consistente'] is False
+    assert banco.verificar_contadores()['total_produtos']['contador'] == 7
+
+    resposta = cliente.post('/debug/contadores')
+    assert resposta.get_json()['corrigido'] is True
+    assert cliente.get('/debug/contadores').get_json() == {'consistente': True, 'divergencias': {}}
+
+
+def test_dashboard_mostra_cinco_produtos(cliente, banco):
+    for i in range(7):
+        adicionar_produto(banco, f'Produto {i}')
+    corpo = cliente.get('/dashboard').get_data(as_text=True)
+    assert 'Produto 4' in corpo
+    assert 'Produto 5' not in corpo
+
+
+def test_limpar_cache_so_por_post(cliente, banco):
+    cliente.get('/dashboard')
+    assert cliente.get('/debug/cache?limpar=1').get_json()['entradas'] > 0
+    assert cliente.post('/debug/cache').get_json()['entradas'] == 0
+
+
+def test_metrics_exige_login_ou_token(app, cliente, monkeypatch):
+    monkeypatch.delenv('METRICAS_TOKEN', raising=False)
+    monkeypatch.delenv('METRICAS_PUBLICAS', raising=False)
+    anonimo = app.test_client()
+    assert anonimo.get('/metrics').status_code == 401
+    assert cliente.get('/metrics').status_code == 200
+
+    monkeypatch.setenv('METRICAS_TOKEN', 'segredo')
+    assert anonimo.get('/metrics', headers={'Authorization': 'Bearer errado'}).status_code == 401
+    assert anonimo.get('/metrics', headers={'Authorization': 'Bearer segredo'}).status_code == 200
+
+    monkeypatch.delenv('METRICAS_TOKEN')
+    monkeypatch.setenv('METRICAS_PUBLICAS', 'true')
+    assert anonimo.get('/metrics').status_code == 200
+
+
+def test_zerar_consultas_so_por_post(cliente, banco):
+    cliente.get('/produtos')
+    assert cliente.get('/debug/queries?formato=json&limpar=1').get_json()['consultas']
+    assert cliente.post('/debug/queries').status_code == 302
+    assert banco.registro_consultas.mais_custosas() == []
+    assert 'action="/debug/queries"' in cliente.get('/debug/queries').get_data(as_text=True)
+
+
+def test_vendas_paginadas_no_servidor(cliente, banco):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 100)
+    banco.adicionar_cliente('Ana', None, None, None, None)
+    ana = banco.listar_clientes()[0]['id']
+    ids = []
+    for quantidade, cliente_id in ((1, None), (2, ana), (3, ana)):
+        venda_id, mensagem = banco.registrar_venda_completa(
+            cliente_id, [{'id': arroz, 'quantidade': quantidade, 'preco': 5.0}],
+            5.0 * quantidade, 'pix', 5.0 * quantidade, 0.0)
+        assert venda_id, mensagem
+        ids.append(venda_id)
+
+    pagina = cliente.get('/vendas').get_data(as_text=True)
+    assert all(f'data-venda-id="{venda_id}"' in pagina for venda_id in ids)
+    assert 'id="total-vendas-valor">30.00' in pagina
+
+    primeira = cliente.post('/vendas_filtradas', json={'limite': 2, 'html': True}).get_json()
+    assert [v['id'] for v in primeira['vendas']] == [ids[2], ids[1]]
+    assert (primeira['total_registros'], primeira['total_vendas_valor']) == (3, 30.0)
+    assert f'data-venda-id="{ids[2]}"' in primeira['html']
+
+    # Totais só na primeira página; a última não tem próximo cursor
+    segunda = cliente.post('/vendas_filtradas', json={'limite': 2, 'apos': primeira['proximo']}).get_json()
+    assert [v['id'] for v in segunda['vendas']] == [ids[0]]
+    assert segunda['proximo'] is None
+    assert 'total_registros' not in segunda and 'html' not in segunda
+
+    da_ana = cliente.post('/vendas_filtradas', json={'cliente_id': str(ana)}).get_json()
+    assert (da_ana['total_registros'], da_ana['total_vendas_valor']) == (2, 25.0)
+
+
+def test_vendas_filtradas_rejeita_filtro_ou_cursor_invalido(cliente, banco):
+    for corpo in ({'cliente_id': 'abc'}, {'produto_id': '1.5'}, {'apos': 'nao-e-um-cursor'}):
+        resposta = cliente.post('/vendas_filtradas', json=corpo)
+        assert resposta.status_code == 400, corpo
+        assert resposta.get_json()['success'] is False
+
+
+def preparar_relatorio(banco):
+    """Fixture calculada à mão: 3 produtos (um com estoque baixo, um zerado) e 3 vendas em 2 dias."""
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 100)
+    feijao = adicionar_produto(banco, 'Feijão', 8.0, 3)
+    adicionar_produto(banco, 'Sal', 2.0, 0)
+    resultados = banco.registrar_vendas_lote([
+        {'data_venda': '2026-03-01T10:00:00', 'forma_pagamento': 'pix', 'total': 10.0,
+         'itens': [{'id': arroz, 'quantidade': 2, 'preco': 5.0}]},
+        {'data_venda': '2026-03-01T15:00:00', 'forma_pagamento': 'dinheiro', 'total': 13.0, 'valor_pago': 20.0,
+         'troco': 7.0, 'itens': [{'id': arroz, 'quantidade': 1, 'preco': 5.0}, {'id': feijao, 'quantidade': 1, 'preco': 8.0}]},
+        {'data_venda': '2026-03-02T09:00:00', 'forma_pagamento': 'pix', 'total': 15.0,
+         'itens': [{'id': arroz, 'quantidade': 3, 'preco': 5.0}]},
+    ])
+    assert [r['status'] for r in resultados] == ['registrada'] * 3
+
+
+def test_relatorios_agregados_no_banco(cliente, banco):
+    preparar_relatorio(banco)
+    estoque = {'total_produtos': 3, 'produtos_com_estoque': 2, 'produtos_estoque_baixo': 1,
+               'produtos_sem_estoque': 1, 'valor_estoque': 94 * 5.0 + 2 * 8.0}
+
+    tudo = cliente.post('/relatorios/filtrar', json={}).get_json()
+    assert tudo['estatisticas'] == {**estoque, 'total_vendas_valor': 38.0, 'total_transacoes': 3,
+                                    'total_itens_vendidos': 7, 'total_troco': 7.0}
+    assert tudo['produtos_sem_estoque'] == 1
+    assert [linha['produto_nome'] for linha in tudo['vendas']] == ['Arroz', 'Feijão', 'Arroz', 'Arroz']
+
+    dia = cliente.post('/relatorios/filtrar', json={'data_inicio': '2026-03-01', 'data_fim': '2026-03-01'}).get_json()
+    assert {campo: dia['estatisticas'][campo] for campo in ('total_vendas_valor', 'total_transacoes',
+                                                            'total_itens_vendidos', 'total_troco')} == \
+        {'total_vendas_valor': 23.0, 'total_transacoes': 2, 'total_itens_vendidos': 4, 'total_troco': 7.0}
+    assert len(dia['vendas']) == 3
+
+    so_estoque = cliente.post('/relatorios/filtrar', json={'tipo_relatorio': 'estoque'}).get_json()
+    assert so_estoque['vendas'] == [] and so_estoque['estatisticas']['total_vendas_valor'] == 0
+
+    assert 'R$ 486.00' in cliente.get('/relatorios').get_data(as_text=True)
+
+
+def test_api_relatorios_pagina_e_rejeita_pedidos_invalidos(cliente, banco):
+    preparar_relatorio(banco)
+    vistas, cursor = [], None
+    while True:
+        url = '/api/relatorios/vendas?data_inicio=2026-03-01&data_fim=2026-03-01&limit=2'
+        pagina = cliente.get(url + (f'&after={cursor}' if cursor else '')).get_json()
+        vistas.extend(linha['quantidade'] for linha in pagina['linhas'])
+        cursor = pagina['proximo']
+        if cursor is None:
+            break
+    assert sorted(vistas) == [1, 1, 2]
+    assert len(cliente.get('/api/relatorios/estoque?limit=2').get_json()['linhas']) == 2
+
+    assert cliente.get('/api/relatorios/clientes').status_code == 404
+    assert cliente.get('/api/relatorios/vendas?data_inicio=2026-02-30').status_code == 400
+    assert cliente.get('/api/relatorios/vendas?after=nao-e-um-cursor').status_code == 400
+    for corpo in ({'data_inicio': '01/03/2026'}, {'data_inicio': '2026-03-02', 'data_fim': '2026-03-01'}):
+        resposta = cliente.post('/relatorios/filtrar', json=corpo)
+        assert resposta.status_code == 400, corpo
+        assert resposta.get_json()['success'] is False
+
+
+def test_rota_de_vendas_em_lote(cliente, banco, monkeypatch):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 2)
+    venda = {'forma_pagamento': 'pix', 'total': 5.0, 'itens': [{'id': arroz, 'quantidade': 1, 'preco': 5.0}]}
+    corpo = {'vendas': [{**venda, 'id_externo': 'a'}, {**venda, 'id_externo': 'a'}, {**venda, 'total': 'x'},
+                        {**venda, 'id_externo': 'b', 'itens': [{'id': arroz, 'quantidade': 5, 'preco': 5.0}]}]}
+    dados = cliente.post('/caixa/finalizar_lote', json=corpo).get_json()
+    assert (dados['registradas'], dados['duplicadas'], dados['rejeitadas'], dados['erros']) == (1, 1, 2, 0)
+
+    assert cliente.post('/caixa/finalizar_lote', json={'vendas': []}).status_code == 400
+    monkeypatch.setattr(banco, 'LOTE_VENDAS_MAX', 2)
+    assert cliente.post('/caixa/finalizar_lote', json={'vendas': [venda] * 3}).status_code == 413
@@ -0,0 +1,52 @@
+import sqlite3
+
+import Mercadinho_kairos.cache_respostas as cache_respostas
+from tests.conftest import adicionar_produto
+
+
+def test_cache_reaproveita_ate_uma_escrita_de_qualquer_processo(banco):
+    cache = cache_respostas.CacheGeracional(1024 * 1024)
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        return banco.get_estatisticas_gerais()['total_produtos']
+
+    assert cache.obter_ou_calcular('total', calcular) == 0
+    assert cache.obter_ou_calcular('total', calcular) == 0
+    assert len(chamadas) == 1
+
+    adicionar_produto(banco, 'Arroz')
+    assert cache.obter_ou_calcular('total', calcular) == 1
+
+    # Escrita feita por outra conexão (outro worker, script de carga)
+    externo = sqlite3.connect(banco.DB_NAME)
+    externo.execute("INSERT INTO produtos (nome, preco, quantidade) VALUES ('Feijão', 8.0, 5)")
+    externo.commit()
+    externo.close()
+    assert cache.obter_ou_calcular('total', calcular) == 2
+    assert len(chamadas) == 3
+
+
+def test_correcao_dos_contadores_invalida_o_cache(banco):
+    cache = cache_respostas.CacheGeracional(1024 * 1024)
+    adicionar_produto(banco, 'Arroz')
+    conn = banco.get_db_connection()
+    try:
+        conn.execute("UPDATE contadores SET total_produtos = 9")
+        conn.commit()
+    finally:
+        conn.close()
+    assert cache.obter_ou_calcular('stats', banco.get_estatisticas_gerais)['total_produtos'] == 9
+    banco.verificar_contadores(corrigir=True)
+    assert cache.obter_ou_calcular('stats', banco.get_estatisticas_gerais)['total_produtos'] == 1
+
+
+def test_lru_respeita_limite_de_bytes(banco):
+    cache = cache_respostas.CacheGeracional(250)
+    for i in range(5):
+        cache.obter_ou_calcular(i, lambda: 'x' * 100)
+    stats = cache.estatisticas()
+    assert stats['entradas'] == 2
+    assert stats['despejos'] == 3
+    assert stats['bytes'] <= 250
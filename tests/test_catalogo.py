@@ -0,0 +1,73 @@
+import sqlite3
+
+from tests.conftest import adicionar_produto
+
+
+def test_catalogo_completo(banco):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 10, '789')
+    queijo = adicionar_produto(banco, 'Queijo', 0.0, 10)
+    banco.adicionar_produto_pesavel(queijo, 49.9, '2001')
+
+    catalogo = banco.get_catalogo_pdv()
+    assert catalogo['completo'] is True
+    assert catalogo['removidos'] == []
+    assert catalogo['produtos'] == [
+        [arroz, 'Arroz', 5.0, '789', False, []],
+        [queijo, 'Queijo', 0.0, None, True, [['2001', 49.9]]],
+    ]
+
+
+def test_desde_fora_do_controle_de_versoes_devolve_tudo(banco):
+    adicionar_produto(banco, 'Arroz')
+    versoes = banco.versoes_tabelas()
+    for desde in (versoes['catalogo_base'] - 1, versoes['catalogo'] + 1):
+        catalogo = banco.get_catalogo_pdv(desde)
+        assert catalogo['completo'] is True
+        assert len(catalogo['produtos']) == 1
+
+
+def test_alteracoes_e_remocoes_desde_a_versao(banco):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 10)
+    feijao = adicionar_produto(banco, 'Feijão', 8.0, 10)
+    sal = adicionar_produto(banco, 'Sal', 2.0, 10)
+    versao = banco.get_catalogo_pdv()['versao']
+
+    banco.atualizar_produto(arroz, 'Arroz', 5.5, 10, None)
+    banco.excluir_produto(feijao)
+    # Só o estoque mudou: não é alteração de catálogo
+    externo = sqlite3.connect(banco.DB_NAME)
+    externo.execute("UPDATE produtos SET quantidade = 1 WHERE id = ?", (sal,))
+    externo.commit()
+    externo.close()
+
+    delta = banco.get_catalogo_pdv(str(versao))
+    assert delta['completo'] is False
+    assert delta['versao'] > versao
+    assert delta['produtos'] == [[arroz, 'Arroz', 5.5, None, False, []]]
+    assert delta['removidos'] == [feijao]
+    assert banco.get_catalogo_pdv(delta['versao'])['produtos'] == []
+
+
+def test_catalogo_dentro_de_transacao_aberta(banco):
+    adicionar_produto(banco, 'Arroz')
+    conn = banco.get_db_connection()
+    try:
+        conn.execute("BEGIN")
+        # Mesma conexão (chamada aninhada): não pode abrir outra transação nem confirmar a de fora
+        assert len(banco.get_catalogo_pdv()['produtos']) == 1
+        assert conn.in_transaction
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+def test_rota_de_alteracoes(cliente, banco):
+    adicionar_produto(banco, 'Arroz')
+    versao = cliente.get('/api/catalogo').get_json()['versao']
+    adicionar_produto(banco, 'Feijão')
+    delta = cliente.get(f'/api/catalogo/alteracoes?desde={versao}').get_json()
+    assert [linha[1] for linha in delta['produtos']] == ['Feijão']
+    for consulta in ('?desde=abc', ''):
+        resposta = cliente.get(f'/api/catalogo/alteracoes{consulta}')
+        assert resposta.status_code == 400
+        assert resposta.get_json()['success'] is False
@@ -0,0 +1,64 @@
+import io
+
+from openpyxl import load_workbook
+
+import Mercadinho_kairos.documentos as documentos
+from tests.conftest import adicionar_produto
+
+VENDAS = 520  # Mais que LINHAS_POR_TABELA: o PDF precisa de mais de uma tabela de vendas
+
+
+def popular(banco):
+    """VENDAS vendas de 1 ou 2 unidades de um produto; retorna o valor total vendido."""
+    arroz = adicionar_produto(banco, 'Arroz', 2.5, 10000, '789')
+    total = 0.0
+    for i in range(VENDAS):
+        quantidade = 1 + i % 2
+        valor = quantidade * 2.5
+        venda_id, mensagem = banco.registrar_venda_completa(
+            None, [{'id': arroz, 'quantidade': quantidade, 'preco': 2.5}], valor, 'pix', valor, 0.0)
+        assert venda_id, mensagem
+        total += valor
+    return total
+
+
+def test_excel_exporta_todas_as_vendas(banco):
+    total = popular(banco)
+    buffer = io.BytesIO()
+    documentos.gerar_excel_loja(buffer)
+
+    planilha = load_workbook(io.BytesIO(buffer.getvalue()), read_only=True)
+    produtos = list(planilha['Produtos'].values)
+    assert produtos[0] == tuple(banco.COLUNAS_EXPORTACAO_PRODUTOS)
+    assert produtos[1][1:] == ('Arroz', 2.5, 10000 - 780, '789')
+
+    vendas = list(planilha['Vendas'].values)
+    assert vendas[0] == tuple(banco.COLUNAS_EXPORTACAO_VENDAS)
+    assert len(vendas) == VENDAS + 1
+    colunas = banco.COLUNAS_EXPORTACAO_VENDAS
+    assert sum(linha[colunas.index('total')] for linha in vendas[1:]) == total
+    assert sum(linha[colunas.index('quantidade')] for linha in vendas[1:]) == 780
+    assert len({linha[colunas.index('id')] for linha in vendas[1:]}) == VENDAS
+
+
+def test_pdf_monta_em_blocos_e_informa_progresso(banco, monkeypatch):
+    popular(banco)
+    tabelas = []
+    original = documentos._tabelas_em_blocos
+
+    def contar(*args, **kwargs):
+        for tabela in original(*args, **kwargs):
+            tabelas.append(len(tabela._cellvalues) - 1)  # Sem o cabeçalho
+            yield tabela
+
+    monkeypatch.setattr(documentos, '_tabelas_em_blocos', contar)
+    progresso = []
+    buffer = io.BytesIO()
+    documentos.gerar_pdf_loja(buffer, ao_progredir=lambda fracao, mensagem: progresso.append((fracao, mensagem)))
+
+    assert buffer.getvalue().startswith(b'%PDF')
+    assert tabelas == [1, documentos.LINHAS_POR_TABELA, VENDAS - documentos.LINHAS_POR_TABELA]
+    fracoes = [fracao for fracao, _ in progresso]
+    assert fracoes == sorted(fracoes)
+    assert progresso[-2] == (0.8, f"{VENDAS + 1} de {VENDAS + 1} linhas lidas")
+    assert progresso[-1] == (0.8, "Montando o PDF")
@@ -0,0 +1,27 @@
+import json
+
+from benchmarks import bench_inicializacao as bench
+
+# Roda em um interpretador novo: no processo do pytest o app e suas dependências já podem estar carregados.
+# Os limites de tempo ficam no benchmark (python -m benchmarks.bench_inicializacao), não aqui.
+SCRIPT_IMPORTACAO = """
+import json, sys
+from Mercadinho_kairos.app import app
+antes = sorted({nome.split('.')[0] for nome in sys.modules})
+resposta = app.test_client().get('/login')
+print(json.dumps({
+    'status': resposta.status_code,
+    'modulos_importacao': antes,
+    'modulos_primeira_requisicao': sorted({nome.split('.')[0] for nome in sys.modules}),
+}))
+"""
+
+
+def test_importacao_do_app_sem_dependencias_pesadas(tmp_path):
+    saida = bench._rodar_python(['-c', SCRIPT_IMPORTACAO], str(tmp_path)).stdout
+    resultado = json.loads(saida.splitlines()[-1])
+
+    assert resultado['status'] == 200
+    assert 'Mercadinho_kairos' in resultado['modulos_importacao']
+    assert not set(resultado['modulos_importacao']).intersection(bench.MODULOS_PESADOS)
+    assert not set(resultado['modulos_primeira_requisicao']).intersection(bench.MODULOS_PESADOS)
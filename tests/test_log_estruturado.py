@@ -0,0 +1,104 @@
+import json
+import logging
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from flask import Flask, g
+
+import Mercadinho_kairos.log_estruturado as log_estruturado
+
+
+def registro(mensagem='ok', nivel=logging.INFO, exc_info=None, **extras):
+    record = logging.LogRecord('Mercadinho_kairos.teste', nivel, __file__, 1, mensagem, None, exc_info)
+    record.__dict__.update(extras)
+    return record
+
+
+@pytest.fixture
+def raiz_restaurada():
+    """Devolve o logger raiz e os níveis por módulo como estavam antes do teste."""
+    raiz = logging.getLogger()
+    handlers, nivel = list(raiz.handlers), raiz.level
+    niveis = {nome: logging.getLogger(nome).level for nome in ('werkzeug', 'Mercadinho_kairos.logica_banco')}
+    yield raiz
+    log_estruturado.encerrar_logs()
+    raiz.handlers[:] = handlers
+    raiz.setLevel(nivel)
+    for nome, nivel_modulo in niveis.items():
+        logging.getLogger(nome).setLevel(nivel_modulo)
+
+
+def test_formatador_json_campos_extras_e_excecao():
+    dados = json.loads(log_estruturado.FormatadorJSON().format(registro('venda salva', venda_id=7, request_id='abc')))
+    assert dados['mensagem'] == 'venda salva'
+    assert dados['nivel'] == 'INFO'
+    assert dados['modulo'] == 'Mercadinho_kairos.teste'
+    assert dados['venda_id'] == 7
+    assert dados['request_id'] == 'abc'
+    assert dados['ts'].endswith('+00:00')
+    assert not {'args', 'msg', 'levelno', 'pathname'}.intersection(dados)
+
+    try:
+        raise ValueError('falhou')
+    except ValueError:
+        dados = json.loads(log_estruturado.FormatadorJSON().format(registro('erro', logging.ERROR, sys.exc_info())))
+    assert 'ValueError: falhou' in dados['excecao']
+
+
+def test_filtro_anota_request_id_so_dentro_da_requisicao():
+    filtro = log_estruturado._FiltroRequisicao()
+    fora = registro()
+    assert filtro.filter(fora) and not hasattr(fora, 'request_id')
+
+    with Flask(__name__).test_request_context():
+        g.request_id = 'req-1'
+        dentro = registro()
+        assert filtro.filter(dentro)
+    assert dentro.request_id == 'req-1'
+
+
+def test_request_id_do_proxy_volta_na_resposta():
+    app = Flask(__name__)
+    log_estruturado.init_app(app)
+    app.add_url_rule('/', 'raiz', lambda: 'ok')
+    cliente = app.test_client()
+
+    assert cliente.get('/', headers={'X-Request-ID': 'proxy-42'}).headers['X-Request-ID'] == 'proxy-42'
+    assert len(cliente.get('/').headers['X-Request-ID']) == 16
+
+
+def test_ler_niveis_modulos():
+    assert log_estruturado.ler_niveis_modulos('') == {'werkzeug': 'WARNING'}
+    assert log_estruturado.ler_niveis_modulos(
+        ' Mercadinho_kairos.logica_banco = debug , werkzeug=INFO,sem_igual,=ERROR,outro=FALANTE'
+    ) == {'werkzeug': 'INFO', 'Mercadinho_kairos.logica_banco': 'DEBUG'}
+
+
+def test_configurar_logs_e_idempotente_e_escreve_json(raiz_restaurada, tmp_path):
+    arquivo = tmp_path / 'app.log'
+    log_estruturado.configurar_logs('WARNING', 'Mercadinho_kairos.logica_banco=DEBUG', 'json', str(arquivo))
+    log_estruturado.configurar_logs()
+    filas = [h for h in raiz_restaurada.handlers if isinstance(h, log_estruturado._HandlerFila)]
+    assert len(filas) == 1
+    assert raiz_restaurada.level == logging.WARNING
+    assert logging.getLogger('Mercadinho_kairos.logica_banco').level == logging.DEBUG
+
+    logging.getLogger('Mercadinho_kairos.teste').warning('estoque %s', 'baixo', extra={'produto_id': 3})
+    log_estruturado.encerrar_logs()
+    assert log_estruturado._HandlerFila not in {type(h) for h in raiz_restaurada.handlers}
+
+    dados = [json.loads(linha) for linha in arquivo.read_text(encoding='utf-8').splitlines()]
+    assert [(d['mensagem'], d['produto_id']) for d in dados] == [('estoque baixo', 3)]
+
+
+def test_importar_o_app_nao_mexe_no_logger_raiz():
+    script = (
+        "import logging; raiz = logging.getLogger(); antes = (list(raiz.handlers), raiz.level)\n"
+        "import Mercadinho_kairos.app\n"
+        "assert (list(raiz.handlers), raiz.level) == antes, (raiz.handlers, raiz.level)\n"
+    )
+    resultado = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True,
+                               cwd=Path(__file__).resolve().parents[1], timeout=60)
+    assert resultado.returncode == 0, resultado.stderr
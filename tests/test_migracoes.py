@@ -0,0 +1,36 @@
+import sqlite3
+
+
+def test_consultas_quentes_usam_indices(banco):
+    ok, relatorio = banco.verificar_indices()
+    assert ok is True, [r for r in relatorio if not r['ok']]
+
+
+def test_versao_do_schema_e_a_ultima_migracao(banco):
+    conn = banco.get_db_connection()
+    try:
+        assert banco.versao_schema(conn) == banco.MIGRACOES[-1][0]
+        # Rodar de novo não reaplica nada
+        assert banco.aplicar_migracoes(conn) == []
+    finally:
+        conn.close()
+
+
+def test_migracoes_partindo_de_banco_antigo(tmp_path):
+    """Um banco criado só com a migração 1 sobe até a última versão sem perder dados."""
+    import Mercadinho_kairos.logica_banco as db
+    caminho = tmp_path / 'antigo.db'
+    conn = sqlite3.connect(caminho)
+    for comando in db.MIGRACOES[0][2]:
+        conn.execute(comando)
+    conn.execute("INSERT INTO produtos (nome, preco, quantidade) VALUES ('Arroz', 5.0, 10)")
+    conn.execute("INSERT INTO vendas (data_venda, total, forma_pagamento, valor_pago, troco) "
+                 "VALUES ('2024-03-01T10:00:00', 5.0, 'pix', 5.0, 0)")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+
+    aplicadas = db.aplicar_migracoes(conn)
+    assert aplicadas == [versao for versao, _, _ in db.MIGRACOES[1:]]
+    assert conn.execute("SELECT data_venda FROM vendas").fetchone()[0] == '2024-03-01 10:00:00'
+    assert conn.execute("SELECT total_produtos FROM contadores").fetchone()[0] == 1
+    conn.close()
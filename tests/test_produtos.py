@@ -0,0 +1,119 @@
+import sqlite3
+
+import pytest
+
+from tests.conftest import adicionar_produto
+
+
+def test_busca_por_nome_ignora_acentos_e_aceita_prefixo(banco):
+    adicionar_produto(banco, 'Açúcar Cristal 1kg')
+    adicionar_produto(banco, 'Café Torrado')
+    adicionar_produto(banco, 'Arroz Branco')
+
+    assert [p['nome'] for p in banco.buscar_produtos_por_nome('acuc')] == ['Açúcar Cristal 1kg']
+    assert [p['nome'] for p in banco.buscar_produtos_por_nome('CAFE tor')] == ['Café Torrado']
+    # Sintaxe do FTS5 digitada pelo usuário não vira erro
+    assert banco.buscar_produtos_por_nome('"arroz* (')[0]['nome'] == 'Arroz Branco'
+    assert banco.buscar_produtos_por_nome('   ') == []
+
+
+def test_busca_por_nome_acompanha_alteracoes(banco):
+    produto_id = adicionar_produto(banco, 'Feijão Preto')
+    banco.atualizar_produto(produto_id, 'Feijão Carioca', 8.0, 10, None)
+    assert banco.buscar_produtos_por_nome('preto') == []
+    assert [p['id'] for p in banco.buscar_produtos_por_nome('carioca')] == [produto_id]
+    banco.excluir_produto(produto_id)
+    assert banco.buscar_produtos_por_nome('feijao') == []
+
+
+def test_paginacao_de_produtos_por_cursor(banco):
+    # Nomes repetidos: o desempate por id não pode pular nem repetir linhas
+    ids = [adicionar_produto(banco, f'Produto {i % 3}') for i in range(7)]
+    vistos, cursor = [], None
+    while True:
+        pagina = banco.listar_produtos_pagina(cursor, limite=3)
+        vistos.extend(p['id'] for p in pagina['produtos'])
+        cursor = pagina['proximo']
+        if cursor is None:
+            break
+    assert sorted(vistos) == sorted(ids)
+    assert len(vistos) == len(set(vistos))
+    assert vistos == [p['id'] for p in banco.listar_produtos_pagina(limite=10)['produtos']]
+
+
+def test_paginacao_de_clientes_por_cursor(banco):
+    for nome in ('Bruna', 'Ana', 'Carlos', 'Ana'):
+        ok, mensagem = banco.adicionar_cliente(nome, None, None, None, None)
+        assert ok, mensagem
+    primeira = banco.listar_clientes_pagina(limite=2)
+    segunda = banco.listar_clientes_pagina(primeira['proximo'], limite=2)
+    assert [c['nome'] for c in primeira['clientes'] + segunda['clientes']] == ['Ana', 'Ana', 'Bruna', 'Carlos']
+    assert segunda['proximo'] is None
+
+
+def test_cursor_invalido(banco):
+    with pytest.raises(ValueError):
+        banco.listar_produtos_pagina('nao-e-um-cursor')
+
+
+def test_busca_por_codigo(banco):
+    produto_id = adicionar_produto(banco, 'Leite', 4.5, 20, '7891000100103')
+    assert banco.buscar_produto_por_codigo('7891000100103')['id'] == produto_id
+    assert banco.buscar_produto_por_codigo(str(produto_id))['nome'] == 'Leite'
+    assert banco.buscar_produto_por_codigo('0000') is None
+
+
+def test_busca_por_codigo_com_digito_unicode(banco):
+    adicionar_produto(banco, 'Leite', 4.5, 20, '7891000100103')
+    assert banco.buscar_produto_por_codigo('²') is None
+    assert banco.buscar_produto_por_codigo('１２') is None
+
+
+def test_indice_enxerga_escritas_de_outro_processo(banco, monkeypatch):
+    monkeypatch.setattr(banco, 'INDICE_PRODUTOS_VERIFICACAO_MS', 0)  # Confere o banco a cada scan
+    leite = adicionar_produto(banco, 'Leite', 4.5, 20, '7891000100103')
+    assert banco.buscar_produto_por_codigo('7891000100103')['preco'] == 4.5
+
+    # Conexão fora do pool: para o índice, é como outro worker ou um script de carga
+    externo = sqlite3.connect(banco.DB_NAME)
+    externo.execute("UPDATE produtos SET preco = 5.0 WHERE id = ?", (leite,))
+    externo.execute("INSERT INTO produtos (nome, preco, quantidade, codigo_barras) VALUES ('Pão', 1.0, 9, '111')")
+    externo.commit()
+    assert banco.buscar_produto_por_codigo('7891000100103')['preco'] == 5.0
+    assert banco.buscar_produto_por_codigo('111')['nome'] == 'Pão'
+
+    # Estoque não muda a versão do catálogo, mas muda a de 'produtos'
+    externo.execute("UPDATE produtos SET quantidade = 3 WHERE id = ?", (leite,))
+    externo.execute("DELETE FROM produtos WHERE codigo_barras = '111'")
+    externo.commit()
+    externo.close()
+    assert banco.buscar_produto_por_codigo('7891000100103')['quantidade'] == 3
+    assert banco.buscar_produto_por_codigo('111') is None
+
+    stats = banco.estatisticas_indice_produtos()
+    assert stats['cargas_completas'] == 1
+    assert stats['recargas_parciais'] >= 2
+    assert stats['recargas_estoque'] >= 1
+
+
+def test_scan_em_dia_responde_sem_consultar_o_banco(banco, monkeypatch):
+    monkeypatch.setattr(banco, 'INDICE_PRODUTOS_VERIFICACAO_MS', 60000)
+    leite = adicionar_produto(banco, 'Leite', 4.5, 20, '7891000100103')
+    assert banco.buscar_produto_por_codigo('7891000100103')['preco'] == 4.5
+    verificacoes = banco.estatisticas_indice_produtos()['verificacoes']
+
+    externo = sqlite3.connect(banco.DB_NAME)
+    externo.execute("UPDATE produtos SET preco = 5.0, quantidade = 3 WHERE id = ?", (leite,))
+    externo.commit()
+    externo.close()
+    for _ in range(3):
+        produto = banco.buscar_produto_por_codigo('7891000100103')
+        assert (produto['preco'], produto['quantidade']) == (4.5, 20)
+    assert banco.estatisticas_indice_produtos()['verificacoes'] == verificacoes
+
+    # Um commit deste processo expira a janela: a próxima busca confere o banco
+    adicionar_produto(banco, 'Pão', 1.0, 9, '111')
+    assert banco.buscar_produto_por_codigo('111')['nome'] == 'Pão'
+    produto = banco.buscar_produto_por_codigo('7891000100103')
+    assert (produto['preco'], produto['quantidade']) == (5.0, 3)
+    assert banco.estatisticas_indice_produtos()['verificacoes'] == verificacoes + 1
@@ -0,0 +1,90 @@
+import os
+
+import Mercadinho_kairos.recibos as recibos
+from tests.conftest import adicionar_produto
+
+
+def vender(banco, quantidade=1):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 100)
+    venda_id, mensagem = banco.registrar_venda_completa(
+        None, [{'id': arroz, 'quantidade': quantidade, 'preco': 5.0}], 5.0 * quantidade, 'pix', 5.0 * quantidade, 0.0)
+    assert venda_id, mensagem
+    return venda_id
+
+
+def arquivos(cache):
+    return sorted(nome for _, nome, _ in cache._listar())
+
+
+def test_segundo_pedido_vem_do_cache(banco, monkeypatch):
+    cache = recibos.CacheRecibos('recibos', 1024 * 1024)
+    monkeypatch.setattr(recibos, 'cache', cache)
+    venda_id = vender(banco)
+
+    pdf = recibos.obter_recibo(venda_id)
+    assert pdf.startswith(b'%PDF')
+    assert recibos.obter_recibo(venda_id) == pdf
+    assert (cache.acertos, cache.faltas) == (1, 1)
+    assert arquivos(cache) == [f"{venda_id}-{recibos.versao_venda(banco.get_venda_detalhada_por_id(venda_id))}.pdf"]
+    assert recibos.obter_recibo(999) is None
+
+
+def test_venda_alterada_ou_excluida_invalida_o_recibo(banco, monkeypatch):
+    cache = recibos.CacheRecibos('recibos', 1024 * 1024)
+    monkeypatch.setattr(recibos, 'cache', cache)
+    venda_id = vender(banco)
+    recibos.obter_recibo(venda_id)
+    antigo = arquivos(cache)
+
+    conn = banco.get_db_connection()
+    try:
+        conn.execute("UPDATE vendas SET forma_pagamento = 'dinheiro' WHERE id = ?", (venda_id,))
+        conn.commit()
+    finally:
+        conn.close()
+    recibos.obter_recibo(venda_id)
+    assert cache.faltas == 2
+    assert len(arquivos(cache)) == 1 and arquivos(cache) != antigo  # Versão antiga descartada
+
+    assert recibos.invalidar_recibo(venda_id) == 1
+    assert arquivos(cache) == []
+
+
+def test_arquivo_apagado_por_outro_processo_e_falta(banco, monkeypatch):
+    cache = recibos.CacheRecibos('recibos', 1024 * 1024)
+    monkeypatch.setattr(recibos, 'cache', cache)
+    venda_id = vender(banco)
+    recibos.obter_recibo(venda_id)
+    for nome in arquivos(cache):
+        os.remove(cache._caminho(nome))
+    assert recibos.obter_recibo(venda_id).startswith(b'%PDF')  # Renderizado de novo
+    assert (cache.acertos, cache.faltas) == (0, 2)
+    assert len(arquivos(cache)) == 1
+
+
+def test_limite_de_bytes_despeja_o_menos_usado(tmp_path):
+    cache = recibos.CacheRecibos(str(tmp_path / 'recibos'), 250)
+    for venda_id in (1, 2):
+        cache.guardar(venda_id, 'v', b'x' * 100)
+        os.utime(cache._caminho(f"{venda_id}-v.pdf"), (venda_id, venda_id))  # 1 mais antigo que 2
+    assert cache.obter(1, 'v') == b'x' * 100  # Acerto renova o mtime: agora o 2 é o menos usado
+
+    cache.guardar(3, 'v', b'x' * 100)
+    assert arquivos(cache) == ['1-v.pdf', '3-v.pdf']
+    assert cache.despejos == 1
+    assert cache.estatisticas()['bytes'] == 200
+
+    # Outro worker compartilhando o diretório enxerga o mesmo estado e o mesmo limite
+    outro = recibos.CacheRecibos(cache.diretorio, 250)
+    outro.guardar(4, 'v', b'x' * 100)
+    assert len(arquivos(cache)) == 2
+    assert cache.obter(4, 'v') == b'x' * 100
+
+
+def test_rota_do_recibo(cliente, banco):
+    venda_id = vender(banco)
+    resposta = cliente.get(f'/recibo/{venda_id}')
+    assert resposta.status_code == 200
+    assert resposta.mimetype == 'application/pdf'
+    assert resposta.data.startswith(b'%PDF')
+    assert cliente.get('/recibo/999').status_code == 302
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import Mercadinho_kairos.relatorios_jobs as relatorios_jobs
+
+
+@pytest.fixture
+def jobs(banco):
+    yield relatorios_jobs
+    relatorios_jobs.encerrar()
+
+
+def pid_encerrado():
+    processo = subprocess.Popen([sys.executable, '-c', 'pass'])
+    processo.wait()
+    return processo.pid
+
+
+def test_so_jobs_de_processos_mortos_sao_interrompidos(jobs, banco):
+    donos = {
+        'outro_worker': (os.getppid(), 'vivo'),
+        'worker_morto': (pid_encerrado(), 'morto'),
+        'sem_dono': (None, None),
+        'processo_anterior_mesmo_pid': (os.getpid(), 'anterior'),
+        'deste_processo': (os.getpid(), jobs.PROCESSO_ID),
+    }
+    for job_id, dono in donos.items():
+        assert banco.criar_job_relatorio(job_id, 'pdf_loja', {}, dono=dono)[0]
+    banco.atualizar_job_relatorio('outro_worker', status='executando')
+
+    jobs._marcar_jobs_orfaos()
+
+    status = {job_id: banco.buscar_job_relatorio(job_id)['status'] for job_id in donos}
+    assert status == {
+        'outro_worker': 'executando',
+        'worker_morto': 'erro',
+        'sem_dono': 'erro',
+        'processo_anterior_mesmo_pid': 'erro',
+        'deste_processo': 'pendente',
+    }
+
+
+def test_job_gera_pdf(jobs, banco):
+    ok, job_id = jobs.enviar_job('pdf_loja')
+    assert ok, job_id
+    jobs.encerrar(esperar=True)
+    job = banco.buscar_job_relatorio(job_id)
+    assert job['status'] == 'concluido', job['mensagem']
+    assert job['dono_pid'] == os.getpid()
+    caminho, mimetype, _ = jobs.arquivo_do_job(job)
+    assert mimetype == 'application/pdf'
+    with open(caminho, 'rb') as arquivo:
+        assert arquivo.read(4) == b'%PDF'
@@ -0,0 +1,204 @@
+import sqlite3
+import threading
+
+import pytest
+
+from tests.conftest import adicionar_produto
+
+
+def vender(banco, itens, forma_pagamento='dinheiro'):
+    carrinho = [{'id': produto_id, 'quantidade': quantidade, 'preco': preco} for produto_id, quantidade, preco in itens]
+    total = round(sum(quantidade * preco for _, quantidade, preco in itens), 2)
+    return banco.registrar_venda_completa(None, carrinho, total, forma_pagamento, total, 0.0)
+
+
+def estoque(banco, produto_id):
+    return banco.buscar_produto_por_id(produto_id)['quantidade']
+
+
+def test_venda_baixa_estoque(banco):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 10)
+    feijao = adicionar_produto(banco, 'Feijão', 8.0, 5)
+    venda_id, _ = vender(banco, [(arroz, 2, 5.0), (feijao, 1, 8.0), (arroz, 1, 5.0)])
+    assert venda_id
+    assert estoque(banco, arroz) == 7
+    assert estoque(banco, feijao) == 4
+    assert len(banco.get_venda_detalhada_por_id(venda_id)['itens']) == 3
+
+
+def test_venda_sem_estoque_nao_grava_nada(banco):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 10)
+    feijao = adicionar_produto(banco, 'Feijão', 8.0, 1)
+    with pytest.raises(banco.EstoqueInsuficiente) as erro:
+        vender(banco, [(arroz, 2, 5.0), (feijao, 2, 8.0)])
+    assert erro.value.faltas == [{'produto_id': feijao, 'nome': 'Feijão', 'disponivel': 1, 'pedido': 2}]
+    assert estoque(banco, arroz) == 10
+    assert estoque(banco, feijao) == 1
+    assert banco.get_estatisticas_gerais()['total_transacoes'] == 0
+    assert banco.get_totais_periodo()['total_transacoes'] == 0
+
+
+def test_resumo_diario_acompanha_vendas_e_exclusoes(banco):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 100)
+    primeira, _ = vender(banco, [(arroz, 2, 5.0)], 'pix')
+    vender(banco, [(arroz, 3, 5.0)], 'dinheiro')
+    totais = banco.get_totais_periodo()
+    assert totais['total_transacoes'] == 2
+    assert totais['total_vendas_valor'] == 25.0
+    assert totais['total_itens_vendidos'] == 5
+
+    ok, _ = banco.excluir_venda(primeira)
+    assert ok
+    assert banco.get_totais_periodo()['total_vendas_valor'] == 15.0
+    assert estoque(banco, arroz) == 97
+
+    # Reconstruir do zero chega ao mesmo resultado que a manutenção incremental
+    antes = banco.get_totais_periodo()
+    ok, _ = banco.reconstruir_vendas_diarias()
+    assert ok
+    assert banco.get_totais_periodo() == antes
+
+
+def test_contadores_sem_divergencia(banco):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 8)
+    adicionar_produto(banco, 'Feijão', 8.0, 50)
+    banco.adicionar_cliente('Ana', None, None, None, None)
+    venda_id, _ = vender(banco, [(arroz, 2, 5.0)])
+    banco.atualizar_produto(arroz, 'Arroz Tipo 1', 6.0, 20, None)
+    banco.excluir_venda(venda_id)
+    assert banco.verificar_contadores() == {}
+
+    estatisticas = banco.get_estatisticas_gerais()
+    assert estatisticas['total_produtos'] == 2
+    assert estatisticas['total_clientes'] == 1
+    assert estatisticas['produtos_estoque_baixo'] == 0
+
+
+def test_contadores_divergentes_sao_corrigidos(banco):
+    adicionar_produto(banco, 'Arroz', 5.0, 8)
+    conn = banco.get_db_connection()
+    try:
+        conn.execute("UPDATE contadores SET total_produtos = 42")
+        conn.commit()
+    finally:
+        conn.close()
+    divergencias = banco.verificar_contadores()
+    assert divergencias['total_produtos']['diferenca'] == 41
+    assert banco.verificar_contadores(corrigir=True)
+    assert banco.verificar_contadores() == {}
+
+
+def test_busca_de_vendas_paginada(banco):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 100)
+    feijao = adicionar_produto(banco, 'Feijão', 8.0, 100)
+    ids = [vender(banco, [(arroz, 1, 5.0)] + ([(feijao, 1, 8.0)] if i % 2 else []))[0] for i in range(5)]
+
+    vistos, cursor = [], None
+    while True:
+        pagina = banco.buscar_vendas({}, cursor, limite=2)
+        vistos.extend(venda['id'] for venda in pagina['vendas'])
+        cursor = pagina['proximo']
+        if cursor is None:
+            break
+    assert vistos == sorted(ids, reverse=True)
+
+    com_feijao = banco.buscar_vendas({'produto_id': feijao})
+    assert [venda['id'] for venda in com_feijao['vendas']] == [ids[3], ids[1]]
+    assert com_feijao['totais']['total_registros'] == 2
+    assert len(com_feijao['vendas'][0]['itens']) == 2
+
+
+def venda_lote(produto_id, quantidade, preco=5.0, **extra):
+    return {'forma_pagamento': 'pix', 'total': quantidade * preco,
+            'itens': [{'id': produto_id, 'quantidade': quantidade, 'preco': preco}], **extra}
+
+
+def test_lote_rejeita_so_a_venda_sem_estoque(banco):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 5)
+    resultados = banco.registrar_vendas_lote([venda_lote(arroz, 2), venda_lote(arroz, 10), venda_lote(arroz, 3)])
+    assert [r['status'] for r in resultados] == ['registrada', 'rejeitada', 'registrada']
+    assert [r['indice'] for r in resultados] == [0, 1, 2]
+    assert resultados[1]['venda_id'] is None and 'Arroz' in resultados[1]['mensagem']
+
+    # O SAVEPOINT desfez só a venda recusada: estoque, contadores e resumo diário batem
+    assert estoque(banco, arroz) == 0
+    assert banco.verificar_contadores() == {}
+    assert banco.get_estatisticas_gerais()['total_transacoes'] == 2
+    assert banco.get_totais_periodo()['total_vendas_valor'] == 25.0
+    assert len(banco.get_venda_detalhada_por_id(resultados[2]['venda_id'])['itens']) == 1
+
+
+def test_lote_reenviado_nao_duplica_vendas(banco):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 100)
+    primeiro = banco.registrar_vendas_lote([
+        venda_lote(arroz, 1, id_externo='pdv1-1'),
+        venda_lote(arroz, 1, id_externo='pdv1-2'),
+        venda_lote(arroz, 1, id_externo='pdv1-1'),  # Repetida no mesmo lote
+    ])
+    assert [r['status'] for r in primeiro] == ['registrada', 'registrada', 'duplicada']
+    assert primeiro[2]['venda_id'] == primeiro[0]['venda_id']
+
+    # Reenvio depois de uma resposta perdida, com uma venda nova no fim
+    segundo = banco.registrar_vendas_lote([
+        venda_lote(arroz, 1, id_externo='pdv1-1'),
+        venda_lote(arroz, 1, id_externo=' pdv1-2 '),
+        venda_lote(arroz, 1, id_externo='pdv1-3'),
+    ])
+    assert [r['status'] for r in segundo] == ['duplicada', 'duplicada', 'registrada']
+    assert [r['venda_id'] for r in segundo[:2]] == [r['venda_id'] for r in primeiro[:2]]
+    assert estoque(banco, arroz) == 97
+    assert banco.get_estatisticas_gerais()['total_transacoes'] == 3
+    assert banco.verificar_contadores() == {}
+
+
+def test_lote_com_entradas_invalidas(banco):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 100)
+    invalidas = [
+        'não é um objeto',
+        {'forma_pagamento': 'pix', 'total': 5.0, 'itens': []},
+        venda_lote(arroz, 1, forma_pagamento=''),
+        venda_lote(arroz, 1, total='abc'),
+        venda_lote(arroz, 1, data_venda='ontem'),
+        venda_lote(arroz, 1, id_externo='x' * 65),
+        venda_lote(arroz, 1, id_externo='   '),
+        {'forma_pagamento': 'pix', 'total': 5.0, 'itens': [{'id': arroz, 'quantidade': 0, 'preco': 5.0}]},
+    ]
+    resultados = banco.registrar_vendas_lote(invalidas + [venda_lote(arroz, 1)])
+    assert [r['status'] for r in resultados] == ['rejeitada'] * len(invalidas) + ['registrada']
+    assert all(r['mensagem'].startswith('Venda inválida') for r in resultados[:-1])
+    assert [r['indice'] for r in resultados] == list(range(len(invalidas) + 1))
+    assert estoque(banco, arroz) == 99
+
+    with pytest.raises(ValueError):
+        banco.registrar_vendas_lote([venda_lote(arroz, 1)] * (banco.LOTE_VENDAS_MAX + 1))
+
+
+def test_lote_grava_data_venda_em_utc(banco):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 100)
+    resultados = banco.registrar_vendas_lote([
+        venda_lote(arroz, 1, data_venda='2026-03-01T22:30:00-03:00'),
+        venda_lote(arroz, 2, data_venda='2026-03-01 10:00:00'),  # Sem fuso: já é UTC
+    ])
+    datas = [banco.get_venda_detalhada_por_id(r['venda_id'])['data_venda'] for r in resultados]
+    assert datas == ['2026-03-02 01:30:00', '2026-03-01 10:00:00']
+    assert banco.get_totais_periodo('2026-03-02', '2026-03-02')['total_vendas_valor'] == 5.0
+    assert banco.get_totais_periodo('2026-03-01', '2026-03-01')['total_vendas_valor'] == 10.0
+
+
+def test_lote_tenta_de_novo_com_o_banco_ocupado(banco, monkeypatch):
+    arroz = adicionar_produto(banco, 'Arroz', 5.0, 100)
+    # Conexões novas sem espera do SQLite: o "database is locked" chega na hora ao código de retentativa
+    banco.fechar_pool()
+    monkeypatch.setattr(banco, 'DB_BUSY_TIMEOUT_MS', 0)
+
+    outro_caixa = sqlite3.connect(banco.DB_NAME, check_same_thread=False)
+    outro_caixa.execute("BEGIN IMMEDIATE")
+    liberar = threading.Timer(0.1, outro_caixa.commit)
+    liberar.start()
+    try:
+        resultados = banco.registrar_vendas_lote([venda_lote(arroz, 1)])
+    finally:
+        liberar.join()
+        outro_caixa.close()
+    assert [r['status'] for r in resultados] == ['registrada']
+    assert estoque(banco, arroz) == 99